@@ -47,5 +47,8 @@ class User(AbstractUser):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='user_created_id_idx'),
+        ]
         verbose_name = 'User'
         verbose_name_plural = 'Users'
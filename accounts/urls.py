@@ -1,6 +1,7 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
+    LoginView,
     UserRegistrationView,
     UserProfileView,
     UserUpdateView,
@@ -11,7 +12,7 @@ from .views import (
 
 urlpatterns = [
     # JWT Authentication endpoints
-    path('login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('login/', LoginView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     
     # User registration and profile
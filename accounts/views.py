@@ -2,6 +2,7 @@ from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
 from .serializers import (
     UserRegistrationSerializer, 
@@ -10,10 +11,20 @@ from .serializers import (
     ChangePasswordSerializer
 )
 from .permissions import IsOwnerOrAdmin, IsAdminUser
+from core.fieldsets import SparseFieldsetMixin
+from core.pagination import PageOrCursorPagination
 
 User = get_user_model()
 
 
+class LoginView(TokenObtainPairView):
+    """
+    Obtain a JWT access / refresh token pair
+    Throttled with the tight 'login' rate against password guessing
+    """
+    throttle_scope = 'login'
+
+
 class UserRegistrationView(generics.CreateAPIView):
     """
     API endpoint for user registration
@@ -41,7 +52,7 @@ class UserRegistrationView(generics.CreateAPIView):
         }, status=status.HTTP_201_CREATED)
 
 
-class UserProfileView(generics.RetrieveAPIView):
+class UserProfileView(SparseFieldsetMixin, generics.RetrieveAPIView):
     """
     Get current user profile
     Requires authentication
@@ -97,7 +108,7 @@ class ChangePasswordView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserListView(generics.ListAPIView):
+class UserListView(SparseFieldsetMixin, generics.ListAPIView):
     """
     List all users - Admin only
     Supports filtering and search
@@ -105,12 +116,13 @@ class UserListView(generics.ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = PageOrCursorPagination
     filterset_fields = ['role', 'is_active']
     search_fields = ['username', 'email', 'first_name', 'last_name']
     ordering_fields = ['created_at', 'username']
 
 
-class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
+class UserDetailView(SparseFieldsetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a user - Admin only
     """
@@ -0,0 +1,143 @@
+"""
+Concurrent catalog reads: the WSGI app (core.wsgi) on a pool of worker threads
+vs the ASGI app (core.asgi) on one event loop, sync and async (/api/async/) views
+
+Both apps are driven in-process the way a threaded WSGI server and an
+ASGI server such as uvicorn call them, without sockets or HTTP parsing,
+so only the application side is measured. Every connection is a slow
+client: it takes --client-delay ms to deliver its request, which holds a
+WSGI worker thread but only suspends a coroutine under ASGI.
+Run: python benchmarks/asgi_vs_wsgi.py --connections 200 --threads 8
+"""
+import argparse
+import asyncio
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import create_catalog, disable_throttling, setup_django
+
+HOST = 'testserver'
+
+
+def wsgi_get(application, path, query, delay):
+    """One request through the WSGI app; returns the status code"""
+    time.sleep(delay)  # Reading the request off a slow socket blocks the worker
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+        'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'HTTP_HOST': HOST,
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+    body = application(environ, lambda code, headers, exc_info=None: status.append(code))
+    try:
+        b''.join(body)
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return int(status[0].split()[0])
+
+
+async def asgi_get(application, path, query, delay):
+    """One request through the ASGI app; returns the status code"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'root_path': '', 'headers': [(b'host', HOST.encode())],
+        'client': ('127.0.0.1', 50000), 'server': (HOST, 80),
+    }
+    delivered = False
+    status = []
+
+    async def receive():
+        nonlocal delivered
+        if delivered:
+            await asyncio.Event().wait()  # Nothing more until the client disconnects
+        delivered = True
+        await asyncio.sleep(delay)  # The slow client only suspends this coroutine
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+def requests_for(args, slugs):
+    """(path, query) of each request: catalog pages and product details in turn"""
+    for index in range(args.requests):
+        if index % 2:
+            yield f'/api/{{prefix}}products/{slugs[index % len(slugs)]}/', ''
+        else:
+            yield '/api/{prefix}products/', f'page={index % 20 + 1}'
+
+
+def run_wsgi(application, requests, threads, delay):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return list(pool.map(lambda request: wsgi_get(application, *request, delay), requests))
+
+
+def run_asgi(application, requests, connections, delay):
+    async def main():
+        limit = asyncio.Semaphore(connections)
+
+        async def one(request):
+            async with limit:
+                return await asgi_get(application, *request, delay)
+        return await asyncio.gather(*(one(request) for request in requests))
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--connections', type=int, default=200, help='Concurrent clients')
+    parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads')
+    parser.add_argument('--client-delay', type=float, default=20, help='ms each client takes to send its request')
+    parser.add_argument('--cache', action='store_true', help='Keep the response cache on')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from core.asgi import application as asgi_application
+    from core.wsgi import application as wsgi_application
+    from products import async_views, views
+    from products.models import Product
+
+    settings.RESPONSE_CACHE_ENABLED = args.cache
+    disable_throttling(views.ProductListView, views.ProductDetailView,
+                       async_views.AsyncProductListView, async_views.AsyncProductDetailView)
+    create_catalog(args.products)
+    slugs = list(Product.objects.values_list('slug', flat=True)[:200])
+    delay = args.client_delay / 1000
+    print(f'{args.requests} requests, {args.connections} connections, '
+          f'{args.client_delay:g} ms client delay, {threading.active_count()} threads at start')
+
+    cases = [
+        (f'WSGI, {args.threads} threads', '', lambda requests: run_wsgi(
+            wsgi_application, requests, args.threads, delay)),
+        (f'WSGI, {args.connections} threads', '', lambda requests: run_wsgi(
+            wsgi_application, requests, args.connections, delay)),
+        ('ASGI, sync views', '', lambda requests: run_asgi(
+            asgi_application, requests, args.connections, delay)),
+        ('ASGI, async views', 'async/', lambda requests: run_asgi(
+            asgi_application, requests, args.connections, delay)),
+    ]
+    for label, prefix, run in cases:
+        requests = [(path.format(prefix=prefix), query) for path, query in requests_for(args, slugs)]
+        started = time.perf_counter()
+        codes = run(requests)
+        elapsed = time.perf_counter() - started
+        errors = sum(code != 200 for code in codes)
+        print(f'{label:<30} {len(codes) / elapsed:9.0f} req/s   ({errors} errors)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Concurrent checkouts on a few hot SKUs: oversell and orders/sec
+Compares the old read-check-save checkout with the conditional-UPDATE one
+Run: python benchmarks/checkout.py --threads 8 --orders 400 --skus 3
+"""
+import argparse
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+
+from utils import create_catalog, setup_django
+
+ADDRESS = {
+    'shipping_address': '1 Bench Road', 'shipping_city': 'Pune', 'shipping_state': 'MH',
+    'shipping_pincode': '411001', 'phone': '9999999999', 'payment_method': 'cod',
+}
+
+
+class FakeRequest:
+    def __init__(self, user):
+        self.user = user
+
+
+def legacy_checkout(user, lines):
+    """The checkout before conditional updates: check, then product.save()"""
+    from orders.models import Order, OrderItem
+    from products.models import Product
+
+    products = {product.pk: product for product in Product.objects.filter(pk__in=[pk for pk, _ in lines])}
+    for pk, quantity in lines:
+        if products[pk].stock < quantity:
+            return False
+    total = sum(products[pk].final_price * quantity for pk, quantity in lines)
+    order = Order.objects.create(order_number=f'LEGACY{uuid.uuid4().hex}',
+                                 user=user, total_amount=total, **ADDRESS)
+    for pk, quantity in lines:
+        product = products[pk]
+        OrderItem.objects.create(order=order, product=product, quantity=quantity,
+                                 price=product.final_price)
+        product.stock -= quantity
+        product.save()
+    return True
+
+
+def atomic_checkout(user, lines):
+    from orders.serializers import OrderCreateSerializer
+    from rest_framework.exceptions import ValidationError
+
+    data = dict(ADDRESS, items=[{'product': pk, 'quantity': quantity} for pk, quantity in lines])
+    serializer = OrderCreateSerializer(data=data, context={'request': FakeRequest(user)})
+    try:
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+    except ValidationError:
+        return False
+    return True
+
+
+def run(checkout, users, hot, args):
+    from django.db import connection
+
+    outcomes = Counter()
+    lock = threading.Lock()
+    start = threading.Barrier(args.threads)
+    per_thread = args.orders // args.threads
+
+    def worker(index):
+        rng = random.Random(index)
+        start.wait()
+        try:
+            for _ in range(per_thread):
+                skus = rng.sample(hot, min(args.lines, len(hot)))
+                lines = [(pk, rng.randint(1, 3)) for pk in skus]
+                try:
+                    outcome = 'placed' if checkout(users[index], lines) else 'rejected'
+                except Exception as exc:  # e.g. "database is locked" on SQLite
+                    outcome = type(exc).__name__
+                with lock:
+                    outcomes[outcome] += 1
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--orders', type=int, default=400, help='Checkouts per run, over all threads')
+    parser.add_argument('--skus', type=int, default=3, help='Hot products every checkout draws from')
+    parser.add_argument('--lines', type=int, default=2, help='Products per order')
+    parser.add_argument('--stock', type=int, default=300, help='Starting stock of each hot product')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db.models import Sum
+    from orders.models import OrderItem
+    from products.models import Product
+
+    create_catalog(args.skus)
+    hot = list(Product.objects.values_list('pk', flat=True)[:args.skus])
+    users = [
+        get_user_model().objects.create_user(username=f'bench-buyer-{i}',
+                                             email=f'bench-buyer-{i}@example.com', password='x')
+        for i in range(args.threads)
+    ]
+
+    for name, checkout in (('legacy', legacy_checkout), ('atomic', atomic_checkout)):
+        OrderItem.objects.all().delete()
+        Product.objects.filter(pk__in=hot).update(stock=args.stock, is_available=True)
+
+        outcomes, elapsed = run(checkout, users, hot, args)
+        sold = dict(OrderItem.objects.filter(product__in=hot).order_by()
+                    .values_list('product').annotate(Sum('quantity')))
+        stock = dict(Product.objects.filter(pk__in=hot).values_list('pk', 'stock'))
+        # Units promised to customers beyond what was on the shelf
+        oversold = sum(max(0, sold.get(pk, 0) - args.stock) for pk in hot)
+        lost_updates = sum(sold.get(pk, 0) - (args.stock - stock[pk]) for pk in hot)
+
+        summary = ', '.join(f'{key} {count}' for key, count in sorted(outcomes.items()))
+        print(f'{name:<8} {outcomes["placed"] / elapsed:8.1f} orders/s   {summary}')
+        print(f'{"":<8} oversold units {oversold}   stock decrements lost {lost_updates}   '
+              f'min stock {min(stock.values())}')
+
+
+if __name__ == '__main__':
+    main()
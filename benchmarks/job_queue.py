@@ -0,0 +1,54 @@
+"""
+Job queue throughput: enqueueing and workers draining the queue
+Compares single inserts with enqueue_many() and dequeue batch sizes / thread counts
+Run: python benchmarks/job_queue.py --jobs 5000
+"""
+import argparse
+import time
+
+from utils import setup_django
+
+
+def noop(index):
+    pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--jobs', type=int, default=5000)
+    parser.add_argument('--threads', default='1,4', help='Comma separated worker thread counts')
+    parser.add_argument('--batch-sizes', default='1,20,100', help='Comma separated dequeue batch sizes')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import transaction
+    from jobs.models import Job
+    from jobs.queue import enqueue, enqueue_many
+    from jobs.worker import run_threads
+
+    started = time.perf_counter()
+    with transaction.atomic():
+        for index in range(args.jobs):
+            enqueue('job_queue.noop', index)
+    print(f'{"enqueue()":<30} {args.jobs / (time.perf_counter() - started):9.0f} jobs/s')
+    Job.objects.all().delete()
+
+    started = time.perf_counter()
+    enqueue_many('job_queue.noop', [((index,), {}) for index in range(args.jobs)])
+    print(f'{"enqueue_many()":<30} {args.jobs / (time.perf_counter() - started):9.0f} jobs/s')
+    Job.objects.all().delete()
+
+    for threads in [int(value) for value in args.threads.split(',')]:
+        for batch_size in [int(value) for value in args.batch_sizes.split(',')]:
+            enqueue_many('job_queue.noop', [((index,), {}) for index in range(args.jobs)])
+            started = time.perf_counter()
+            processed = run_threads(threads, burst=True, batch_size=batch_size, poll_interval=0.01)
+            elapsed = time.perf_counter() - started
+            left = Job.objects.count()
+            label = f'{threads} threads, batch {batch_size}'
+            print(f'{label:<30} {processed / elapsed:9.0f} jobs/s   ({left} left)')
+            Job.objects.all().delete()
+
+
+if __name__ == '__main__':
+    main()
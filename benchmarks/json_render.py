@@ -0,0 +1,70 @@
+"""
+Render time and peak memory of JSON product pages:
+DRF's stdlib JSONRenderer vs core.renderers (orjson when installed),
+and the same products streamed by GET /api/products/?paginate=stream
+Run: python benchmarks/json_render.py --items 1000
+"""
+import argparse
+import tracemalloc
+from collections import OrderedDict
+
+from utils import create_catalog, disable_throttling, measure, report, setup_django
+
+
+def peak_memory(func):
+    """Peak Python allocations (KiB) while func runs"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=1000, help='Products per page')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from core import renderers
+    from products.models import Product
+    from products.serializers import ProductListSerializer
+    from products.views import ProductListView
+
+    create_catalog(args.items)
+    request = Request(APIRequestFactory().get('/api/products/'))
+    products = Product.objects.select_related('category', 'vendor')[:args.items]
+    page = OrderedDict([
+        ('count', args.items), ('next', None), ('previous', None),
+        ('results', ProductListSerializer(products, many=True, context={'request': request}).data),
+    ])
+
+    disable_throttling(ProductListView)
+    client = Client()
+
+    def stream():
+        # Reads, serializes and encodes JSON_STREAM_CHUNK_SIZE rows at a time
+        for _ in client.get('/api/products/?paginate=stream').streaming_content:
+            pass
+
+    cases = [
+        ('stdlib JSONRenderer', lambda: JSONRenderer().render(page)),
+        ('FastJSONRenderer', lambda: renderers.FastJSONRenderer().render(page)),
+        # Includes the queries and serialization the two above were handed for free
+        ('streamed ?paginate=stream', stream),
+    ]
+    encoder = 'orjson' if renderers.orjson else 'stdlib fallback'
+    print(f'{args.items} products per page, core.renderers using {encoder}')
+    for label, func in cases:
+        report(label, measure(func, repeat=args.repeat))
+        print(f'{"":<40} peak memory {peak_memory(func):9.0f} KiB')
+
+
+if __name__ == '__main__':
+    main()
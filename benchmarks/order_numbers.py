@@ -0,0 +1,70 @@
+"""
+Order inserts with random vs time-ordered order numbers
+Random numbers hit random pages of the unique index, time-ordered ones
+append to its right edge - the gap grows with the table
+Run: python benchmarks/order_numbers.py --existing 200000 --rows 20000
+"""
+import argparse
+import time
+
+from utils import setup_django
+
+
+def insert_orders(user, generator, count, batch_size):
+    """Insert count orders, batch_size per transaction; returns orders/sec"""
+    from django.db import transaction
+    from orders.models import Order
+
+    started = time.perf_counter()
+    for offset in range(0, count, batch_size):
+        with transaction.atomic():
+            for _ in range(min(batch_size, count - offset)):
+                Order.objects.create(
+                    order_number=generator(), user=user, shipping_address='1 Bench Road',
+                    shipping_city='Pune', shipping_state='MH', shipping_pincode='411001',
+                    phone='9999999999', total_amount=0,
+                )
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--existing', type=int, default=200000, help='Orders already in the table')
+    parser.add_argument('--rows', type=int, default=20000, help='Orders inserted and timed')
+    parser.add_argument('--batch-size', type=int, default=100, help='Orders per transaction')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from orders.models import Order
+    from orders.numbers import RandomGenerator, TimeOrderedGenerator
+
+    user = get_user_model().objects.create_user(
+        username='bench-customer', email='bench-customer@example.com', password='x'
+    )
+    for name, generator in (('random', RandomGenerator()), ('time-ordered', TimeOrderedGenerator())):
+        Order.objects.all().delete()
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+        for offset in range(0, args.existing, 10000):
+            Order.objects.bulk_create([
+                Order(order_number=generator(), user=user, shipping_address='1 Bench Road',
+                      shipping_city='Pune', shipping_state='MH', shipping_pincode='411001',
+                      phone='9999999999', total_amount=0)
+                for _ in range(min(10000, args.existing - offset))
+            ])
+
+        started = time.perf_counter()
+        for _ in range(100000):
+            generator()
+        per_number = (time.perf_counter() - started) / 100000 * 1e6
+
+        rate = insert_orders(user, generator, args.rows, args.batch_size)
+        print(f'{name:<14} {rate:9.0f} orders/s   {per_number:5.2f} us per number   '
+              f'e.g. {generator()}')
+
+
+if __name__ == '__main__':
+    main()
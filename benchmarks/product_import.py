@@ -0,0 +1,62 @@
+"""
+Throughput of the streaming product importer (create, update, unchanged)
+Run: python benchmarks/product_import.py --rows 50000
+"""
+import argparse
+import csv
+import os
+import random
+import resource
+import tempfile
+import time
+
+from utils import WORDS, sentence, setup_django
+
+COLUMNS = ['name', 'slug', 'description', 'category', 'price', 'discount_price',
+           'stock', 'is_available']
+
+
+def write_catalog(path, rows, category, price_offset=0):
+    rng = random.Random(7)
+    with open(path, 'w', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(COLUMNS)
+        for i in range(rows):
+            writer.writerow([
+                f'{rng.choice(WORDS).title()} item {i}', f'import-item-{i}', sentence(rng, 20),
+                category, f'{rng.randint(100, 99999) / 100 + price_offset:.2f}', '',
+                rng.randint(0, 100), 'true',
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from products.importer import ProductImporter, iter_rows
+    from products.models import Category
+
+    vendor = get_user_model().objects.create_user(
+        username='import-vendor', email='import-vendor@example.com', password='x', role='vendor'
+    )
+    category = Category.objects.create(name='Imported')
+    path = os.path.join(tempfile.mkdtemp(), 'catalog.csv')
+
+    for label, price_offset in (('create', 0), ('update', 1), ('unchanged', 1)):
+        write_catalog(path, args.rows, category.name, price_offset)
+        started = time.perf_counter()
+        with open(path, 'rb') as stream:
+            report = ProductImporter(vendor, batch_size=args.batch_size).run(iter_rows(stream, 'csv'))
+        elapsed = time.perf_counter() - started
+        # ru_maxrss is in KiB on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f'{label:<10} {args.rows / elapsed:10.0f} rows/s   max RSS {peak:6.1f} MiB   '
+              f'{ {key: value for key, value in report.items() if key != "errors"} }')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+Compare ?search= (LIKE scans) with ranked ?q= full-text search
+Run: python benchmarks/search.py --products 1000000
+"""
+import argparse
+
+from utils import create_catalog, disable_throttling, measure, report, setup_django
+
+QUERIES = ['wireless', 'leather shoes', 'portable speaker', 'organic cotton shirt']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.test import APIClient
+    from products.search import get_search_backend
+    from products.views import ProductListView
+
+    print(f'Creating {args.products} products...')
+    create_catalog(args.products)
+    backend = get_search_backend()
+    print(f'Indexing with {backend.__class__.__name__}...')
+    backend.rebuild(batch_size=5000)
+
+    disable_throttling(ProductListView)
+    client = APIClient()
+    for query in QUERIES:
+        for param in ('search', 'q'):
+            timings = measure(lambda: client.get('/api/products/', {param: query}),
+                              repeat=args.repeat)
+            report(f'?{param}={query}', timings)
+
+
+if __name__ == '__main__':
+    main()
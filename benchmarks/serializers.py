@@ -0,0 +1,73 @@
+"""
+DRF serializers vs the compiled .values() serializers (core.compiled)
+Times a whole page (query + serialization) and reports the cost per row
+Run: python benchmarks/serializers.py --rows 1000
+"""
+import argparse
+import random
+
+from utils import create_catalog, measure, report, setup_django
+
+
+def create_orders(count, products, seed=7):
+    from django.contrib.auth import get_user_model
+    from orders.models import Order, OrderItem
+
+    rng = random.Random(seed)
+    customer = get_user_model().objects.create_user(
+        username='bench-customer', email='bench-customer@example.com', password='x'
+    )
+    orders = Order.objects.bulk_create([
+        Order(order_number=f'BENCH{i:08d}', user=customer, shipping_address='1 Bench Road',
+              shipping_city='Pune', shipping_state='MH', shipping_pincode='411001',
+              phone='9999999999', total_amount=0)
+        for i in range(count)
+    ])
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=product, quantity=rng.randint(1, 5), price=product.price)
+        for order in orders
+        for product in rng.sample(products, 3)
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000, help='Rows per page')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from orders.models import Order
+    from orders.serializers import CompiledOrderSerializer, OrderSerializer
+    from products.models import Product
+    from products.serializers import CompiledProductListSerializer, ProductListSerializer
+
+    create_catalog(args.rows)
+    create_orders(args.rows, list(Product.objects.all()[:200]))
+    context = {'request': Request(APIRequestFactory().get('/api/products/'))}
+
+    products = Product.objects.select_related('category', 'vendor')[:args.rows]
+    orders = Order.objects.select_related('user').prefetch_related('items__product')
+
+    cases = [
+        ('products', lambda: ProductListSerializer(list(products), many=True, context=context).data,
+         CompiledProductListSerializer, Product.objects.all()),
+        ('orders', lambda: OrderSerializer(list(orders[:args.rows]), many=True, context=context).data,
+         CompiledOrderSerializer, Order.objects.all()),
+    ]
+    for label, drf, compiled_class, queryset in cases:
+        def compiled():
+            serializer = compiled_class(context)
+            return serializer.serialize(serializer.values(queryset)[:args.rows])
+
+        for name, func in (('drf', drf), ('compiled', compiled)):
+            timings = measure(func, repeat=args.repeat)
+            report(f'{label} {name} ({args.rows} rows)', timings)
+            per_row = sorted(timings)[len(timings) // 2] / args.rows * 1e6
+            print(f'{"":<40} {per_row:9.1f} us/row')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Rate throttle cost per check and limits across worker processes:
+DRF's AnonRateThrottle (timestamp list in the local memory cache)
+vs core.throttling (token bucket in the shared SQLite store)
+Run: python benchmarks/throttle.py --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+
+from utils import measure, report, setup_django
+
+
+class View:
+    """Stand-in view without a throttle scope"""
+
+
+def anon_request():
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    request = Request(APIRequestFactory().get('/api/products/', REMOTE_ADDR='10.0.0.1'))
+    request.user  # Resolve authentication once, as the view does before throttling
+    return request
+
+
+def make_throttle(kind, rate):
+    from rest_framework import throttling as drf_throttling
+    from core import throttling
+    base = drf_throttling.AnonRateThrottle if kind == 'drf' else throttling.AnonRateThrottle
+    return type('BenchThrottle', (base,), {'rate': rate})()
+
+
+def allowed_in_child(kind, rate, checks, results):
+    import django
+    django.setup()
+    request, view = anon_request(), View()
+    throttle = make_throttle(kind, rate)
+    results.put(sum(throttle.allow_request(request, view) for _ in range(checks)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--limit', type=int, default=100, help='Requests allowed per hour')
+    parser.add_argument('--checks', type=int, default=300, help='Checks per process')
+    parser.add_argument('--history', default='10,1000,10000', help='Comma separated prior requests')
+    args = parser.parse_args()
+
+    os.environ['THROTTLE_STORE_LOCATION'] = os.path.join(tempfile.mkdtemp(), 'throttle.sqlite3')
+    setup_django()
+    from django.core.cache import cache
+    from core.throttling import get_throttle_store
+
+    request, view = anon_request(), View()
+    print('Cost per check after N earlier requests from the same client')
+    for history in [int(value) for value in args.history.split(',')]:
+        for kind in ('drf', 'bucket'):
+            cache.clear()
+            get_throttle_store().clear()
+            throttle = make_throttle(kind, '1000000/day')
+            for _ in range(history):
+                throttle.allow_request(request, view)
+            label = f'{"DRF list" if kind == "drf" else "token bucket"}, {history} earlier'
+            report(label, measure(lambda: throttle.allow_request(request, view), repeat=200))
+
+    print(f'\n{args.processes} processes x {args.checks} checks, limit {args.limit}/hour')
+    context = multiprocessing.get_context('fork')
+    for kind in ('drf', 'bucket'):
+        cache.clear()
+        get_throttle_store().clear()
+        results = context.Queue()
+        children = [context.Process(target=allowed_in_child,
+                                    args=(kind, f'{args.limit}/hour', args.checks, results))
+                    for _ in range(args.processes)]
+        for child in children:
+            child.start()
+        allowed = sum(results.get() for _ in children)
+        for child in children:
+            child.join()
+        label = 'DRF list (per-process cache)' if kind == 'drf' else 'token bucket (shared store)'
+        print(f'{label:<40} {allowed:6} allowed')
+
+
+if __name__ == '__main__':
+    main()
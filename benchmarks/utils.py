@@ -0,0 +1,106 @@
+"""
+Shared helpers for the benchmark scripts in this folder
+Every benchmark runs against a throwaway SQLite database unless
+BENCH_DB_NAME points somewhere else
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = (
+    'wireless bluetooth cotton leather steel wooden smart portable organic '
+    'premium classic slim ultra mini pro max lite eco travel kitchen office '
+    'gaming sports outdoor kids vintage modern handmade waterproof charger '
+    'headphones shirt shoes watch lamp bottle bag chair desk phone speaker'
+).split()
+
+
+def setup_django():
+    """Point Django at a scratch database, migrate it and return the path"""
+    sys.path.insert(0, BASE_DIR)
+    db_name = os.environ.get('BENCH_DB_NAME') or os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    os.environ['DB_NAME'] = db_name
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    return db_name
+
+
+def disable_throttling(*views):
+    """Benchmarks hammer the API far past the anon/user rate limits"""
+    for view in views:
+        view.throttle_classes = []
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def create_catalog(products, batch_size=5000, seed=42):
+    """
+    Bulk-create a synthetic catalog of `products` items
+    Skips signals, so rebuild derived data (search index etc.) afterwards
+    """
+    from django.contrib.auth import get_user_model
+    from products.models import Category, Product
+
+    User = get_user_model()
+    rng = random.Random(seed)
+    vendor, _ = User.objects.get_or_create(
+        email='bench-vendor@example.com',
+        defaults={'username': 'bench-vendor', 'role': 'vendor'},
+    )
+    categories = [
+        Category.objects.get_or_create(name=f'Bench category {i}')[0] for i in range(20)
+    ]
+
+    start = Product.objects.count()
+    for offset in range(0, products, batch_size):
+        batch = []
+        for i in range(start + offset, start + min(offset + batch_size, products)):
+            price = rng.randint(100, 100000) / 100
+            batch.append(Product(
+                name=sentence(rng, 3).title(),
+                slug=f'bench-product-{i}',
+                description=sentence(rng, 30),
+                category=rng.choice(categories),
+                price=price,
+                discount_price=price * 0.9 if rng.random() < 0.3 else None,
+                stock=rng.randint(0, 500),
+                image='products/bench.jpg',
+                vendor=vendor,
+                views=rng.randint(0, 10000),
+            ))
+        Product.objects.bulk_create(batch)
+    return vendor
+
+
+def measure(func, repeat=20, warmup=2):
+    """Run func repeatedly and return the wall-clock timings in seconds"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def report(label, timings):
+    """Print median / p95 of a list of timings"""
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f'{label:<40} median {statistics.median(ordered) * 1000:9.2f} ms   '
+          f'p95 {p95 * 1000:9.2f} ms')
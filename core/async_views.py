@@ -0,0 +1,189 @@
+"""
+Async read endpoints for ASGI deployments
+
+Under ASGI a sync DRF view holds a worker thread for the whole request,
+including the time spent waiting on the client. The mixins here turn a
+DRF generic view into a coroutine view for GET requests: JWT
+authentication, throttling, pagination and the response cache await the
+async ORM and cache APIs (aget, aiterator, acount, cache.aget ...), so a
+thread is only busy while a query runs.
+
+Everything else comes from the sync view the mixin is combined with -
+queryset, filters, serializer, sparse fieldsets, permissions - so both
+answer alike:
+
+    class AsyncProductListView(AsyncCachedResponseMixin, AsyncListMixin, ProductListView):
+        pass
+
+Pieces with no async counterpart still work: a filter or serializer field
+that turns out to query is re-run in a thread, and authenticators,
+throttles or paginators without an a*() method are called in a thread
+(session authentication is skipped - it needs the sync ORM).
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import SynchronousOnlyOperation, ValidationError
+from django.http import Http404, HttpResponse
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+async def alist(queryset):
+    """Evaluate a queryset from async code"""
+    if queryset._prefetch_related_lookups:
+        # aiterator() can't prefetch before Django 5.0
+        return [obj async for obj in queryset]
+    return [obj async for obj in queryset.aiterator()]
+
+
+async def in_loop_or_thread(func, *args):
+    """
+    Call func in the event loop, or again in a thread if it turns out to query
+    Only for calls without side effects (building querysets, serializing)
+    """
+    try:
+        return func(*args)
+    except SynchronousOnlyOperation:
+        return await sync_to_async(func)(*args)
+
+
+class AsyncAPIViewMixin:
+    """
+    Async dispatch for a DRF view serving GET (and HEAD / OPTIONS) only
+    Subclasses implement the async get()
+    """
+    http_method_names = ['get', 'head', 'options']
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.aperform_authentication(request)
+            self.initial(request, *args, **kwargs)  # request.user is set, nothing left to authenticate
+            await self.acheck_throttles(request)
+
+            method = request.method.lower()
+            if method in self.http_method_names:
+                handler = getattr(self, method, self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if not isinstance(response, HttpResponse):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return await self.arender(self.response)
+
+    async def aperform_authentication(self, request):
+        """Request._authenticate() with the authenticators' aauthenticate()"""
+        for authenticator in request.authenticators:
+            aauthenticate = getattr(authenticator, 'aauthenticate', None)
+            if aauthenticate is None:
+                continue
+            try:
+                user_auth_tuple = await aauthenticate(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+        request._not_authenticated()
+
+    def check_throttles(self, request):
+        # Throttles are checked by acheck_throttles() once initial() is done
+        pass
+
+    async def acheck_throttles(self, request):
+        durations = []
+        for throttle in self.get_throttles():
+            aallow_request = getattr(throttle, 'aallow_request', None)
+            if aallow_request is not None:
+                allowed = await aallow_request(request, self)
+            else:
+                allowed = await sync_to_async(throttle.allow_request)(request, self)
+            if not allowed:
+                durations.append(throttle.wait())
+        if durations:
+            durations = [duration for duration in durations if duration is not None]
+            self.throttled(request, max(durations, default=None))
+
+    async def arender(self, response):
+        """
+        Render a DRF Response into a plain HttpResponse, so the ASGI handler
+        has nothing left to render in a thread
+        """
+        if not isinstance(response, Response):
+            return response
+        if isinstance(response.accepted_renderer, JSONRenderer):
+            response.render()
+        else:
+            # The browsable API builds forms, which may query
+            await sync_to_async(response.render)()
+
+        rendered = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        return rendered
+
+
+class AsyncListMixin(AsyncAPIViewMixin):
+    """Async twin of ListModelMixin (and CompiledListMixin when the view has it)"""
+
+    async def get(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await in_loop_or_thread(self.filter_queryset, self.get_queryset())
+
+        compiled = self.get_compiled_serializer() if hasattr(self, 'get_compiled_serializer') else None
+        if compiled is not None:
+            queryset = compiled.values(queryset, *self.get_ordering_columns())
+            serialize = compiled.serialize
+        else:
+            def serialize(rows):
+                return self.get_serializer(rows, many=True).data
+
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(await in_loop_or_thread(serialize, page))
+        return Response(await in_loop_or_thread(serialize, await alist(queryset)))
+
+    async def apaginate_queryset(self, queryset):
+        paginator = self.paginator
+        if paginator is None:
+            return None
+        if hasattr(paginator, 'apaginate_queryset'):
+            return await paginator.apaginate_queryset(queryset, self.request, view=self)
+        return await sync_to_async(paginator.paginate_queryset)(queryset, self.request, view=self)
+
+
+class AsyncRetrieveMixin(AsyncAPIViewMixin):
+    """Async twin of RetrieveModelMixin"""
+
+    async def get(self, request, *args, **kwargs):
+        return await self.aretrieve(request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(await in_loop_or_thread(lambda: serializer.data))
+
+    async def aget_object(self):
+        """GenericAPIView.get_object() with aget()"""
+        queryset = await in_loop_or_thread(self.filter_queryset, self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.aget(**filter_kwargs)
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
@@ -0,0 +1,267 @@
+"""
+Versioned response cache for read-heavy endpoints
+
+Cache keys embed a generation number per model ('product', 'category',
+'review', ...). Signal handlers bump a generation whenever one of those
+models changes, so every cached response that depends on it is skipped
+from then on and simply expires. Misses on the same key are coalesced:
+one request renders the response while the others wait for it.
+
+Works with any Django cache backend (local memory, file based, Redis...).
+AsyncCachedResponseMixin does the same for the async views through the
+cache's async API.
+"""
+import asyncio
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+GENERATION_PREFIX = 'generation'
+STATS_PREFIX = 'response_cache:stats'
+STATS = ('hits', 'misses', 'coalesced')
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _generation_key(name):
+    return f'{GENERATION_PREFIX}:{name}'
+
+
+def _initial_generation():
+    # Time based, so an evicted counter never restarts at a value used before
+    return int(time.time() * 1000)
+
+
+def get_generations(names):
+    """Current generation numbers for the given model names"""
+    keys = [_generation_key(name) for name in names]
+    found = cache.get_many(keys)
+    generations = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial_generation(), timeout=None)
+            found[key] = cache.get(key)
+        generations.append(found[key])
+    return generations
+
+
+async def aget_generations(names):
+    """get_generations() for async code"""
+    keys = [_generation_key(name) for name in names]
+    found = await cache.aget_many(keys)
+    generations = []
+    for key in keys:
+        if key not in found:
+            await cache.aadd(key, _initial_generation(), timeout=None)
+            found[key] = await cache.aget(key)
+        generations.append(found[key])
+    return generations
+
+
+def bump_generation(*names):
+    """Invalidate every cached response that depends on these models"""
+    for name in names:
+        key = _generation_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_generation(), timeout=None)
+
+
+def _record(stat):
+    key = f'{STATS_PREFIX}:{stat}'
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+async def _arecord(stat):
+    key = f'{STATS_PREFIX}:{stat}'
+    if not await cache.aadd(key, 1, timeout=None):
+        try:
+            await cache.aincr(key)
+        except ValueError:
+            await cache.aset(key, 1, timeout=None)
+
+
+def get_stats():
+    """Hit, miss and coalesced counts since the cache was last cleared"""
+    found = cache.get_many([f'{STATS_PREFIX}:{stat}' for stat in STATS])
+    return {stat: found.get(f'{STATS_PREFIX}:{stat}', 0) for stat in STATS}
+
+
+def get_or_compute(key, compute, timeout, lock_timeout):
+    """
+    Return (value, outcome) where outcome is 'HIT', 'MISS' or 'COALESCED'
+    compute() may return None for values that should not be cached
+    """
+    value = cache.get(key)
+    if value is not None:
+        _record('hits')
+        return value, 'HIT'
+
+    lock_key = f'{key}:lock'
+    locked = cache.add(lock_key, 1, timeout=lock_timeout)
+    if not locked:
+        # Someone else is already rendering this key - wait for their result
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            value = cache.get(key)
+            if value is not None:
+                _record('coalesced')
+                return value, 'COALESCED'
+        # Lock holder is too slow or gone - render it ourselves
+
+    try:
+        value = compute()
+        if value is not None:
+            cache.set(key, value, timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    _record('misses')
+    return value, 'MISS'
+
+
+async def aget_or_compute(key, compute, timeout, lock_timeout):
+    """get_or_compute() for async code: compute is a coroutine function"""
+    value = await cache.aget(key)
+    if value is not None:
+        await _arecord('hits')
+        return value, 'HIT'
+
+    lock_key = f'{key}:lock'
+    locked = await cache.aadd(lock_key, 1, timeout=lock_timeout)
+    if not locked:
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            value = await cache.aget(key)
+            if value is not None:
+                await _arecord('coalesced')
+                return value, 'COALESCED'
+
+    try:
+        value = await compute()
+        if value is not None:
+            await cache.aset(key, value, timeout)
+    finally:
+        if locked:
+            await cache.adelete(lock_key)
+    await _arecord('misses')
+    return value, 'MISS'
+
+
+def _response_key(request, prefix, generations):
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values if value != ''
+    )
+    url = f'{request.get_host()}{request.path}?{urlencode(params)}'
+    digest = hashlib.md5(url.encode()).hexdigest()
+    user = request.user
+    viewer = getattr(user, 'role', 'user') if user and user.is_authenticated else 'anon'
+    versions = '.'.join(str(generation) for generation in generations)
+    return f'response:{prefix}:{viewer}:{versions}:{digest}'
+
+
+def response_cache_key(request, prefix, generations):
+    """Key from host, path, sorted non-empty query params, viewer class and generations"""
+    return _response_key(request, prefix, get_generations(generations))
+
+
+async def aresponse_cache_key(request, prefix, generations):
+    return _response_key(request, prefix, await aget_generations(generations))
+
+
+class CachedResponseMixin:
+    """
+    Cache successful GET responses of a DRF view
+    Set cache_generations to the models whose changes invalidate the response
+    """
+    cache_generations = ()
+    cache_timeout = None
+
+    def get(self, request, *args, **kwargs):
+        if not self.cache_generations or not settings.RESPONSE_CACHE_ENABLED or \
+                not self.is_cacheable(request):
+            return super().get(request, *args, **kwargs)
+
+        response = None
+
+        def render():
+            nonlocal response
+            response = super(CachedResponseMixin, self).get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return None
+            return self.cache_payload(response)
+
+        key = response_cache_key(request, self.__class__.__name__, self.cache_generations)
+        payload, outcome = get_or_compute(
+            key, render,
+            timeout=self.cache_timeout or settings.RESPONSE_CACHE_TIMEOUT,
+            lock_timeout=settings.RESPONSE_CACHE_LOCK_TIMEOUT,
+        )
+        if response is None:
+            self.cache_hit(request, payload)
+            response = Response(payload['data'], status=payload['status'])
+        response['X-Cache'] = outcome
+        return response
+
+    def cache_payload(self, response):
+        """
+        What gets cached for a fresh response - add anything cache_hit() needs
+        here rather than reading it from the (possibly ?fields= trimmed) data
+        """
+        return {'data': response.data, 'status': response.status_code}
+
+    def cache_hit(self, request, payload):
+        """Hook for side effects that must run even when the cache answers"""
+
+    def is_cacheable(self, request):
+        """Hook to bypass the cache for some requests"""
+        return True
+
+
+class AsyncCachedResponseMixin(CachedResponseMixin):
+    """
+    CachedResponseMixin for the async views (core.async_views)
+    Goes before the async view mixin: AsyncCachedResponseMixin, AsyncListMixin, SomeListView
+    """
+
+    async def get(self, request, *args, **kwargs):
+        if not self.cache_generations or not settings.RESPONSE_CACHE_ENABLED or \
+                not self.is_cacheable(request):
+            return await super().get(request, *args, **kwargs)
+
+        response = None
+
+        async def render():
+            nonlocal response
+            response = await super(AsyncCachedResponseMixin, self).get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return None
+            return self.cache_payload(response)
+
+        key = await aresponse_cache_key(request, self.__class__.__name__, self.cache_generations)
+        payload, outcome = await aget_or_compute(
+            key, render,
+            timeout=self.cache_timeout or settings.RESPONSE_CACHE_TIMEOUT,
+            lock_timeout=settings.RESPONSE_CACHE_LOCK_TIMEOUT,
+        )
+        if response is None:
+            await self.acache_hit(request, payload)
+            response = Response(payload['data'], status=payload['status'])
+        response['X-Cache'] = outcome
+        return response
+
+    async def acache_hit(self, request, payload):
+        """Async cache_hit() - override both when the hook does I/O"""
+        self.cache_hit(request, payload)
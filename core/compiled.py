@@ -0,0 +1,274 @@
+"""
+Compiled read-only serializers for list endpoints
+
+A CompiledSerializer mirrors a ModelSerializer but reads plain .values()
+rows: field names, order and sources are taken from the DRF serializer
+once, each field gets a precomputed converter (decimal quantizing, local
+datetimes, media URLs) and every row is then turned into a dict in a
+single loop - no model instances, no per-field method dispatch. The
+rendered JSON is the same as the DRF serializer's.
+
+Subclasses describe what isn't a plain column:
+    computed = {'final_price': (['price', 'discount_price'], 'get_final_price')}
+    nested = {'items': CompiledOrderItemSerializer}  # reverse relations
+Set COMPILED_SERIALIZERS = False to go back to the DRF serializers.
+
+Unpaginated lists and ?paginate=stream requests are streamed: rows come
+from .values().iterator() and are serialized and encoded
+JSON_STREAM_CHUNK_SIZE at a time, so the whole list is never in memory.
+"""
+import decimal
+from collections import defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.http import StreamingHttpResponse
+from django.utils.encoding import filepath_to_uri
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .renderers import FastJSONRenderer, iter_json_list
+
+CHILD_BATCH = 500
+
+
+def decimal_converter(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if field.localize or field.decimal_places is None:
+        return field.to_representation
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        value = value.quantize(exponent, rounding=rounding, context=context)
+        return '{:f}'.format(value) if coerce_to_string else value
+    return convert
+
+
+def datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = getattr(field, 'timezone', None) or field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if timezone.is_aware(value):
+            value = value.astimezone(field_timezone)
+        else:
+            value = timezone.make_aware(value, field_timezone)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def file_converter(field, storage, request):
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        return lambda name: name or None
+
+    base_url = getattr(storage, 'base_url', None)
+    if isinstance(storage, FileSystemStorage) and base_url and base_url.startswith('/'):
+        # What storage.url() + build_absolute_uri() return, without the urljoin per row
+        prefix = request.build_absolute_uri(base_url) if request is not None else base_url
+
+        def convert(name):
+            return prefix + filepath_to_uri(name).lstrip('/') if name else None
+        return convert
+
+    url = storage.url
+    absolute = request.build_absolute_uri if request is not None else None
+
+    def convert(name):
+        if not name:
+            return None
+        return absolute(url(name)) if absolute else url(name)
+    return convert
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _model_field(model, path):
+    """Model field at the end of a values() path such as product__image"""
+    parts = path.split('__')
+    for part in parts[:-1]:
+        model = model._meta.get_field(part).related_model
+    return model._meta.get_field(parts[-1])
+
+
+class CompiledSerializer:
+    """
+    Read-only twin of serializer_class working on .values() rows
+    Build one per request (converters capture the request for absolute URLs)
+    """
+    serializer_class = None
+    computed = {}
+    nested = {}
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        self.request = self.context.get('request')
+        self.model = self.serializer_class.Meta.model
+        self.columns = ['pk']
+        self.children = []
+        self.plan = []
+
+        for name, field in self.serializer_class(context=self.context).fields.items():
+            if field.write_only:
+                continue
+            if name in self.nested:
+                relation = self.model._meta.get_field(field.source)
+                child = self.nested[name](self.context)
+                self.children.append((name, child, relation.field.attname))
+                self.plan.append((name, itemgetter(name), None))
+                continue
+            if name in self.computed:
+                columns, method = self.computed[name]
+                self.columns.extend(columns)
+                getter = getattr(self, method)
+            else:
+                column = field.source.replace('.', '__')
+                self.columns.append(column)
+                getter = itemgetter(column)
+            self.plan.append((name, getter, self.converter_for(field, name)))
+
+        self.columns = list(dict.fromkeys(self.columns))
+
+    def converter_for(self, field, name):
+        """Function turning a raw column value into the field's output (None = as is)"""
+        # Database values already have the type these fields output
+        if isinstance(field, (serializers.SerializerMethodField, serializers.ReadOnlyField,
+                              serializers.BooleanField, serializers.CharField,
+                              serializers.IntegerField, serializers.FloatField,
+                              serializers.PrimaryKeyRelatedField)):
+            return None
+        if isinstance(field, serializers.DecimalField):
+            return decimal_converter(field)
+        if isinstance(field, serializers.DateTimeField):
+            return datetime_converter(field)
+        if isinstance(field, serializers.FileField):
+            if name in self.computed:
+                storage = default_storage
+            else:
+                storage = _model_field(self.model, field.source.replace('.', '__')).storage
+            return file_converter(field, storage, self.request)
+        if isinstance(field, serializers.ChoiceField):
+            choices = field.choice_strings_to_values
+            return lambda value: value if value == '' else choices.get(str(value), value)
+        return field.to_representation
+
+    def values(self, queryset, *extra):
+        """The queryset as .values() rows with every column this serializer reads"""
+        columns = list(dict.fromkeys(self.columns + list(extra)))
+        return queryset.select_related(None).prefetch_related(None).values(*columns)
+
+    def to_representation(self, row):
+        data = {}
+        for name, getter, converter in self.plan:
+            value = getter(row)
+            if converter is not None and value is not None:
+                value = converter(value)
+            data[name] = value
+        return data
+
+    def attach_children(self, rows):
+        """Fetch nested lists for all rows at once and store them on the rows"""
+        for name, child, foreign_key in self.children:
+            ids = [row['pk'] for row in rows]
+            grouped = defaultdict(list)
+            for start in range(0, len(ids), CHILD_BATCH):
+                queryset = child.model._default_manager.filter(
+                    **{f'{foreign_key}__in': ids[start:start + CHILD_BATCH]}
+                )
+                child_rows = list(child.values(queryset, foreign_key))
+                for child_row, data in zip(child_rows, child.serialize(child_rows)):
+                    grouped[child_row[foreign_key]].append(data)
+            for row in rows:
+                row[name] = grouped.get(row['pk'], [])
+
+    def serialize(self, rows):
+        rows = list(rows)
+        if self.children and rows:
+            self.attach_children(rows)
+        return [self.to_representation(row) for row in rows]
+
+
+class CompiledListMixin:
+    """
+    List view mixin serving GET lists through compiled_serializer_class
+    Falls back to the DRF serializer when COMPILED_SERIALIZERS is off
+    or ?fields= / ?expand= ask for a different shape
+    Unpaginated lists and ?paginate=stream are streamed as compact JSON
+    """
+    compiled_serializer_class = None
+    stream_query_value = 'stream'
+
+    def get_compiled_serializer(self):
+        if self.compiled_serializer_class is None or not settings.COMPILED_SERIALIZERS:
+            return None
+        fieldset = getattr(self, 'get_fieldset', lambda: (None, None))()
+        if any(fieldset):
+            return None
+        return self.compiled_serializer_class(self.get_serializer_context())
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        if self.should_stream(request):
+            return self.stream_list(self.filter_queryset(self.get_queryset()), compiled)
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = compiled.values(self.filter_queryset(self.get_queryset()), *self.get_ordering_columns())
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(compiled.serialize(page))
+        return Response(compiled.serialize(rows))
+
+    def get_ordering_columns(self):
+        """Columns the view can order by, so keyset cursors can be built from the rows"""
+        names = list(getattr(self, 'ordering', None) or [])
+        ordering_fields = getattr(self, 'ordering_fields', None)
+        if isinstance(ordering_fields, (list, tuple)):
+            names += ordering_fields
+        return [name.lstrip('-') for name in names]
+
+    def should_stream(self, request):
+        """Stream when nothing pages the list (or ?paginate=stream) and compact JSON was negotiated"""
+        renderer = getattr(request, 'accepted_renderer', None)
+        if not isinstance(renderer, FastJSONRenderer) or \
+                renderer.get_indent(request.accepted_media_type, {}):
+            return False
+        if self.paginator is None:
+            return True
+        mode_param = getattr(self.paginator, 'mode_query_param', None)
+        return mode_param is not None and request.query_params.get(mode_param) == self.stream_query_value
+
+    def stream_list(self, queryset, compiled):
+        """The whole list as a JSON array, read, serialized and encoded chunk by chunk"""
+        chunk_size = settings.JSON_STREAM_CHUNK_SIZE
+        if compiled is not None:
+            rows = compiled.values(queryset).iterator(chunk_size=chunk_size)
+            chunks = (compiled.serialize(chunk) for chunk in _chunks(rows, chunk_size))
+        else:
+            # ?fields= / ?expand= - the DRF serializer, prefetching per chunk
+            instances = queryset.iterator(chunk_size=chunk_size)
+            chunks = (self.get_serializer(chunk, many=True).data for chunk in _chunks(instances, chunk_size))
+        return StreamingHttpResponse(iter_json_list(chunks),
+                                     content_type=self.request.accepted_renderer.media_type)
@@ -0,0 +1,152 @@
+"""
+Sparse fieldsets and on-demand expansion for read endpoints
+
+    ?fields=id,name,slug     only these fields are serialized
+    ?expand=category         nest the related object instead of its id
+
+The queryset is then planned from the fields that are left: only() the
+columns they read, select_related() the foreign keys they follow and
+prefetch_related() the nested lists, so skipped fields cost neither
+serializer work nor queries.
+
+Serializers describe what the planner can't see in Meta:
+    field_sources = {'final_price': ['price', 'discount_price']}  # method fields / properties
+    expandable_fields = {'category': 'products.serializers.CategorySerializer'}
+A field the planner can't resolve keeps every column loaded (no only()).
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _split(value):
+    return [part.strip() for part in (value or '').split(',') if part.strip()]
+
+
+def apply_fieldset(serializer, fields=None, expand=None):
+    """Expand and drop fields on a serializer instance (the child of a list serializer)"""
+    expand = expand or []
+    expandable = getattr(getattr(serializer, 'Meta', None), 'expandable_fields', {})
+    for name in expand:
+        if name in expandable:
+            serializer.fields[name] = import_string(expandable[name])(read_only=True)
+    if fields:
+        keep = set(fields) | set(expand)
+        for name in list(serializer.fields):
+            if name not in keep:
+                serializer.fields.pop(name)
+    return serializer
+
+
+def _follow(model, prefix, path, plan):
+    """
+    Record what reading `path` (a__b__c) from model needs
+    Returns False when the path doesn't end on a concrete column
+    """
+    parts = path.split('__')
+    for depth, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return False
+        lookup = prefix + '__'.join(parts[:depth + 1])
+        if field.many_to_many or field.one_to_many or (field.one_to_one and not field.concrete):
+            # Reverse or many-to-many relation read by a method field / property
+            plan['prefetch'].setdefault(lookup, lookup)
+            return True
+        if depth == len(parts) - 1:
+            plan['only'].add(lookup)
+            return True
+        if not field.is_relation:
+            return False
+        plan['select'].add(lookup)
+        plan['only'].add(lookup)
+        model = field.related_model
+    return True
+
+
+def _collect(serializer, model, prefix, plan):
+    """Walk the serializer's fields; returns False if some column needs are unknown"""
+    declared = getattr(getattr(serializer, 'Meta', None), 'field_sources', {})
+    complete = True
+    plan['only'].add(prefix + model._meta.pk.name)
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in declared:
+            for path in declared[name]:
+                complete = _follow(model, prefix, path, plan) and complete
+            continue
+        if field.source == '*':
+            complete = False
+            continue
+
+        path = field.source.replace('.', '__')
+        if isinstance(field, serializers.ListSerializer):
+            try:
+                relation = model._meta.get_field(path)
+            except FieldDoesNotExist:
+                complete = False
+                continue
+            child = plan_queryset(relation.related_model._default_manager.all(), field.child,
+                                  required=[relation.field.name] if relation.one_to_many else [])
+            plan['prefetch'][prefix + path] = Prefetch(prefix + path, queryset=child)
+        elif isinstance(field, serializers.BaseSerializer):
+            if not _follow(model, prefix, path, plan):
+                complete = False
+                continue
+            plan['select'].add(prefix + path)
+            related = model
+            for part in path.split('__'):
+                related = related._meta.get_field(part).related_model
+            complete = _collect(field, related, f'{prefix}{path}__', plan) and complete
+        else:
+            complete = _follow(model, prefix, path, plan) and complete
+    return complete
+
+
+def plan_queryset(queryset, serializer, required=()):
+    """Replace the queryset's loading strategy with the one the serializer needs"""
+    plan = {'only': set(required), 'select': set(), 'prefetch': {}}
+    complete = _collect(serializer, queryset.model, '', plan)
+
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if plan['select']:
+        queryset = queryset.select_related(*sorted(plan['select']))
+    if plan['prefetch']:
+        queryset = queryset.prefetch_related(*plan['prefetch'].values())
+    if complete:
+        queryset = queryset.only(*sorted(plan['only']))
+    return queryset
+
+
+class SparseFieldsetMixin:
+    """
+    View mixin adding ?fields= and ?expand= to read requests
+    Writes always use the full serializer
+    """
+
+    def get_fieldset(self):
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in SAFE_METHODS:
+            return None, None
+        return _split(request.query_params.get('fields')), _split(request.query_params.get('expand'))
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields, expand = self.get_fieldset()
+        if fields or expand:
+            apply_fieldset(getattr(serializer, 'child', serializer), fields, expand)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        # Planned here rather than in get_queryset(), which views override
+        queryset = super().filter_queryset(queryset)
+        fields, expand = self.get_fieldset()
+        if fields or expand:
+            serializer = self.get_serializer()
+            queryset = plan_queryset(queryset, getattr(serializer, 'child', serializer))
+        return queryset
@@ -0,0 +1,222 @@
+"""
+Pagination classes shared by the API apps
+Each has an apaginate_queryset() twin used by the async views (core.async_views)
+"""
+import base64
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework import exceptions, pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .async_views import alist
+
+
+class PageNumberPagination(pagination.PageNumberPagination):
+    """DRF's page number pagination (the default pagination class)"""
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # count is a cached property - fill it in so page() doesn't run a blocking COUNT(*)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = await alist(self.page.object_list)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return list(self.page)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over the view's ordering plus the primary key
+
+    Each page is fetched with WHERE (ordering columns) > (last row seen)
+    instead of OFFSET, and no COUNT(*) is run, so page 5000 costs the same
+    as page 1. The ordering follows ?ordering= like the page number style.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, request, queryset, view):
+        """Requested ordering (validated by OrderingFilter) with pk as tiebreaker"""
+        if any(not isinstance(name, str) for name in queryset.query.order_by):
+            # Ordered by an expression such as ?q= relevance - there are no
+            # column values to seek from, and dropping it would change the results
+            raise exceptions.ValidationError({
+                'paginate': ['Cursor pagination needs an ?ordering= when the results are ranked.']
+            })
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        if not ordering:
+            ordering = queryset.query.order_by or queryset.model._meta.ordering or ['-created_at']
+
+        columns = []
+        for name in ordering:
+            if not isinstance(name, str) or name.lstrip('-') in ('pk', 'id'):
+                continue
+            try:
+                field = queryset.model._meta.get_field(name.lstrip('-'))
+            except FieldDoesNotExist:
+                continue  # Keysets only work on the model's own columns
+            prefix = '-' if name.startswith('-') else ''
+            columns.append(prefix + field.attname)
+        descending = bool(columns) and columns[0].startswith('-')
+        return columns + ['-pk' if descending else 'pk']
+
+    def _field(self, model, name):
+        name = name.lstrip('-')
+        if name == 'pk':
+            return model._meta.pk
+        return next(field for field in model._meta.concrete_fields if field.attname == name)
+
+    def encode_cursor(self, instance, direction):
+        values = []
+        for name in self.ordering:
+            name = name.lstrip('-')
+            # Rows are model instances or .values() dicts (compiled serializers)
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = str(value)
+            values.append(value)
+        payload = json.dumps({'d': direction, 'v': values}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            direction, values = payload['d'], payload['v']
+            if direction not in ('next', 'prev') or len(values) != len(self.ordering):
+                raise ValueError
+            values = [self._field(model, name).to_python(value)
+                      for name, value in zip(self.ordering, values)]
+        except (TypeError, ValueError, KeyError, ValidationError, StopIteration):
+            raise NotFound(self.invalid_cursor_message)
+        return direction, values
+
+    def _seek(self, values, backwards):
+        """Lexicographic 'comes after' filter: (a > x) OR (a = x AND b > y) ..."""
+        condition = Q()
+        equal = Q()
+        for name, value in zip(self.ordering, values):
+            field = name.lstrip('-')
+            ascending = not name.startswith('-')
+            lookup = 'gt' if ascending != backwards else 'lt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def _page_queryset(self, queryset, request, view):
+        """The rows to fetch for the requested page"""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        cursor = self.decode_cursor(request, queryset.model)
+
+        self.backwards = cursor is not None and cursor[0] == 'prev'
+        self.after_cursor = cursor is not None
+        if cursor is not None:
+            queryset = queryset.filter(self._seek(cursor[1], self.backwards))
+        if self.backwards:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+        else:
+            ordering = self.ordering
+
+        # One extra row tells us whether another page exists
+        return queryset.order_by(*ordering)[:self.page_size + 1]
+
+    def _set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.backwards:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.after_cursor
+
+        self.page = rows
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._set_page(list(self._page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self._set_page(await alist(self._page_queryset(queryset, request, view)))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], 'next')
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], 'prev')
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class PageOrCursorPagination(PageNumberPagination):
+    """
+    Page number pagination by default (?page=2) for existing clients
+    Opt into keyset pagination with ?paginate=cursor and follow the next links
+    (ranked ?q= results need an ?ordering= for that)
+    ?paginate=stream skips paging: views using core.compiled.CompiledListMixin
+    stream every row as one JSON array
+    """
+    mode_query_param = 'paginate'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if request.query_params.get(self.mode_query_param) == 'cursor':
+            self.cursor_paginator = KeysetPagination()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if request.query_params.get(self.mode_query_param) == 'cursor':
+            self.cursor_paginator = KeysetPagination()
+            return await self.cursor_paginator.apaginate_queryset(queryset, request, view)
+        return await super().apaginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
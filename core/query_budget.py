@@ -0,0 +1,52 @@
+"""
+Per-view SQL query budgets
+
+Views declare how many queries a request may run. With DEBUG on an
+overrun is logged; with QUERY_BUDGET_STRICT it raises, which is what
+you want while testing. Otherwise the check is skipped entirely.
+"""
+import logging
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """connection.execute_wrapper() hook that counts executed statements"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMixin:
+    """
+    Set query_budget on a view to the most queries one request may run
+    """
+    query_budget = None
+
+    def dispatch(self, request, *args, **kwargs):
+        strict = getattr(settings, 'QUERY_BUDGET_STRICT', False)
+        if self.query_budget is None or not (settings.DEBUG or strict):
+            return super().dispatch(request, *args, **kwargs)
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = super().dispatch(request, *args, **kwargs)
+
+        if counter.count > self.query_budget:
+            message = (f'{self.__class__.__name__} ran {counter.count} queries '
+                       f'(budget {self.query_budget}) for {request.path}')
+            if strict:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,88 @@
+"""
+Fast JSON rendering and parsing
+
+Uses orjson when it is installed (pip install -r requirements-fast.txt):
+datetimes, dates, times and UUIDs are encoded in C. Without orjson
+everything falls back to DRF's stdlib JSON classes, so the output stays
+the same.
+
+Decimals are converted where the data is built - DRF's DecimalField and
+the compiled serializers' converter give strings, final_price a float,
+the export rows and dashboard/analytics totals format their own - so
+they never reach the encoder on those paths. dumps() doesn't walk the
+data to convert them itself: that would be a second pass in Python over
+every value, slower than the default= call it saves. Only stray types
+orjson doesn't know (a Decimal from a custom view, lazy strings ...)
+still go through DRF's encoder.
+
+iter_json_list() encodes a list chunk by chunk, for streamed responses
+(see core.compiled.CompiledListMixin).
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# Same output as DRF's JSONRenderer: compact, UTF-8, 'Z' for UTC, int keys allowed
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z) if orjson else 0
+_fallback_default = encoders.JSONEncoder().default
+_stdlib_renderer = JSONRenderer()
+
+
+def dumps(data):
+    """Encode data to JSON bytes exactly like DRF's JSONRenderer, only faster"""
+    if orjson is None:
+        return _stdlib_renderer.render(data)
+    encoded = orjson.dumps(data, default=_fallback_default, option=ORJSON_OPTIONS)
+    # Like DRF, escape the line separators that break JavaScript string literals
+    if b'\xe2\x80' in encoded:
+        encoded = encoded.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return encoded
+
+
+def iter_json_list(chunks):
+    """Yield one JSON array holding the items of every chunk (a list), one chunk at a time"""
+    yield b'['
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        encoded = dumps(chunk)[1:-1]
+        yield encoded if first else b',' + encoded
+        first = False
+    yield b']'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when available
+    Indented output (?format=json; indent=4 style requests) uses the stdlib path
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser backed by orjson when available
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
@@ -2,6 +2,8 @@
 Django settings for ecommerce API project.
 """
 
+import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 from decouple import config
@@ -34,6 +36,7 @@ INSTALLED_APPS = [
     'accounts',
     'products',
     'orders',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -118,31 +121,134 @@ AUTH_USER_MODEL = 'accounts.User'
 
 # REST Framework configuration
 REST_FRAMEWORK = {
+    # JWT first: the async views (core.async_views) only use authenticators with aauthenticate()
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.JWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # orjson-backed JSON when installed, stdlib otherwise (see core.renderers)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
-    # Rate limiting - throttling configuration
+    # Rate limiting - token buckets shared by all workers (see core.throttling)
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'core.throttling.AnonRateThrottle',
+        'core.throttling.UserRateThrottle',
+        'core.throttling.ScopedRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',  # Anonymous users: 100 requests per day
-        'user': '1000/day'  # Authenticated users: 1000 requests per day
+        'user': '1000/day',  # Authenticated users: 1000 requests per day
+        'login': '5/min',  # Login attempts per client IP
+        'catalog': '600/min',  # Product, category and review reads per user / client IP
+    }
+}
+
+# Where the throttles keep their token buckets: a SQLite file shared by the
+# processes on this host, or core.throttling.RedisThrottleStore with a
+# redis:// URL as the location to share them between hosts
+THROTTLE_STORE = config('THROTTLE_STORE', default='core.throttling.SQLiteThrottleStore')
+THROTTLE_STORE_LOCATION = config(
+    'THROTTLE_STORE_LOCATION',
+    default=os.path.join(tempfile.gettempdir(), 'ecommerce-api-throttle.sqlite3'),
+)
+
+# Cache - local memory by default, point CACHE_BACKEND at the file based
+# or Redis backend to share cached data between worker processes
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='ecommerce-api'),
     }
 }
 
+# Response cache for catalog read endpoints (see core.cache)
+RESPONSE_CACHE_ENABLED = config('RESPONSE_CACHE_ENABLED', default=True, cast=bool)
+RESPONSE_CACHE_TIMEOUT = 60  # seconds
+RESPONSE_CACHE_LOCK_TIMEOUT = 5  # seconds a request waits for another to fill the cache
+
+# Serve Category.product_count from the stored counter (no join at all)
+# instead of a COUNT annotation on the category query
+CATEGORY_STORED_PRODUCT_COUNT = config('CATEGORY_STORED_PRODUCT_COUNT', default=False, cast=bool)
+
+# Reviews embedded in the product detail response (the rest are paginated)
+PRODUCT_DETAIL_REVIEW_LIMIT = 5
+
+# Raise instead of logging when a view exceeds its query_budget
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=False, cast=bool)
+
+# Largest item list accepted by PATCH /api/products/bulk-update/
+PRODUCT_BULK_UPDATE_MAX_ITEMS = 100000
+
+# Background threads per process rendering product image variants
+# (0 renders them inline once the upload is committed)
+IMAGE_VARIANT_WORKERS = config('IMAGE_VARIANT_WORKERS', default=2, cast=int)
+
+# Product view counting
+# 'buffered' collects views in each worker's memory and writes them in batches,
+# 'exact' updates the database on every product page view
+PRODUCT_VIEW_COUNT_MODE = config('PRODUCT_VIEW_COUNT_MODE', default='buffered')
+PRODUCT_VIEW_FLUSH_INTERVAL = config('PRODUCT_VIEW_FLUSH_INTERVAL', default=30, cast=int)  # seconds
+PRODUCT_VIEW_FLUSH_THRESHOLD = config('PRODUCT_VIEW_FLUSH_THRESHOLD', default=500, cast=int)  # views
+
+# Product search (?q=)
+# Leave the backend empty to use SQLite FTS5 when available and the
+# portable inverted index (products.search.InvertedIndexBackend) otherwise
+PRODUCT_SEARCH_BACKEND = config('PRODUCT_SEARCH_BACKEND', default='')
+PRODUCT_SEARCH_MAX_RESULTS = 1000
+PRODUCT_SEARCH_VIEWS_WEIGHT = 0.1  # How much popularity boosts text relevance
+
+# Daily sales rollup (python manage.py build_sales_rollups)
+# Orders changed in the last few seconds wait for the next build
+SALES_ROLLUP_LAG = 5  # seconds
+
+# Vendor dashboard (/api/products/my-products/dashboard/)
+VENDOR_LOW_STOCK_THRESHOLD = 5  # units
+VENDOR_DASHBOARD_LIST_SIZE = 10  # low-stock and top products shown
+
+# Serve product and order lists through the compiled .values() serializers
+# (core.compiled) - turn off to fall back to the DRF serializers
+COMPILED_SERIALIZERS = config('COMPILED_SERIALIZERS', default=True, cast=bool)
+# Unpaginated and ?paginate=stream lists are read and encoded this many rows at a time
+JSON_STREAM_CHUNK_SIZE = 500
+
+# Idempotency-Key on POST /api/orders/create/ (see orders.idempotency)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60  # seconds a stored response is replayed
+IDEMPOTENCY_LOCK_TIMEOUT = 30  # seconds retries wait on a request still running
+
+# Order numbers (see orders.numbers) - time-ordered by default
+ORDER_NUMBER_GENERATOR = config('ORDER_NUMBER_GENERATOR', default='orders.numbers.TimeOrderedGenerator')
+# Fixed node id for this process group (random per process when empty)
+ORDER_NUMBER_NODE_ID = config('ORDER_NUMBER_NODE_ID', default=None, cast=lambda value: int(value) if value else None)
+
+# Largest order_ids list accepted by the admin bulk-cancel and bulk-status endpoints
+ORDER_BULK_MAX_ITEMS = 100000
+
+# Background jobs (see jobs.queue, python manage.py run_workers)
+JOB_WORKER_THREADS = config('JOB_WORKER_THREADS', default=4, cast=int)
+JOB_BATCH_SIZE = 20  # jobs a worker claims per dequeue
+JOB_POLL_INTERVAL = 1.0  # seconds an idle worker waits before looking again
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 10  # seconds before the first retry, doubled on each further one
+JOB_RETRY_BACKOFF_MAX = 60 * 60  # seconds
+JOB_LEASE_TIMEOUT = 5 * 60  # seconds before a job whose worker vanished runs again
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -183,11 +289,17 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
 ]
+# Response headers browser clients may read (orders.idempotency)
+CORS_EXPOSE_HEADERS = [
+    'idempotent-replayed',
+    'retry-after',
+]
 
 # Swagger settings
 SWAGGER_SETTINGS = {
@@ -0,0 +1,65 @@
+import multiprocessing
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from core import throttling
+
+WORKERS = 4
+CHECKS_PER_WORKER = 30
+LIMIT = 25
+
+
+class AnonView:
+    """Stand-in view without a throttle scope"""
+
+
+def allowed_in_worker(location, checks, results):
+    """Count how many of checks requests from one client a worker process lets through"""
+    import django
+    django.setup()
+    from django.conf import settings
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    settings.THROTTLE_STORE_LOCATION = location
+    request = Request(APIRequestFactory().get('/api/products/', REMOTE_ADDR='10.0.0.1'))
+    throttle = type('LimitedThrottle', (throttling.AnonRateThrottle,), {'rate': f'{LIMIT}/hour'})()
+    results.put(sum(throttle.allow_request(request, AnonView()) for _ in range(checks)))
+
+
+class SharedThrottleStoreTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'throttle.sqlite3')
+        throttling._store = None
+        self.addCleanup(setattr, throttling, '_store', None)
+
+    def test_limit_holds_across_worker_processes(self):
+        # spawn, like Windows and macOS: nothing is inherited from this process
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        workers = [context.Process(target=allowed_in_worker,
+                                   args=(self.location, CHECKS_PER_WORKER, results))
+                   for _ in range(WORKERS)]
+        for worker in workers:
+            worker.start()
+        allowed = [results.get(timeout=60) for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(sum(allowed), LIMIT)
+        # The parent sees the same bucket, emptied by the workers
+        with override_settings(THROTTLE_STORE_LOCATION=self.location):
+            allowed, _ = throttling.get_throttle_store().consume('throttle_anon_10.0.0.1', LIMIT, 3600)
+        self.assertFalse(allowed)
+
+    def test_incomplete_store_fails_when_constructed(self):
+        class ConsumeOnly(throttling.BaseThrottleStore):
+            def consume(self, key, capacity, period):
+                return True, capacity
+
+        with self.assertRaises(TypeError):
+            ConsumeOnly(self.location)
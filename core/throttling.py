@@ -0,0 +1,242 @@
+"""
+Rate throttles on token buckets in a store shared by every worker process
+
+DRF's throttles keep a list of request timestamps per client in the
+default cache: each check rewrites the whole list, and with the local
+memory cache every process has its own, so the limits multiply with the
+worker count. Here each client has a fixed-size bucket (tokens left +
+last refill time) in THROTTLE_STORE, updated by one atomic statement per
+check:
+- SQLiteThrottleStore: a SQLite file (THROTTLE_STORE_LOCATION), shared
+  by the processes on one host
+- RedisThrottleStore: a Lua script on Redis (THROTTLE_STORE_LOCATION is
+  the redis:// URL), shared by every host
+
+A rate of N/period lets a client make N requests at once, then one more
+every period/N seconds - the same long-run limit as DRF's rates.
+
+Views pick their limit with throttle_scope (every method) or
+read_throttle_scope (GET / HEAD / OPTIONS only); scoped requests are
+counted by ScopedRateThrottle alone instead of the anon / user limits.
+"""
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework import throttling
+from rest_framework.permissions import SAFE_METHODS
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+PRUNE_EVERY = 1000  # checks per process between sweeps of idle buckets
+
+_store = None
+
+
+class BaseThrottleStore(ABC):
+    """
+    Token buckets shared between processes
+    Subclasses implement consume() as one atomic update of the bucket, and clear()
+    """
+
+    def __init__(self, location):
+        self.location = location
+
+    @abstractmethod
+    def consume(self, key, capacity, period):
+        """
+        Take a token from key's bucket, which holds capacity tokens and refills
+        in period seconds; returns (allowed, tokens left)
+        """
+
+    async def aconsume(self, key, capacity, period):
+        return await sync_to_async(self.consume, thread_sensitive=False)(key, capacity, period)
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+
+class SQLiteThrottleStore(BaseThrottleStore):
+    """Buckets in a SQLite file (WAL mode), one connection per thread"""
+
+    CONSUME = '''
+        INSERT INTO buckets (key, tokens, stamp, expires, allowed)
+        VALUES (:key, :capacity - 1, :now, :now + :period, 1)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = MIN(:capacity, tokens + MAX(:now - stamp, 0) * :rate)
+                     - (MIN(:capacity, tokens + MAX(:now - stamp, 0) * :rate) >= 1),
+            allowed = MIN(:capacity, tokens + MAX(:now - stamp, 0) * :rate) >= 1,
+            stamp = :now,
+            expires = :now + :period
+        RETURNING allowed, tokens
+    '''
+
+    def __init__(self, location):
+        super().__init__(location)
+        self.local = threading.local()
+        self.checks = 0
+
+    def connection(self):
+        # Per thread, and reopened in forked children
+        if getattr(self.local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.location, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS buckets (
+                    key TEXT PRIMARY KEY, tokens REAL NOT NULL, stamp REAL NOT NULL,
+                    expires REAL NOT NULL, allowed INTEGER NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            connection.execute('CREATE INDEX IF NOT EXISTS buckets_expires ON buckets (expires)')
+            self.local.connection, self.local.pid = connection, os.getpid()
+        return self.local.connection
+
+    def consume(self, key, capacity, period):
+        connection = self.connection()
+        now = time.time()
+        allowed, tokens = connection.execute(self.CONSUME, {
+            'key': key, 'capacity': capacity, 'period': period, 'rate': capacity / period, 'now': now,
+        }).fetchone()
+
+        self.checks += 1
+        if self.checks % PRUNE_EVERY == 0:
+            # A bucket idle for its whole period is full again - same as no row
+            connection.execute('DELETE FROM buckets WHERE expires < ?', (now,))
+        return bool(allowed), tokens
+
+    def clear(self):
+        self.connection().execute('DELETE FROM buckets')
+
+
+class RedisThrottleStore(BaseThrottleStore):
+    """Buckets in Redis hashes, updated by a Lua script (needs the redis package)"""
+
+    CONSUME = '''
+        local capacity, period, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+        local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+        local tokens = tonumber(bucket[1]) or capacity
+        local stamp = tonumber(bucket[2]) or now
+        tokens = math.min(capacity, tokens + math.max(now - stamp, 0) * capacity / period)
+        local allowed = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+            allowed = 1
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'stamp', tostring(now))
+        redis.call('EXPIRE', KEYS[1], math.ceil(period))
+        return {allowed, tostring(tokens)}
+    '''
+
+    def __init__(self, location):
+        if redis is None:
+            raise ImproperlyConfigured('RedisThrottleStore needs the redis package')
+        super().__init__(location)
+        self.client = redis.Redis.from_url(location)
+        self.script = self.client.register_script(self.CONSUME)
+
+    def consume(self, key, capacity, period):
+        allowed, tokens = self.script(keys=[f'throttle:{key}'], args=[capacity, period, time.time()])
+        return bool(allowed), float(tokens)
+
+    def clear(self):
+        keys = list(self.client.scan_iter('throttle:*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+def get_throttle_store():
+    """Return the configured store instance"""
+    global _store
+    if _store is None:
+        _store = import_string(settings.THROTTLE_STORE)(settings.THROTTLE_STORE_LOCATION)
+    return _store
+
+
+def get_scope(request, view):
+    """The view's throttle scope for this request, if it has one"""
+    if request.method in SAFE_METHODS:
+        scope = getattr(view, 'read_throttle_scope', None)
+        if scope:
+            return scope
+    return getattr(view, 'throttle_scope', None)
+
+
+class TokenBucketThrottle(throttling.SimpleRateThrottle):
+    """
+    SimpleRateThrottle checked against a bucket in the shared store
+    Subclasses provide get_cache_key() like any SimpleRateThrottle
+    """
+
+    def allow_request(self, request, view):
+        self.key = self.get_cache_key(request, view)
+        if self.rate is None or self.key is None:
+            return True
+        allowed, self.tokens = get_throttle_store().consume(self.key, self.num_requests, self.duration)
+        return allowed
+
+    async def aallow_request(self, request, view):
+        self.key = self.get_cache_key(request, view)
+        if self.rate is None or self.key is None:
+            return True
+        allowed, self.tokens = await get_throttle_store().aconsume(
+            self.key, self.num_requests, self.duration
+        )
+        return allowed
+
+    def wait(self):
+        """Seconds until the bucket holds a whole token again"""
+        return max(1 - self.tokens, 0) * self.duration / self.num_requests
+
+
+class AnonRateThrottle(TokenBucketThrottle, throttling.AnonRateThrottle):
+    """The 'anon' rate per client IP, for views without a throttle scope"""
+
+    def get_cache_key(self, request, view):
+        if get_scope(request, view):
+            return None
+        return super().get_cache_key(request, view)
+
+
+class UserRateThrottle(TokenBucketThrottle, throttling.UserRateThrottle):
+    """The 'user' rate per user (per IP when anonymous), for views without a throttle scope"""
+
+    def get_cache_key(self, request, view):
+        if get_scope(request, view):
+            return None
+        return super().get_cache_key(request, view)
+
+
+class ScopedRateThrottle(TokenBucketThrottle):
+    """
+    The rate named by the view's scope (see get_scope)
+    Per user when authenticated, per client IP otherwise
+    """
+    rate = None
+
+    def __init__(self):
+        # The rate depends on the view, so it is looked up per request
+        pass
+
+    def get_cache_key(self, request, view):
+        self.scope = get_scope(request, view)
+        if not self.scope:
+            return None
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -8,6 +8,7 @@ from django.conf.urls.static import static
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from .views import ResponseCacheStatsView
 
 # Swagger/OpenAPI documentation setup
 schema_view = get_schema_view(
@@ -29,7 +30,9 @@ urlpatterns = [
     # API endpoints
     path('api/auth/', include('accounts.urls')),
     path('api/products/', include('products.urls')),
+    path('api/async/products/', include('products.async_urls')),  # Coroutine views for ASGI
     path('api/orders/', include('orders.urls')),
+    path('api/cache/stats/', ResponseCacheStatsView.as_view(), name='response-cache-stats'),
     
     # Swagger documentation URLs
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
@@ -0,0 +1,15 @@
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.permissions import IsAdminUser
+from .cache import get_stats
+
+
+class ResponseCacheStatsView(APIView):
+    """
+    Response cache counters - Admin only
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_stats())
@@ -0,0 +1,49 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.worker import run_processes, run_threads
+
+
+class Command(BaseCommand):
+    """
+    Run background job workers until interrupted
+    Usage: python manage.py run_workers [--threads 4] [--processes 1] [--queue default,images] [--burst]
+    """
+    help = 'Run workers for the database job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=settings.JOB_WORKER_THREADS,
+                            help='Worker threads per process')
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Worker processes (each runs --threads workers)')
+        parser.add_argument('--queue', default='default',
+                            help='Comma separated queues to take jobs from')
+        parser.add_argument('--batch-size', type=int, default=settings.JOB_BATCH_SIZE,
+                            help='Jobs claimed per dequeue')
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL,
+                            help='Seconds an idle worker waits before looking again')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once the queues are empty')
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+        signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+        worker_options = {
+            'queues': [name.strip() for name in options['queue'].split(',') if name.strip()],
+            'batch_size': options['batch_size'],
+            'poll_interval': options['poll_interval'],
+            'burst': options['burst'],
+        }
+        self.stdout.write(f"Starting {options['processes']} x {options['threads']} workers "
+                          f"on {', '.join(worker_options['queues'])}")
+        if options['processes'] > 1:
+            run_processes(options['processes'], options['threads'], stop_event, **worker_options)
+            self.stdout.write(self.style.SUCCESS('Workers stopped'))
+        else:
+            processed = run_threads(options['threads'], stop_event=stop_event, **worker_options)
+            self.stdout.write(self.style.SUCCESS(f'Workers stopped after {processed} jobs'))
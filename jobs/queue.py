@@ -0,0 +1,161 @@
+"""
+Database-backed job queue
+
+Jobs are rows in the jobs_job table, so enqueueing is part of the
+caller's transaction: a job queued in a request that rolls back never
+runs. Use enqueue_on_commit() for work that should only be queued once
+the data it reads is committed, from code that may run in or outside
+a transaction.
+
+    from jobs.queue import enqueue, enqueue_on_commit
+    enqueue('orders.analytics.build_sales_rollups', full=True)
+    enqueue_on_commit(rebuild_vendor_sales, queue='stats', delay=60)
+
+Workers claim jobs in batches. On PostgreSQL / MySQL 8 the candidates
+are locked with SELECT ... FOR UPDATE SKIP LOCKED so workers never wait
+on each other; elsewhere (SQLite) a conditional UPDATE claims them and
+a worker that loses the race simply gets fewer jobs. Jobs run at least
+once: a worker that dies mid-job leaves it to be requeued when its lease
+(JOB_LEASE_TIMEOUT) runs out. The lease of a batch restarts before each
+job, so a long batch doesn't lose the jobs it hasn't reached yet.
+"""
+import random
+import traceback
+from datetime import timedelta
+from itertools import count
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+_claims = count()
+
+
+def job_name(func):
+    """Dotted path a job is stored under"""
+    if isinstance(func, str):
+        return func
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def _build(func, args, kwargs, queue, delay, max_attempts):
+    return Job(
+        name=job_name(func),
+        args=list(args),
+        kwargs=kwargs,
+        queue=queue,
+        run_at=timezone.now() + timedelta(seconds=delay or 0),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def enqueue(func, *args, queue='default', delay=None, max_attempts=None, **kwargs):
+    """
+    Queue func(*args, **kwargs) - func is a function or its dotted path
+    args and kwargs must be JSON serializable
+    """
+    job = _build(func, args, kwargs, queue, delay, max_attempts)
+    job.save()
+    return job
+
+
+def enqueue_many(func, calls, queue='default', delay=None, max_attempts=None):
+    """Queue one job per (args, kwargs) pair in calls with bulk inserts"""
+    jobs = [_build(func, args, kwargs, queue, delay, max_attempts) for args, kwargs in calls]
+    return Job.objects.bulk_create(jobs, batch_size=1000)
+
+
+def enqueue_on_commit(func, *args, **kwargs):
+    """enqueue() once the current transaction commits (right away outside one)"""
+    transaction.on_commit(lambda: enqueue(func, *args, **kwargs))
+
+
+def dequeue(worker_id, queues=('default',), batch_size=None):
+    """Claim up to batch_size due jobs for worker_id and return them"""
+    batch_size = batch_size or settings.JOB_BATCH_SIZE
+    now = timezone.now()
+    token = f'{worker_id}#{next(_claims)}'
+    due = Job.objects.filter(status='queued', queue__in=queues, run_at__lte=now)
+    candidates = due.order_by('run_at', 'id')
+    
+    def claim():
+        ids = list(candidates.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return ids, 0
+        # Rechecking status in the UPDATE makes the claim safe without row locks
+        return ids, due.filter(pk__in=ids).update(
+            status='running', locked_by=token, attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=settings.JOB_LEASE_TIMEOUT),
+        )
+    
+    if connection.features.has_select_for_update_skip_locked:
+        candidates = candidates.select_for_update(skip_locked=True)
+        with transaction.atomic():
+            ids, claimed = claim()
+    else:
+        # SQLite: a read then a write in one transaction can fail with
+        # "database is locked" - the conditional UPDATE alone is enough
+        ids, claimed = claim()
+    if not claimed:
+        return []
+    return list(Job.objects.filter(pk__in=ids, locked_by=token).order_by('run_at', 'id'))
+
+
+def renew_lease(jobs):
+    """
+    Restart the lease of jobs a worker still holds, before it runs the first of them
+    Returns the ones it still holds - a lease that ran out may have requeued others
+    """
+    if not jobs:
+        return jobs
+    held = Job.objects.filter(pk__in=[job.pk for job in jobs], locked_by=jobs[0].locked_by,
+                              status='running')
+    locked_until = timezone.now() + timedelta(seconds=settings.JOB_LEASE_TIMEOUT)
+    if held.update(locked_until=locked_until) == len(jobs):
+        return jobs
+    ids = set(held.values_list('pk', flat=True))
+    return [job for job in jobs if job.pk in ids]
+
+
+def run_job(job):
+    """Call the job's function; returns None on success or the formatted error"""
+    try:
+        import_string(job.name)(*job.args, **job.kwargs)
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter so failed jobs don't retry in lockstep"""
+    delay = min(settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def finish(succeeded, failures):
+    """
+    Record a batch's results: succeeded job ids are deleted in one statement,
+    failures ({job: error}) are retried later or marked failed
+    """
+    if succeeded:
+        Job.objects.filter(pk__in=succeeded).delete()
+    now = timezone.now()
+    for job, error in failures.items():
+        changes = {'last_error': error, 'locked_by': '', 'locked_until': None}
+        if job.attempts >= job.max_attempts:
+            changes['status'] = 'failed'
+        else:
+            changes.update(status='queued', run_at=now + timedelta(seconds=retry_delay(job.attempts)))
+        Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(**changes)
+
+
+def requeue_stale():
+    """Put jobs whose worker vanished (lease expired) back in the queue"""
+    stale = Job.objects.filter(status='running', locked_until__lt=timezone.now())
+    released = {'locked_by': '', 'locked_until': None, 'last_error': 'Worker lease expired'}
+    stale.filter(attempts__gte=F('max_attempts')).update(status='failed', **released)
+    return stale.update(status='queued', **released)
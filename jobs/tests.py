@@ -0,0 +1,169 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import dequeue, enqueue, enqueue_on_commit, finish, requeue_stale
+from .worker import Worker
+
+CALLS = []
+
+
+def record_call(label):
+    CALLS.append(label)
+
+
+def fail():
+    raise ValueError('Job failed')
+
+
+def expire_batch_lease():
+    """Act as if this job outlived the lease its batch was claimed with"""
+    Job.objects.filter(status='running').update(locked_until=timezone.now() + timedelta(seconds=1))
+
+
+def record_lease(label):
+    CALLS.append((label, Job.objects.get(status='running', args=[label]).locked_until))
+
+
+def lose_batch_lease():
+    """Act as if the lease ran out and another worker's sweep requeued the rest"""
+    Job.objects.filter(status='running').update(locked_until=timezone.now() - timedelta(seconds=1))
+    requeue_stale()
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_dequeue_skips_jobs_not_due_yet(self):
+        later = enqueue(record_call, 'later', delay=60)
+        now = enqueue(record_call, 'now')
+
+        self.assertEqual([job.pk for job in dequeue('worker-a')], [now.pk])
+        self.assertEqual(dequeue('worker-a'), [])
+
+        Job.objects.filter(pk=later.pk).update(run_at=timezone.now())
+        self.assertEqual([job.pk for job in dequeue('worker-a')], [later.pk])
+
+    def test_dequeue_claims_each_job_once(self):
+        for index in range(10):
+            enqueue(record_call, index)
+
+        first = dequeue('worker-a', batch_size=6)
+        second = dequeue('worker-b', batch_size=6)
+        self.assertEqual((len(first), len(second)), (6, 4))
+        self.assertFalse({job.pk for job in first} & {job.pk for job in second})
+        self.assertEqual({job.locked_by.split('#')[0] for job in second}, {'worker-b'})
+        self.assertEqual(dequeue('worker-c'), [])
+
+    def test_finish_deletes_successes_and_backs_off_failures(self):
+        done = enqueue(record_call, 'done')
+        failing = enqueue(fail, max_attempts=2)
+        jobs = {job.pk: job for job in dequeue('worker-a')}
+
+        before = timezone.now()
+        finish([done.pk], {jobs[failing.pk]: 'Traceback'})
+        self.assertFalse(Job.objects.filter(pk=done.pk).exists())
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts, failing.locked_by), ('queued', 1, ''))
+        self.assertGreater(failing.run_at, before)
+        self.assertEqual(failing.last_error, 'Traceback')
+
+        # Due again: the second failure uses up max_attempts
+        Job.objects.filter(pk=failing.pk).update(run_at=timezone.now())
+        job, = dequeue('worker-a')
+        finish([], {job: 'Traceback'})
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), ('failed', 2))
+        self.assertEqual(dequeue('worker-a'), [])
+
+    def test_requeue_stale_releases_expired_leases(self):
+        stale = enqueue(record_call, 'stale')
+        exhausted = enqueue(record_call, 'exhausted', max_attempts=1)
+        dequeue('worker-a')
+        leased = enqueue(record_call, 'leased')
+        dequeue('worker-b')
+        Job.objects.exclude(pk=leased.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(requeue_stale(), 1)
+        statuses = dict(Job.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {stale.pk: 'queued', exhausted.pk: 'failed', leased.pk: 'running'})
+        self.assertEqual(Job.objects.get(pk=stale.pk).locked_by, '')
+
+    def test_enqueue_on_commit_writes_nothing_on_rollback(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    enqueue_on_commit(record_call, 'rolled back')
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Job.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_on_commit(record_call, 'committed')
+        self.assertEqual(list(Job.objects.values_list('args', flat=True)), [['committed']])
+
+
+@override_settings(JOB_LEASE_TIMEOUT=300)
+class WorkerLeaseTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_lease_restarts_before_each_job(self):
+        enqueue(expire_batch_lease)
+        enqueue(record_lease, 'second')
+
+        started = timezone.now()
+        Worker(burst=True).run_batch()
+        (label, locked_until), = CALLS
+        self.assertGreater(locked_until, started + timedelta(seconds=200))
+        self.assertFalse(Job.objects.exists())
+
+    def test_jobs_requeued_from_a_lapsed_batch_run_once(self):
+        enqueue(lose_batch_lease)
+        enqueue(record_call, 'second')
+
+        worker = Worker(burst=True)
+        self.assertEqual(worker.run_batch(), 2)
+        self.assertEqual((worker.processed, CALLS), (1, []))
+        # Left for whoever claims it next
+        self.assertEqual(list(Job.objects.values_list('status', 'locked_by')), [('queued', '')])
+        worker.run_batch()
+        self.assertEqual(CALLS, ['second'])
+
+
+class ConcurrentDequeueTests(TransactionTestCase):
+    def test_concurrent_claimers_never_share_a_job(self):
+        for index in range(60):
+            enqueue(record_call, index)
+        claimed = []
+
+        def claimer(name):
+            try:
+                while True:
+                    try:
+                        jobs = dequeue(name, batch_size=5)
+                    except OperationalError:
+                        time.sleep(0.005)  # SQLite's shared-cache test database is locked
+                        continue
+                    if not jobs:
+                        return
+                    claimed.extend(job.pk for job in jobs)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=claimer, args=(f'worker-{index}',)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(claimed), 60)
+        self.assertEqual(len(set(claimed)), 60)
@@ -0,0 +1,118 @@
+"""
+Worker threads and processes for the job queue (python manage.py run_workers)
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection, connections
+
+from .queue import dequeue, finish, renew_lease, requeue_stale, run_job
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    One thread's dequeue / run / finish loop
+    burst=True stops once the queues are empty instead of polling forever
+    """
+
+    def __init__(self, queues=('default',), batch_size=None, poll_interval=None,
+                 stop_event=None, burst=False):
+        self.queues = tuple(queues)
+        self.batch_size = batch_size or settings.JOB_BATCH_SIZE
+        self.poll_interval = settings.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.stop_event = stop_event or threading.Event()
+        self.burst = burst
+        self.processed = 0
+
+    @property
+    def worker_id(self):
+        return f'{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}'
+
+    def run_batch(self):
+        """Claim and run one batch; returns how many jobs it held"""
+        jobs = dequeue(self.worker_id, self.queues, self.batch_size)
+        succeeded, failures = [], {}
+        pending = jobs
+        while pending:
+            job, pending = pending[0], pending[1:]
+            error = run_job(job)
+            if error is None:
+                succeeded.append(job.pk)
+            else:
+                logger.warning('Job %s failed (attempt %s of %s)\n%s',
+                               job, job.attempts, job.max_attempts, error)
+                failures[job] = error
+            # The batch's lease started when it was claimed - restart it for the rest
+            pending = renew_lease(pending)
+        if jobs:
+            finish(succeeded, failures)
+        self.processed += len(succeeded) + len(failures)
+        return len(jobs)
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                if self.run_batch():
+                    continue
+                if self.burst:
+                    break
+                self.stop_event.wait(self.poll_interval)
+        finally:
+            connection.close()
+
+
+def run_threads(threads, stop_event=None, **options):
+    """Run `threads` workers in this process until stopped; returns jobs processed"""
+    stop_event = stop_event or threading.Event()
+    requeue_stale()
+    workers = [Worker(stop_event=stop_event, **options) for _ in range(threads)]
+    pool = [threading.Thread(target=worker.run, name=f'job-worker-{index}', daemon=True)
+            for index, worker in enumerate(workers)]
+    for thread in pool:
+        thread.start()
+
+    # Workers that die mid-job leave it running until its lease expires
+    next_sweep = time.monotonic() + settings.JOB_LEASE_TIMEOUT
+    while any(thread.is_alive() for thread in pool):
+        for thread in pool:
+            thread.join(timeout=1)
+        if time.monotonic() >= next_sweep and not stop_event.is_set():
+            requeue_stale()
+            close_old_connections()
+            next_sweep = time.monotonic() + settings.JOB_LEASE_TIMEOUT
+    return sum(worker.processed for worker in workers)
+
+
+def _process_main(threads, options):
+    import django
+    django.setup()
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    run_threads(threads, stop_event=stop_event, **options)
+
+
+def run_processes(processes, threads, stop_event, **options):
+    """Run `processes` child processes with `threads` workers each"""
+    connections.close_all()  # Children must not share the parent's connections
+    children = [multiprocessing.Process(target=_process_main, args=(threads, options),
+                                        name=f'job-process-{index}')
+                for index in range(processes)]
+    for child in children:
+        child.start()
+    while any(child.is_alive() for child in children):
+        if stop_event.wait(1):
+            for child in children:
+                if child.is_alive():
+                    os.kill(child.pid, signal.SIGTERM)
+            break
+    for child in children:
+        child.join()
@@ -0,0 +1,152 @@
+"""
+Daily sales rollups (DailySales: day x vendor x category x status)
+
+build_sales_rollups() recomputes every day that has orders changed since
+its Order.updated_at high-water mark, so a run costs as much as the days
+that moved, not the whole order history. Status changes made through the
+API are applied right away with apply_status_changes(); anything else
+(admin edits, shell scripts) is picked up by the next build.
+
+Days are calendar days in TIME_ZONE, keyed on Order.created_at. An order
+with items from several vendors or categories counts once in each.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.bulk import increment
+from .models import DailySales, Order, OrderItem, RollupCheckpoint
+
+ROLLUP_NAME = 'daily_sales'
+GROUP_FIELDS = {
+    'day': ['day'],
+    'vendor': ['vendor', 'vendor__email'],
+    'category': ['category', 'category__name'],
+    'status': ['status'],
+}
+DAYS_PER_BATCH = 31
+ORDERS_PER_BATCH = 500
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _grouped_items(items, with_status=True):
+    """Aggregate order items into rollup buckets"""
+    keys = {
+        'day': TruncDate('order__created_at'),
+        'vendor_id': F('product__vendor_id'),
+        'category_id': F('product__category_id'),
+    }
+    if with_status:
+        keys['status'] = F('order__status')
+    return (items.order_by().values(**keys).annotate(
+        orders=Count('order_id', distinct=True),
+        units=Sum('quantity'),
+        revenue=Sum(ExpressionWrapper(
+            F('quantity') * F('price'),
+            output_field=DecimalField(max_digits=14, decimal_places=2)
+        )),
+    ))
+
+
+def rebuild_days(days):
+    """Recompute the rollup rows of the given days from orders"""
+    days = sorted(set(days))
+    for start in range(0, len(days), DAYS_PER_BATCH):
+        batch = days[start:start + DAYS_PER_BATCH]
+        ranges = Q()
+        for day in batch:
+            ranges |= Q(order__created_at__gte=_day_start(day),
+                        order__created_at__lt=_day_start(day + timedelta(days=1)))
+        rows = [DailySales(**row) for row in _grouped_items(OrderItem.objects.filter(ranges))]
+        with transaction.atomic():
+            DailySales.objects.filter(day__in=batch).delete()
+            DailySales.objects.bulk_create(rows, batch_size=1000)
+    return len(days)
+
+
+def build_sales_rollups(full=False):
+    """
+    Bring the rollup up to date and return the number of days recomputed
+    Orders touched in the last SALES_ROLLUP_LAG seconds wait for the next
+    run, so rows still being committed are never skipped
+    """
+    upper = timezone.now() - timedelta(seconds=settings.SALES_ROLLUP_LAG)
+    with transaction.atomic():
+        checkpoint, _ = (RollupCheckpoint.objects.select_for_update()
+                         .get_or_create(name=ROLLUP_NAME))
+        orders = Order.objects.filter(updated_at__lte=upper)
+        if full:
+            DailySales.objects.all().delete()
+        elif checkpoint.high_water_mark:
+            orders = orders.filter(updated_at__gt=checkpoint.high_water_mark)
+
+        days = (orders.annotate(day=TruncDate('created_at'))
+                .order_by('day').values_list('day', flat=True).distinct())
+        rebuilt = rebuild_days(list(days))
+
+        checkpoint.high_water_mark = upper
+        checkpoint.save(update_fields=['high_water_mark'])
+    return rebuilt
+
+
+def get_high_water_mark():
+    return (RollupCheckpoint.objects.filter(name=ROLLUP_NAME)
+            .values_list('high_water_mark', flat=True).first())
+
+
+def apply_status_changes(previous, new_status):
+    """
+    Move orders from their old status bucket to new_status
+    previous: (pk, status, created_at) of each order as loaded before the change
+    Orders created after the last build aren't in the rollup yet and are
+    left to the next one; earlier orders are, however often they changed since
+    """
+    mark = get_high_water_mark()
+    if mark is None:
+        return 0
+
+    by_status = defaultdict(list)
+    for pk, status, created_at in previous:
+        if status != new_status and created_at <= mark:
+            by_status[status].append(pk)
+
+    moved = 0
+    with transaction.atomic():
+        for old_status, ids in by_status.items():
+            for start in range(0, len(ids), ORDERS_PER_BATCH):
+                chunk = ids[start:start + ORDERS_PER_BATCH]
+                days = set()
+                for row in _grouped_items(OrderItem.objects.filter(order_id__in=chunk), with_status=False):
+                    totals = {field: row.pop(field) for field in ('orders', 'units', 'revenue')}
+                    increment(DailySales, dict(row, status=old_status),
+                              **{field: -value for field, value in totals.items()})
+                    increment(DailySales, dict(row, status=new_status), **totals)
+                    days.add(row['day'])
+                DailySales.objects.filter(day__in=days, orders__lte=0).delete()
+                moved += len(chunk)
+    return moved
+
+
+def sales_report(start, end, group_by=('day',), vendor=None, category=None, statuses=None):
+    """Sum rollup rows between two days (inclusive) grouped by the given dimensions"""
+    rows = DailySales.objects.filter(day__gte=start, day__lte=end)
+    if vendor:
+        rows = rows.filter(vendor_id=vendor)
+    if category:
+        rows = rows.filter(category_id=category)
+    if statuses:
+        rows = rows.filter(status__in=statuses)
+
+    sums = {'orders': Sum('orders'), 'units': Sum('units'), 'revenue': Sum('revenue')}
+    columns = [field for name in group_by for field in GROUP_FIELDS[name]]
+    results = rows.order_by().values(*columns).annotate(**sums).order_by(*columns)
+    totals = rows.aggregate(**sums)
+    return totals, list(results)
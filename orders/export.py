@@ -0,0 +1,92 @@
+"""
+Streaming order export (CSV or NDJSON)
+
+Orders are read with .values().iterator() and their line items are
+fetched with one query per chunk of orders, so memory stays flat no
+matter how many orders are exported. Nothing goes through serializers.
+"""
+import csv
+
+from django.utils import timezone
+
+from core.renderers import dumps
+from .models import OrderItem
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+ORDER_FIELDS = ['id', 'order_number', 'user_id', 'user__email', 'status', 'payment_method',
+                'is_paid', 'total_amount', 'shipping_address', 'shipping_city',
+                'shipping_state', 'shipping_pincode', 'phone', 'created_at', 'updated_at',
+                'delivered_at']
+ITEM_FIELDS = ['order_id', 'product_id', 'product__name', 'quantity', 'price']
+CSV_HEADER = ([field.replace('__', '_') for field in ORDER_FIELDS] +
+              ['item_product_id', 'item_product_name', 'item_quantity', 'item_price'])
+CHUNK_SIZE = 2000
+
+
+def _plain(value):
+    """Text-friendly value for CSV / JSON output"""
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if isinstance(value, (int, float, str, bool)):
+        return value
+    return str(value)  # Decimal
+
+
+def iter_orders_with_items(queryset, chunk_size=CHUNK_SIZE):
+    """Yield (order dict, [item dicts]) reading orders and items chunk by chunk"""
+    chunk = []
+    for order in queryset.values(*ORDER_FIELDS).iterator(chunk_size=chunk_size):
+        chunk.append(order)
+        if len(chunk) >= chunk_size:
+            yield from _attach_items(chunk)
+            chunk = []
+    if chunk:
+        yield from _attach_items(chunk)
+
+
+def _attach_items(orders):
+    items = {}
+    rows = (OrderItem.objects.filter(order_id__in=[order['id'] for order in orders])
+            .order_by('order_id', 'id').values_list(*ITEM_FIELDS))
+    for order_id, *item in rows:
+        items.setdefault(order_id, []).append(item)
+    for order in orders:
+        yield order, items.get(order['id'], [])
+
+
+class _Echo:
+    """File-like object whose write() just hands the line back to csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset):
+    """One CSV line per order item; orders without items get one line with blank item columns"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for order, items in iter_orders_with_items(queryset):
+        base = [_plain(order[field]) for field in ORDER_FIELDS]
+        for product_id, product_name, quantity, price in items or [(None, None, None, None)]:
+            yield writer.writerow(base + [product_id, product_name, quantity, _plain(price)])
+
+
+def iter_ndjson(queryset):
+    """One JSON object (bytes) per order with its items nested"""
+    for order, items in iter_orders_with_items(queryset):
+        record = {field.replace('__', '_'): _plain(order[field]) for field in ORDER_FIELDS}
+        record['items'] = [
+            {'product_id': product_id, 'product_name': product_name,
+             'quantity': quantity, 'price': _plain(price)}
+            for product_id, product_name, quantity, price in items
+        ]
+        yield dumps(record) + b'\n'
+
+
+def iter_export(queryset, export_format):
+    return iter_csv(queryset) if export_format == 'csv' else iter_ndjson(queryset)
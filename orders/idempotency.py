@@ -0,0 +1,148 @@
+"""
+Idempotency-Key support for order creation
+
+A client sends the same Idempotency-Key header on every retry of one
+request. The first request claims the key and its response is stored in
+the same transaction as the order; retries get that response back
+without running the view again. While the first request is still
+running, retries get 409 until its lock (IDEMPOTENCY_LOCK_TIMEOUT) runs
+out. Errors are not stored - the key is released so the client can
+retry. Keys older than IDEMPOTENCY_KEY_TTL are ignored and deleted in
+batches (python manage.py expire_idempotency_keys).
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+EXPIRE_BATCH_SIZE = 1000
+
+
+def request_fingerprint(request):
+    """Hash of the request body, so a key can't be reused for a different order"""
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def _expiry_cutoff():
+    return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+
+def claim_key(user, key, fingerprint):
+    """
+    Returns (record, None) when this request owns the key and should run,
+    or (None, response) with the stored response or an error to send instead
+    """
+    now = timezone.now()
+    locked_until = now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+    record = IdempotencyKey.objects.filter(user=user, key=key).first()
+
+    if record is not None and record.created_at < _expiry_cutoff():
+        # Expired but not swept yet - start over
+        IdempotencyKey.objects.filter(pk=record.pk).delete()
+        record = None
+    if record is None:
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=user, key=key, request_hash=fingerprint, locked_until=locked_until
+                )
+            return record, None
+        except IntegrityError:
+            # A concurrent request claimed it first
+            record = IdempotencyKey.objects.filter(user=user, key=key).first()
+            if record is None:
+                return None, _in_progress()
+
+    if record.request_hash != fingerprint:
+        return None, Response(
+            {'error': 'Idempotency-Key was already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if record.status_code is not None:
+        response = Response(record.response, status=record.status_code)
+        response['Idempotent-Replayed'] = 'true'
+        return None, response
+    if record.locked_until and record.locked_until > now:
+        return None, _in_progress()
+
+    # The request holding the lock died - take the key over
+    taken = (IdempotencyKey.objects
+             .filter(pk=record.pk, status_code__isnull=True, locked_until=record.locked_until)
+             .update(locked_until=locked_until))
+    if not taken:
+        return None, _in_progress()
+    return record, None
+
+
+def _in_progress():
+    response = Response(
+        {'error': 'A request with this Idempotency-Key is already in progress'},
+        status=status.HTTP_409_CONFLICT
+    )
+    response['Retry-After'] = '1'
+    return response
+
+
+def store_response(record, response):
+    IdempotencyKey.objects.filter(pk=record.pk).update(
+        status_code=response.status_code, response=response.data, locked_until=None
+    )
+
+
+def release_key(record):
+    IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).delete()
+
+
+def expire_keys(batch_size=EXPIRE_BATCH_SIZE):
+    """Delete expired keys batch_size rows per statement; returns how many went"""
+    cutoff = _expiry_cutoff()
+    deleted = 0
+    while True:
+        ids = list(IdempotencyKey.objects.filter(created_at__lt=cutoff)
+                   .order_by('created_at').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=ids).delete()[0]
+
+
+class IdempotentCreateMixin:
+    """
+    POST honouring the Idempotency-Key header
+    Requests without the header behave exactly as before
+    """
+
+    def post(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if not key:
+            return super().post(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        record, response = claim_key(request.user, key, request_fingerprint(request))
+        if response is not None:
+            return response
+        try:
+            # Stored in the order's transaction: a crash can't leave an order without its key
+            with transaction.atomic():
+                response = super().post(request, *args, **kwargs)
+                if response.status_code < 400:
+                    store_response(record, response)
+        except Exception:
+            release_key(record)
+            raise
+        if response.status_code >= 400:
+            release_key(record)
+        return response
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from orders.analytics import build_sales_rollups
+
+
+class Command(BaseCommand):
+    """
+    Update the daily sales rollup behind /api/orders/admin/analytics/sales/
+    Usage: python manage.py build_sales_rollups [--full]
+    Run it from cron; each run only recomputes days with changed orders
+    """
+    help = 'Build daily sales rollups incrementally (or from scratch with --full)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Drop and rebuild every day')
+
+    def handle(self, *args, **options):
+        days = build_sales_rollups(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Recomputed {days} days of sales'))
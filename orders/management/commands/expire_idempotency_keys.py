@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from orders.idempotency import EXPIRE_BATCH_SIZE, expire_keys
+
+
+class Command(BaseCommand):
+    """
+    Delete stored Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL
+    Usage: python manage.py expire_idempotency_keys [--batch-size 1000]
+    """
+    help = 'Delete expired idempotency keys in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EXPIRE_BATCH_SIZE,
+                            help='Rows deleted per statement')
+
+    def handle(self, *args, **options):
+        deleted = expire_keys(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
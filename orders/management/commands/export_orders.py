@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from orders.export import FORMATS, iter_export
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    """
+    Stream orders with their items to a CSV / NDJSON file
+    Usage: python manage.py export_orders --format ndjson --status delivered -o orders.ndjson
+    """
+    help = 'Export orders and line items without loading them into memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(FORMATS), default='csv')
+        parser.add_argument('-o', '--output', help='File to write (default: stdout)')
+        parser.add_argument('--status', choices=[choice for choice, _ in Order.STATUS_CHOICES])
+        parser.add_argument('--payment-method', choices=[choice for choice, _ in Order.PAYMENT_CHOICES])
+        parser.add_argument('--is-paid', choices=['true', 'false'])
+        parser.add_argument('--user', type=int, help='User id')
+
+    def handle(self, *args, **options):
+        queryset = Order.objects.order_by('-created_at')
+        if options['status']:
+            queryset = queryset.filter(status=options['status'])
+        if options['payment_method']:
+            queryset = queryset.filter(payment_method=options['payment_method'])
+        if options['is_paid']:
+            queryset = queryset.filter(is_paid=options['is_paid'] == 'true')
+        if options['user']:
+            queryset = queryset.filter(user_id=options['user'])
+
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in iter_export(queryset, options['format']):
+                output.write(chunk.encode() if isinstance(chunk, str) else chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
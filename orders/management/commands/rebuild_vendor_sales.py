@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from orders.vendor_stats import rebuild_vendor_sales
+
+
+class Command(BaseCommand):
+    """
+    Recompute the per-product and per-vendor sales aggregates from orders
+    Usage: python manage.py rebuild_vendor_sales
+    """
+    help = 'Rebuild vendor dashboard sales aggregates'
+
+    def handle(self, *args, **options):
+        vendors = rebuild_vendor_sales()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales for {vendors} vendors'))
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_vendor_stock_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accounts', '0002_user_created_id_index'),
+        ('orders', '0003_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorSales',
+            fields=[
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='vendor_sales', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('orders', models.IntegerField(default=0)),
+                ('units_sold', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductSales',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales', serialize=False, to='products.product')),
+                ('units_sold', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vendor', '-units_sold'], name='product_sales_top_idx')],
+            },
+        ),
+    ]
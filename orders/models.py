@@ -1,6 +1,7 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth import get_user_model
-from products.models import Product
+from products.models import Category, Product
 
 User = get_user_model()
 
@@ -18,6 +19,16 @@ class Order(models.Model):
         ('cancelled', 'Cancelled'),
     )
     
+    # Status changes allowed from each status (see orders.transitions)
+    STATUS_TRANSITIONS = {
+        'pending': ('confirmed', 'processing', 'cancelled'),
+        'confirmed': ('processing', 'shipped', 'cancelled'),
+        'processing': ('shipped', 'cancelled'),
+        'shipped': ('delivered',),
+        'delivered': (),
+        'cancelled': (),
+    }
+    
     PAYMENT_CHOICES = (
         ('cod', 'Cash on Delivery'),
         ('online', 'Online Payment'),
@@ -50,6 +61,13 @@ class Order(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination over (created_at, id) - all orders and per user
+            models.Index(fields=['created_at', 'id'], name='order_created_id_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_idx'),
+            # Sales rollups pick up orders changed since their high-water mark
+            models.Index(fields=['updated_at'], name='order_updated_idx'),
+        ]
     
     def __str__(self):
         return f"Order {self.order_number} - {self.user.email}"
@@ -79,3 +97,91 @@ class OrderItem(models.Model):
     
     class Meta:
         ordering = ['id']
+
+
+class DailySales(models.Model):
+    """
+    Sales rolled up by day x vendor x category x order status
+    Maintained by orders.analytics - never edit by hand
+    """
+    day = models.DateField()
+    vendor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    orders = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        unique_together = ['day', 'vendor', 'category', 'status']
+        ordering = ['day']
+    
+    def __str__(self):
+        return f"{self.day} {self.vendor_id}/{self.category_id} {self.status}: {self.revenue}"
+
+
+class RollupCheckpoint(models.Model):
+    """
+    How far a rollup has been built (Order.updated_at high-water mark)
+    """
+    name = models.CharField(max_length=50, unique=True)
+    high_water_mark = models.DateTimeField(blank=True, null=True)
+    
+    def __str__(self):
+        return f"{self.name} @ {self.high_water_mark}"
+
+
+class ProductSales(models.Model):
+    """
+    Units sold and revenue per product, excluding cancelled orders
+    Maintained by orders.vendor_stats
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True,
+                                   related_name='sales')
+    vendor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    units_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        indexes = [
+            # Top sellers per vendor
+            models.Index(fields=['vendor', '-units_sold'], name='product_sales_top_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id}: {self.units_sold} sold"
+
+
+class VendorSales(models.Model):
+    """
+    Sales totals per vendor, excluding cancelled orders
+    Maintained by orders.vendor_stats
+    """
+    vendor = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                  related_name='vendor_sales')
+    orders = models.IntegerField(default=0)
+    units_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    def __str__(self):
+        return f"{self.vendor_id}: {self.revenue}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response of an order request sent with an Idempotency-Key header
+    Managed by orders.idempotency - status_code stays empty while the first request runs
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    response = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        unique_together = ['user', 'key']
+    
+    def __str__(self):
+        return f"{self.user_id}:{self.key} ({self.status_code or 'in flight'})"
@@ -1,8 +1,15 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from .models import Order, OrderItem
+from .numbers import next_order_number
+from .stock import reserve_stock
+from .transitions import CANCELLABLE_STATUSES, can_transition
+from .vendor_stats import record_order_sales
 from products.serializers import ProductListSerializer
-import random
-import string
+from core.compiled import CompiledSerializer
+
+ORDER_NUMBER_ATTEMPTS = 3
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -18,6 +25,8 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'product_name', 'product_image', 
                   'quantity', 'price', 'subtotal']
         read_only_fields = ['price', 'subtotal']
+        extra_kwargs = {'quantity': {'min_value': 1}}
+        field_sources = {'subtotal': ['quantity', 'price']}
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -26,7 +35,7 @@ class OrderSerializer(serializers.ModelSerializer):
     """
     items = OrderItemSerializer(many=True, read_only=True)
     user_email = serializers.CharField(source='user.email', read_only=True)
-    total_items = serializers.IntegerField(read_only=True)
+    total_items = serializers.SerializerMethodField()
     
     class Meta:
         model = Order
@@ -36,6 +45,37 @@ class OrderSerializer(serializers.ModelSerializer):
                   'is_paid', 'total_amount', 'total_items', 'items',
                   'created_at', 'updated_at', 'delivered_at']
         read_only_fields = ['order_number', 'user', 'created_at', 'updated_at']
+        # The order views annotate total_quantity (see orders.views.with_order_details)
+        field_sources = {'total_items': []}
+        expandable_fields = {'user': 'accounts.serializers.UserSerializer'}
+    
+    def get_total_items(self, obj):
+        # Annotated total when the queryset has it, summed from the items otherwise
+        annotated = getattr(obj, 'total_quantity', None)
+        return obj.total_items if annotated is None else annotated
+
+
+class CompiledOrderItemSerializer(CompiledSerializer):
+    """
+    OrderItemSerializer output straight from .values() rows
+    """
+    serializer_class = OrderItemSerializer
+    computed = {'subtotal': (['quantity', 'price'], 'get_subtotal')}
+    
+    def get_subtotal(self, row):
+        return row['quantity'] * row['price']
+
+
+class CompiledOrderSerializer(CompiledSerializer):
+    """
+    OrderSerializer output from .values() rows, items fetched in one query per page
+    """
+    serializer_class = OrderSerializer
+    computed = {'total_items': ([], 'get_total_items')}
+    nested = {'items': CompiledOrderItemSerializer}
+    
+    def get_total_items(self, row):
+        return sum(item['quantity'] for item in row['items'])
 
 
 class OrderCreateSerializer(serializers.ModelSerializer):
@@ -52,9 +92,6 @@ class OrderCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         items_data = validated_data.pop('items')
         
-        # Generate unique order number
-        order_number = 'ORD' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
-        
         # Calculate total amount
         total = 0
         for item_data in items_data:
@@ -64,33 +101,38 @@ class OrderCreateSerializer(serializers.ModelSerializer):
             price = product.final_price
             total += price * quantity
         
-        # Create order
-        order = Order.objects.create(
-            order_number=order_number,
-            user=self.context['request'].user,
-            total_amount=total,
-            **validated_data
-        )
-        
-        # Create order items
-        for item_data in items_data:
-            product = item_data['product']
-            quantity = item_data['quantity']
-            price = product.final_price
+        with transaction.atomic():
+            # Stock first: the conditional updates lock the product rows
+            # (validate_items only gives early feedback, this is the real check)
+            reserve_stock((item['product'], item['quantity']) for item in items_data)
             
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                quantity=quantity,
-                price=price
+            order = self._create_order(
+                user=self.context['request'].user,
+                total_amount=total,
+                **validated_data
             )
-            
-            # Update product stock
-            product.stock -= quantity
-            product.save()
-        
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product=item_data['product'],
+                    quantity=item_data['quantity'],
+                    price=item_data['product'].final_price
+                )
+                for item_data in items_data
+            ])
+            record_order_sales([order.pk])
         return order
     
+    def _create_order(self, **fields):
+        """Create the order under a fresh order number, retrying on the rare collision"""
+        for attempt in range(ORDER_NUMBER_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    return Order.objects.create(order_number=next_order_number(), **fields)
+            except IntegrityError:
+                if attempt == ORDER_NUMBER_ATTEMPTS - 1:
+                    raise
+    
     def validate_items(self, items):
         """Validate order items"""
         if not items:
@@ -121,3 +163,68 @@ class OrderUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ['status', 'is_paid']
+    
+    def validate_status(self, value):
+        """Only moves allowed by Order.STATUS_TRANSITIONS"""
+        current = self.instance.status if self.instance else None
+        if current and value != current and not can_transition(current, value):
+            raise serializers.ValidationError(f"Cannot move an order from {current} to {value}")
+        return value
+
+
+def _limit_order_ids(order_ids):
+    if len(order_ids) > settings.ORDER_BULK_MAX_ITEMS:
+        raise serializers.ValidationError(f"At most {settings.ORDER_BULK_MAX_ITEMS} orders per request")
+    return order_ids
+
+
+class BulkCancelSerializer(serializers.Serializer):
+    """
+    Orders an admin bulk cancel applies to: explicit ids, filters over
+    cancellable orders, or both (at least one)
+    """
+    order_ids = serializers.ListField(child=serializers.IntegerField(min_value=1),
+                                      required=False, allow_empty=False)
+    payment_method = serializers.ChoiceField(choices=Order.PAYMENT_CHOICES, required=False)
+    is_paid = serializers.BooleanField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    
+    FILTERS = {
+        'payment_method': 'payment_method',
+        'is_paid': 'is_paid',
+        'created_after': 'created_at__gte',
+        'created_before': 'created_at__lt',
+    }
+    
+    def validate_order_ids(self, order_ids):
+        return _limit_order_ids(order_ids)
+    
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Send order_ids or at least one filter")
+        return attrs
+    
+    def get_order_ids(self):
+        """Ids to hand to cancel_orders()"""
+        filters = {lookup: self.validated_data[name]
+                   for name, lookup in self.FILTERS.items() if name in self.validated_data}
+        if not filters:
+            return self.validated_data['order_ids']
+        orders = Order.objects.filter(status__in=CANCELLABLE_STATUSES, **filters)
+        ids = list(orders.values_list('pk', flat=True))
+        if 'order_ids' in self.validated_data:
+            requested = set(self.validated_data['order_ids'])
+            ids = [pk for pk in ids if pk in requested]
+        return ids
+
+
+class BulkStatusSerializer(serializers.Serializer):
+    """
+    Move a list of orders to one status
+    """
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+    order_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+    
+    def validate_order_ids(self, order_ids):
+        return _limit_order_ids(order_ids)
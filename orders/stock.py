@@ -0,0 +1,68 @@
+"""
+Stock changes for checkout and cancellation
+
+Stock is never written by saving product instances: checkout runs one
+conditional UPDATE ... SET stock = stock - q WHERE stock >= q per product,
+so concurrent checkouts can't oversell and a checkout doesn't overwrite
+a price edit made in the meantime. Cancellation puts stock back with
+stock = stock + q. Products are always updated in id order, so two
+transactions locking the same rows can't deadlock.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Sum
+from rest_framework import serializers
+
+from core.bulk import add_to_rows
+from core.cache import bump_generation
+from products.models import Product
+from .models import OrderItem
+
+
+def _invalidate_products():
+    # Writes bypass model signals - drop cached product responses once committed
+    transaction.on_commit(lambda: bump_generation('product'))
+
+
+def reserve_stock(items):
+    """
+    Take stock for (product, quantity) pairs, all or nothing
+    Raises ValidationError naming the first product that can't be covered
+    """
+    quantities = Counter()
+    products = {}
+    for product, quantity in items:
+        if quantity <= 0:
+            # stock >= -q would pass and stock - (-q) would add stock
+            raise serializers.ValidationError({'items': [f'Quantity of {product.name} must be at least 1']})
+        quantities[product.pk] += quantity
+        products[product.pk] = product
+
+    with transaction.atomic():
+        for product_id in sorted(quantities):
+            quantity = quantities[product_id]
+            taken = (Product.objects
+                     .filter(pk=product_id, is_available=True, stock__gte=quantity)
+                     .update(stock=F('stock') - quantity))
+            if not taken:
+                raise serializers.ValidationError({'items': [_shortage(products[product_id])]})
+        _invalidate_products()
+
+
+def _shortage(product):
+    current = Product.objects.filter(pk=product.pk).values('stock', 'is_available').first()
+    if current is None or not current['is_available']:
+        return f"{product.name} is not available"
+    return f"Only {current['stock']} units of {product.name} available"
+
+
+def restore_stock(order_ids):
+    """Put the items of these orders back in stock: one aggregate and one batched UPDATE"""
+    quantities = dict(OrderItem.objects.filter(order_id__in=order_ids).order_by()
+                      .values_list('product_id').annotate(Sum('quantity')))
+    with transaction.atomic():
+        add_to_rows(Product, 'stock', quantities)
+        if quantities:
+            _invalidate_products()
+    return quantities
@@ -0,0 +1,253 @@
+import json
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from core.pagination import KeysetPagination, PageOrCursorPagination
+from products.models import Category, Product
+from .analytics import build_sales_rollups
+from .models import DailySales, IdempotencyKey, Order, OrderItem, ProductSales, VendorSales
+from .serializers import OrderCreateSerializer
+from .stock import reserve_stock
+from .transitions import transition_orders
+from .vendor_stats import rebuild_vendor_sales, record_order_sales
+
+User = get_user_model()
+
+
+class OrderTestMixin:
+    def setUp(self):
+        self.vendor = User.objects.create_user(username='vendor', email='vendor@example.com',
+                                               password='password', role='vendor')
+        self.customer = User.objects.create_user(username='customer', email='customer@example.com',
+                                                 password='password')
+        category = Category.objects.create(name='Books')
+        self.products = [
+            Product.objects.create(name=f'Book {i}', slug=f'book-{i}', description=f'Book {i}',
+                                   category=category, vendor=self.vendor, price=Decimal('10.00') + i,
+                                   stock=100, image='products/book.jpg')
+            for i in range(3)
+        ]
+
+    def create_order(self, items, status='pending'):
+        order = Order.objects.create(
+            order_number=f'ORD-{Order.objects.count() + 1}', user=self.customer, status=status,
+            shipping_address='1 Main St', shipping_city='City', shipping_state='State',
+            shipping_pincode='12345', phone='5550100',
+            total_amount=sum(product.price * quantity for product, quantity in items),
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=quantity, price=product.price)
+            for product, quantity in items
+        ])
+        return order
+
+
+@override_settings(SALES_ROLLUP_LAG=0)
+class SalesRollupTests(OrderTestMixin, TestCase):
+    def rollup(self):
+        return sorted(DailySales.objects.values_list(
+            'day', 'vendor_id', 'category_id', 'status', 'orders', 'units', 'revenue'
+        ))
+
+    def test_repeated_status_changes_match_a_full_rebuild(self):
+        orders = [self.create_order([(product, 2)]) for product in self.products]
+        build_sales_rollups()
+
+        transition_orders([orders[0].pk], 'cancelled')
+        transition_orders([order.pk for order in orders[1:]], 'confirmed')
+        transition_orders([orders[2].pk], 'shipped')
+        live = self.rollup()
+
+        build_sales_rollups(full=True)
+        self.assertEqual(live, self.rollup())
+        self.assertEqual(sorted(row[3] for row in live),
+                         ['cancelled', 'confirmed', 'shipped'])
+
+
+class VendorSalesTests(OrderTestMixin, TestCase):
+    def snapshot(self):
+        return (sorted(ProductSales.objects.values_list('product_id', 'vendor_id', 'units_sold', 'revenue')),
+                sorted(VendorSales.objects.values_list('vendor_id', 'orders', 'units_sold', 'revenue')))
+
+    def place_order(self, items):
+        order = self.create_order(items)
+        record_order_sales([order.pk])
+        return order
+
+    def test_live_aggregates_match_a_rebuild_after_cancellations(self):
+        other_vendor = User.objects.create_user(username='other', email='other@example.com',
+                                                password='password', role='vendor')
+        Product.objects.filter(pk=self.products[2].pk).update(vendor=other_vendor)
+        first = self.place_order([(self.products[0], 1), (self.products[1], 2)])
+        self.place_order([(self.products[1], 1)])
+        only = self.place_order([(self.products[2], 3)])
+
+        transition_orders([first.pk], 'cancelled')
+        live = self.snapshot()
+        rebuild_vendor_sales()
+        self.assertEqual(live, self.snapshot())
+        self.assertNotIn(self.products[0].pk, [row[0] for row in live[0]])
+
+        transition_orders([only.pk], 'cancelled')
+        live = self.snapshot()
+        rebuild_vendor_sales()
+        self.assertEqual(live, self.snapshot())
+        self.assertEqual([row[0] for row in live[1]], [self.vendor.pk])
+
+
+class IdempotentOrderCreateTests(OrderTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+        self.payload = {
+            'shipping_address': '1 Main St', 'shipping_city': 'City', 'shipping_state': 'State',
+            'shipping_pincode': '12345', 'phone': '5550100', 'payment_method': 'cod',
+            'items': [{'product': self.products[0].pk, 'quantity': 2}],
+        }
+
+    def post(self):
+        return self.client.post('/api/orders/create/', self.payload, format='json',
+                                HTTP_IDEMPOTENCY_KEY='checkout-1')
+
+    def test_crash_before_storing_the_response_rolls_back_the_order(self):
+        with mock.patch('orders.idempotency.store_response', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.post()
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].stock, 100)
+
+        first = self.post()
+        retry = self.post()
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class OrderListQueryTests(OrderTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for index in range(25):
+            self.create_order([(self.products[index % 3], 1), (self.products[(index + 1) % 3], 2)])
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def get_page(self, query, page_size):
+        with mock.patch.object(PageOrCursorPagination, 'page_size', page_size), \
+                mock.patch.object(KeysetPagination, 'page_size', page_size):
+            response = self.client.get(f'/api/orders/{query}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), page_size)
+        return response
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        cases = [
+            ('', 3),  # compiled serializer: count, page, items
+            ('?paginate=cursor', 2),  # page, items
+            ('?fields=order_number,total_items,items', 3),  # DRF serializer: count, page, items
+        ]
+        for query, queries in cases:
+            for page_size in (2, 20):
+                with self.subTest(query=query, page_size=page_size), self.assertNumQueries(queries):
+                    self.get_page(query, page_size)
+
+    def test_streamed_list_reads_items_per_chunk(self):
+        expected = [self.get_page('', 25).json()['results']]
+        for chunk_size, queries in ((10, 4), (25, 2)):  # orders, then items per chunk
+            with self.subTest(chunk_size=chunk_size), self.settings(JSON_STREAM_CHUNK_SIZE=chunk_size), \
+                    self.assertNumQueries(queries):
+                response = self.client.get('/api/orders/?paginate=stream')
+                expected.append(json.loads(b''.join(response.streaming_content)))
+        self.assertEqual(expected[0], expected[1])
+        self.assertEqual(expected[0], expected[2])
+
+
+def retry_locked(func, *args, attempts=100):
+    """Call func, retrying while SQLite's shared-cache test database reports a table lock"""
+    for attempt in range(attempts):
+        try:
+            return func(*args)
+        except OperationalError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.005)
+
+
+class FakeRequest:
+    def __init__(self, user):
+        self.user = user
+
+
+class ConcurrentCheckoutTests(OrderTestMixin, TransactionTestCase):
+    THREADS = 8
+    ATTEMPTS_PER_THREAD = 15
+
+    def checkout(self, lines):
+        data = {
+            'shipping_address': '1 Main St', 'shipping_city': 'City', 'shipping_state': 'State',
+            'shipping_pincode': '12345', 'phone': '5550100', 'payment_method': 'cod',
+            'items': [{'product': product.pk, 'quantity': quantity} for product, quantity in lines],
+        }
+        serializer = OrderCreateSerializer(data=data, context={'request': FakeRequest(self.customer)})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+    def test_concurrent_checkouts_never_oversell(self):
+        Product.objects.filter(pk__in=[product.pk for product in self.products]).update(stock=20)
+        lowest = []
+        errors = []
+
+        def buyer(seed):
+            try:
+                for attempt in range(self.ATTEMPTS_PER_THREAD):
+                    first = self.products[(seed + attempt) % 3]
+                    second = self.products[(seed + attempt + 1) % 3]
+                    try:
+                        retry_locked(self.checkout, [(first, 1 + attempt % 2), (second, 1)])
+                    except ValidationError:
+                        pass  # Sold out
+                    lowest.append(retry_locked(lambda: min(
+                        Product.objects.filter(pk__in=[first.pk, second.pk]).values_list('stock', flat=True)
+                    )))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buyer, args=(seed,)) for seed in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertGreaterEqual(min(lowest), 0)
+        sold = dict(OrderItem.objects.order_by().values_list('product').annotate(Sum('quantity')))
+        for product in self.products:
+            product.refresh_from_db()
+            self.assertGreaterEqual(product.stock, 0)
+            self.assertEqual(sold.get(product.pk, 0) + product.stock, 20)
+        # Far more was asked for than there was - most of it must have sold
+        self.assertGreater(sum(sold.values()), 50)
+
+    def test_non_positive_quantities_are_rejected(self):
+        for quantity in (0, -5):
+            with self.assertRaises(ValidationError):
+                self.checkout([(self.products[0], quantity)])
+            with self.assertRaises(ValidationError):
+                reserve_stock([(self.products[0], quantity)])
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].stock, 100)
@@ -0,0 +1,76 @@
+"""
+Order status state machine and set-based transitions
+
+Order.STATUS_TRANSITIONS declares which statuses each status may move
+to. transition_orders() moves any number of orders to one status a batch
+at a time; each batch is one transaction that locks the orders, applies a
+single UPDATE ... WHERE status IN (statuses allowed to move there), sets
+delivered_at in the same statement, restores stock for cancellations
+(orders.stock) and moves the orders in the sales rollup and vendor stats.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .analytics import apply_status_changes
+from .models import Order
+from .stock import restore_stock
+from .vendor_stats import record_status_changes
+
+# Orders customers may cancel themselves
+CANCELLABLE_STATUSES = ('pending',)
+TRANSITION_BATCH_SIZE = 500
+
+
+def can_transition(current, target):
+    return target in Order.STATUS_TRANSITIONS.get(current, ())
+
+
+def allowed_sources(target):
+    """Statuses an order may be in to move to target"""
+    return [status for status, targets in Order.STATUS_TRANSITIONS.items() if target in targets]
+
+
+def transition_orders(order_ids, target, sources=None):
+    """
+    Move orders to target where the state machine (or sources, if given) allows it
+    Returns {order id: outcome} with outcome {'status': 'updated' | 'unchanged' | 'error', ...}
+    """
+    sources = [status for status in (sources or allowed_sources(target)) if can_transition(status, target)]
+    order_ids = sorted(set(order_ids))
+    outcomes = {}
+    for start in range(0, len(order_ids), TRANSITION_BATCH_SIZE):
+        batch = order_ids[start:start + TRANSITION_BATCH_SIZE]
+        with transaction.atomic():
+            current = list(Order.objects.select_for_update().filter(pk__in=batch)
+                           .order_by('pk').values_list('pk', 'status', 'created_at'))
+            previous = [row for row in current if row[1] in sources]
+            ids = [pk for pk, _, _ in previous]
+            if ids:
+                now = timezone.now()
+                # update() skips auto_now - the rollup relies on updated_at moving
+                changes = {'status': target, 'updated_at': now}
+                if target == 'delivered':
+                    changes['delivered_at'] = now
+                Order.objects.filter(pk__in=ids, status__in=sources).update(**changes)
+                if target == 'cancelled':
+                    restore_stock(ids)
+                apply_status_changes(previous, target)
+                record_status_changes(previous, target)
+
+        for pk, status, _ in current:
+            if status in sources:
+                outcomes[pk] = {'status': 'updated', 'from': status}
+            elif status == target:
+                outcomes[pk] = {'status': 'unchanged'}
+            else:
+                outcomes[pk] = {'status': 'error', 'from': status,
+                                'error': f"Cannot move an order from {status} to {target}"}
+    for pk in order_ids:
+        outcomes.setdefault(pk, {'status': 'error', 'error': 'Order not found'})
+    return outcomes
+
+
+def cancel_orders(order_ids, sources=CANCELLABLE_STATUSES):
+    """Cancel the orders among order_ids that are in sources; returns the ids cancelled"""
+    outcomes = transition_orders(order_ids, 'cancelled', sources)
+    return [pk for pk, outcome in outcomes.items() if outcome['status'] == 'updated']
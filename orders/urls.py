@@ -5,7 +5,11 @@ from .views import (
     OrderCreateView,
     OrderUpdateView,
     OrderCancelView,
-    AdminOrderListView
+    AdminOrderListView,
+    AdminOrderExportView,
+    AdminBulkCancelView,
+    AdminBulkStatusView,
+    SalesAnalyticsView
 )
 
 urlpatterns = [
@@ -17,5 +21,9 @@ urlpatterns = [
     
     # Admin endpoints
     path('admin/all/', AdminOrderListView.as_view(), name='admin-order-list'),
+    path('admin/export/', AdminOrderExportView.as_view(), name='admin-order-export'),
+    path('admin/bulk-cancel/', AdminBulkCancelView.as_view(), name='admin-order-bulk-cancel'),
+    path('admin/bulk-status/', AdminBulkStatusView.as_view(), name='admin-order-bulk-status'),
+    path('admin/analytics/sales/', SalesAnalyticsView.as_view(), name='admin-sales-analytics'),
     path('admin/<int:pk>/update/', OrderUpdateView.as_view(), name='admin-order-update'),
 ]
@@ -0,0 +1,137 @@
+"""
+Per-vendor sales aggregates behind the vendor dashboard
+
+ProductSales and VendorSales are adjusted when orders are placed,
+cancelled or moved in and out of 'cancelled', so the dashboard never
+joins OrderItem at request time. rebuild_vendor_sales() recomputes
+them from scratch (python manage.py rebuild_vendor_sales).
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from core.bulk import increment
+from products.models import Product
+from .models import OrderItem, ProductSales, VendorSales
+
+ORDERS_PER_BATCH = 500
+
+
+def _item_revenue():
+    return Sum(ExpressionWrapper(
+        F('quantity') * F('price'),
+        output_field=DecimalField(max_digits=14, decimal_places=2)
+    ))
+
+
+def _sales_by_product(items):
+    return (items.order_by().values('product_id', vendor_id=F('product__vendor_id'))
+            .annotate(units_sold=Sum('quantity'), revenue=_item_revenue()))
+
+
+def _sales_by_vendor(items):
+    return (items.order_by().values(vendor_id=F('product__vendor_id'))
+            .annotate(orders=Count('order_id', distinct=True),
+                      units_sold=Sum('quantity'), revenue=_item_revenue()))
+
+
+def record_order_sales(order_ids, sign=1):
+    """Add (sign=1) or remove (sign=-1) the items of these orders from the aggregates"""
+    order_ids = list(order_ids)
+    with transaction.atomic():
+        for start in range(0, len(order_ids), ORDERS_PER_BATCH):
+            items = OrderItem.objects.filter(order_id__in=order_ids[start:start + ORDERS_PER_BATCH])
+            for row in _sales_by_product(items):
+                increment(ProductSales, {'product_id': row['product_id']},
+                          defaults={'vendor_id': row['vendor_id']},
+                          units_sold=sign * row['units_sold'], revenue=sign * row['revenue'])
+            vendor_ids = set()
+            for row in _sales_by_vendor(items):
+                increment(VendorSales, {'vendor_id': row['vendor_id']},
+                          orders=sign * row['orders'], units_sold=sign * row['units_sold'],
+                          revenue=sign * row['revenue'])
+                vendor_ids.add(row['vendor_id'])
+            if sign < 0:
+                # Nothing sold any more - drop the rows, as rebuild_vendor_sales() has none
+                ProductSales.objects.filter(vendor_id__in=vendor_ids, units_sold__lte=0).delete()
+                VendorSales.objects.filter(vendor_id__in=vendor_ids, orders__lte=0).delete()
+
+
+def record_status_changes(previous, new_status):
+    """
+    Adjust the aggregates for orders moving in or out of 'cancelled'
+    previous: (pk, status, created_at) of each order as loaded before the change
+    """
+    if new_status == 'cancelled':
+        leaving = [pk for pk, status, _ in previous if status != 'cancelled']
+        record_order_sales(leaving, -1)
+    else:
+        returning = [pk for pk, status, _ in previous if status == 'cancelled']
+        record_order_sales(returning, 1)
+
+
+def rebuild_vendor_sales():
+    """Recompute every aggregate from order items; returns the number of vendors"""
+    items = OrderItem.objects.exclude(order__status='cancelled')
+    with transaction.atomic():
+        ProductSales.objects.all().delete()
+        VendorSales.objects.all().delete()
+        ProductSales.objects.bulk_create(
+            (ProductSales(**row) for row in _sales_by_product(items).iterator()), batch_size=1000
+        )
+        vendors = [VendorSales(**row) for row in _sales_by_vendor(items)]
+        VendorSales.objects.bulk_create(vendors, batch_size=1000)
+    return len(vendors)
+
+
+def vendor_dashboard(vendor_id):
+    """Sales, inventory, low-stock and top-seller summary for one vendor"""
+    limit = settings.VENDOR_DASHBOARD_LIST_SIZE
+    threshold = settings.VENDOR_LOW_STOCK_THRESHOLD
+
+    sales = (VendorSales.objects.filter(vendor_id=vendor_id)
+             .values('orders', 'units_sold', 'revenue').first()
+             or {'orders': 0, 'units_sold': 0, 'revenue': 0})
+
+    products = Product.objects.filter(vendor_id=vendor_id)
+    inventory = products.aggregate(
+        products=Count('id'),
+        stock_units=Coalesce(Sum('stock'), 0),
+        # Valued at the selling price (discount price when set)
+        stock_value=Sum(ExpressionWrapper(
+            F('stock') * Coalesce('discount_price', 'price'),
+            output_field=DecimalField(max_digits=14, decimal_places=2)
+        )),
+        low_stock=Count('id', filter=Q(stock__lte=threshold)),
+    )
+    low_stock = (products.filter(stock__lte=threshold).order_by('stock', 'id')
+                 .values('id', 'name', 'slug', 'stock', 'is_available')[:limit])
+    top_products = (ProductSales.objects.filter(vendor_id=vendor_id, units_sold__gt=0)
+                    .order_by('-units_sold', 'product_id')
+                    .values('product_id', 'product__name', 'product__slug',
+                            'units_sold', 'revenue')[:limit])
+
+    return {
+        'orders': sales['orders'],
+        'units_sold': sales['units_sold'],
+        'revenue': f"{sales['revenue']:.2f}",
+        'products': inventory['products'],
+        'stock_units': inventory['stock_units'],
+        'stock_value': f"{inventory['stock_value'] or 0:.2f}",
+        'low_stock': {
+            'threshold': threshold,
+            'count': inventory['low_stock'],
+            'products': list(low_stock),
+        },
+        'top_products': [
+            {
+                'id': row['product_id'],
+                'name': row['product__name'],
+                'slug': row['product__slug'],
+                'units_sold': row['units_sold'],
+                'revenue': f"{row['revenue']:.2f}",
+            }
+            for row in top_products
+        ],
+    }
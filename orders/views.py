@@ -1,36 +1,71 @@
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import OuterRef, Prefetch, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import generics, status
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
+from .analytics import GROUP_FIELDS, get_high_water_mark, sales_report
+from .export import FORMATS, iter_export
+from .idempotency import IdempotentCreateMixin
+from .transitions import cancel_orders, transition_orders
 from .models import Order, OrderItem
 from .serializers import (
     OrderSerializer, 
+    CompiledOrderSerializer,
     OrderCreateSerializer, 
-    OrderUpdateSerializer
+    OrderUpdateSerializer,
+    BulkCancelSerializer,
+    BulkStatusSerializer
 )
 from accounts.permissions import IsAdminUser
+from core.compiled import CompiledListMixin
+from core.fieldsets import SparseFieldsetMixin
+from core.pagination import PageOrCursorPagination
+from core.query_budget import QueryBudgetMixin
+
+
+def with_order_details(queryset):
+    """
+    Load everything OrderSerializer reads in a fixed number of queries:
+    the user joined, total_quantity as a subquery, items and their products in one prefetch
+    """
+    quantities = (OrderItem.objects.filter(order=OuterRef('pk')).order_by()
+                  .values('order').annotate(total=Sum('quantity')).values('total'))
+    return (queryset.select_related('user')
+            .annotate(total_quantity=Coalesce(Subquery(quantities), 0))
+            .prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('product'))))
 
 
-class OrderListView(generics.ListAPIView):
+class OrderListView(QueryBudgetMixin, SparseFieldsetMixin, CompiledListMixin, generics.ListAPIView):
     """
     List all orders for current user
     """
     serializer_class = OrderSerializer
+    compiled_serializer_class = CompiledOrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = PageOrCursorPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['status', 'payment_method', 'is_paid']
     ordering_fields = ['created_at', 'total_amount']
     ordering = ['-created_at']
+    # Same whatever the page size: auth, count, page, items
+    query_budget = 4
     
     def get_queryset(self):
         # Users see only their orders, admins see all
         if self.request.user.is_admin:
-            return Order.objects.all()
-        return Order.objects.filter(user=self.request.user)
+            return with_order_details(Order.objects.all())
+        return with_order_details(Order.objects.filter(user=self.request.user))
 
 
-class OrderDetailView(generics.RetrieveAPIView):
+class OrderDetailView(SparseFieldsetMixin, generics.RetrieveAPIView):
     """
     Get detailed order information
     Users can only view their own orders
@@ -41,14 +76,15 @@ class OrderDetailView(generics.RetrieveAPIView):
     def get_queryset(self):
         # Users can only access their own orders
         if self.request.user.is_admin:
-            return Order.objects.all()
-        return Order.objects.filter(user=self.request.user)
+            return with_order_details(Order.objects.all())
+        return with_order_details(Order.objects.filter(user=self.request.user))
 
 
-class OrderCreateView(generics.CreateAPIView):
+class OrderCreateView(IdempotentCreateMixin, generics.CreateAPIView):
     """
     Create new order
     Authenticated users only
+    Send an Idempotency-Key header to make retries safe
     """
     serializer_class = OrderCreateSerializer
     permission_classes = [IsAuthenticated]
@@ -83,7 +119,20 @@ class OrderUpdateView(generics.UpdateAPIView):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
+        new_status = serializer.validated_data.get('status', instance.status)
+        
+        with transaction.atomic():
+            if new_status != instance.status:
+                # Status moves go through the state machine, which also keeps
+                # stock, the sales rollup and vendor stats in step
+                outcome = transition_orders([instance.pk], new_status)[instance.pk]
+                if outcome['status'] == 'error':
+                    return Response({'error': outcome['error']}, status=status.HTTP_400_BAD_REQUEST)
+                instance.refresh_from_db()
+            is_paid = serializer.validated_data.get('is_paid', instance.is_paid)
+            if is_paid != instance.is_paid:
+                instance.is_paid = is_paid
+                instance.save(update_fields=['is_paid', 'updated_at'])
         
         # Return updated order
         order_serializer = OrderSerializer(instance)
@@ -114,15 +163,14 @@ class OrderCancelView(generics.UpdateAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Update order status
-        order.status = 'cancelled'
-        order.save()
-        
-        # Restore product stock
-        for item in order.items.all():
-            product = item.product
-            product.stock += item.quantity
-            product.save()
+        # Status, stock and sales stats change together in a few statements
+        if not cancel_orders([order.pk]):
+            # Its status changed since we loaded it
+            return Response(
+                {'error': 'Only pending orders can be cancelled'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        order.refresh_from_db(fields=['status', 'updated_at'])
         
         return Response({
             'message': 'Order cancelled successfully',
@@ -130,16 +178,157 @@ class OrderCancelView(generics.UpdateAPIView):
         })
 
 
-class AdminOrderListView(generics.ListAPIView):
+class AdminOrderListView(QueryBudgetMixin, SparseFieldsetMixin, CompiledListMixin,
+                         generics.ListAPIView):
     """
     List all orders - Admin only
     With advanced filtering
     """
-    queryset = Order.objects.all()
+    queryset = with_order_details(Order.objects.all())
     serializer_class = OrderSerializer
+    compiled_serializer_class = CompiledOrderSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = PageOrCursorPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'payment_method', 'is_paid', 'user']
     search_fields = ['order_number', 'user__email', 'phone']
     ordering_fields = ['created_at', 'total_amount', 'status']
     ordering = ['-created_at']
+    query_budget = 4
+
+
+class AdminOrderExportView(AdminOrderListView):
+    """
+    Stream all orders with their items as CSV or NDJSON - Admin only
+    Accepts the same filters, search and ordering as AdminOrderListView
+    ?export_format=csv (default) or ?export_format=ndjson
+    """
+    query_budget = None  # One query per chunk of orders
+    
+    def get_fieldset(self):
+        # Exports have fixed columns
+        return None, None
+    
+    def list(self, request, *args, **kwargs):
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in FORMATS:
+            return Response(
+                {'error': f'export_format must be one of {", ".join(FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            iter_export(queryset, export_format),
+            content_type=FORMATS[export_format]
+        )
+        filename = f"orders-{timezone.localdate():%Y%m%d}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class AdminBulkCancelView(APIView):
+    """
+    Cancel many pending orders at once - Admin only
+    POST {"order_ids": [...]} and/or filters over pending orders:
+    {"payment_method": "online", "is_paid": false, "created_after": ..., "created_before": ...}
+    Stock is restored and sales stats adjusted set-based, 500 orders per transaction
+    """
+    permission_classes = [IsAdminUser]
+    
+    def post(self, request):
+        serializer = BulkCancelSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        requested = serializer.get_order_ids()
+        cancelled = cancel_orders(requested)
+        
+        response = {'cancelled': len(cancelled), 'order_ids': cancelled}
+        if 'order_ids' in serializer.validated_data:
+            done = set(cancelled)
+            # Unknown ids and orders that are no longer pending
+            response['skipped'] = [pk for pk in serializer.validated_data['order_ids'] if pk not in done]
+        return Response(response)
+
+
+class AdminBulkStatusView(APIView):
+    """
+    Move many orders to one status - Admin only
+    POST {"status": "shipped", "order_ids": [...]}
+    Only moves allowed by Order.STATUS_TRANSITIONS are applied; each order
+    gets an outcome (updated / unchanged / error) instead of the full order
+    """
+    permission_classes = [IsAdminUser]
+    
+    def post(self, request):
+        serializer = BulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        target = serializer.validated_data['status']
+        order_ids = serializer.validated_data['order_ids']
+        outcomes = transition_orders(order_ids, target)
+        
+        results = [{'id': pk, **outcomes[pk]} for pk in order_ids]
+        summary = {result: sum(1 for outcome in outcomes.values() if outcome['status'] == result)
+                   for result in ('updated', 'unchanged', 'error')}
+        return Response({'status': target, **summary, 'results': results})
+
+
+class SalesAnalyticsView(APIView):
+    """
+    Sales totals from the daily rollup - Admin only
+    ?start=YYYY-MM-DD&end=YYYY-MM-DD (default: the last 30 days)
+    ?group_by=day,vendor,category,status  ?vendor=<id>  ?category=<id>  ?status=delivered,shipped
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        params = request.query_params
+        try:
+            end = date.fromisoformat(params['end']) if params.get('end') else timezone.localdate()
+            start = date.fromisoformat(params['start']) if params.get('start') else end - timedelta(days=29)
+        except ValueError:
+            return Response(
+                {'error': 'start and end must be dates (YYYY-MM-DD)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start > end:
+            return Response(
+                {'error': 'start must not be after end'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        group_by = [name for name in params.get('group_by', 'day').split(',') if name]
+        unknown = set(group_by) - set(GROUP_FIELDS)
+        if unknown:
+            return Response(
+                {'error': f'Cannot group by {", ".join(sorted(unknown))}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        statuses = [value for value in params.get('status', '').split(',') if value]
+        for value in ('vendor', 'category'):
+            if params.get(value) and not params[value].isdigit():
+                return Response(
+                    {'error': f'{value} must be an id'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        totals, results = sales_report(
+            start, end, group_by,
+            vendor=params.get('vendor'), category=params.get('category'), statuses=statuses
+        )
+        return Response({
+            'start': start,
+            'end': end,
+            'group_by': group_by,
+            'built_through': get_high_water_mark(),
+            'totals': self.format_row(totals),
+            'results': [self.format_row(row) for row in results],
+        })
+    
+    @staticmethod
+    def format_row(row):
+        row = {key.replace('__', '_'): value for key, value in row.items()}
+        row['orders'] = row['orders'] or 0
+        row['units'] = row['units'] or 0
+        row['revenue'] = f"{row['revenue'] or 0:.2f}"
+        return row
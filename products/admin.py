@@ -23,6 +23,8 @@ class ProductAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     inlines = [ProductImageInline]
     list_editable = ('price', 'stock', 'is_available')
+    readonly_fields = ('views', 'rating_sum', 'rating_count', 'average_rating',
+                       'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5')
 
 
 @admin.register(Review)
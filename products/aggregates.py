@@ -0,0 +1,110 @@
+"""
+Helpers for keeping denormalized counters in sync:
+review aggregates on Product and available product counts on Category
+"""
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, When
+from django.db.models.functions import Cast
+
+from .models import Category, Product, Review
+
+RATING_FIELDS = {i: f'rating_{i}' for i in range(1, 6)}
+AGGREGATE_FIELDS = ['rating_sum', 'rating_count', 'average_rating'] + list(RATING_FIELDS.values())
+
+
+def refresh_average_rating(queryset):
+    """Recompute average_rating from the stored sum and count"""
+    return queryset.update(
+        average_rating=Case(
+            When(rating_count__lte=0, then=0.0),
+            default=Cast('rating_sum', FloatField()) / F('rating_count'),
+            output_field=FloatField(),
+        )
+    )
+
+
+def apply_rating_change(product_id, rating, delta):
+    """
+    Add (delta=1) or remove (delta=-1) a single rating from a product
+    Uses F() expressions so concurrent reviews never lose updates
+    """
+    field = RATING_FIELDS[rating]
+    products = Product.objects.filter(pk=product_id)
+    with transaction.atomic():
+        products.update(
+            rating_sum=F('rating_sum') + rating * delta,
+            rating_count=F('rating_count') + delta,
+            **{field: F(field) + delta}
+        )
+        refresh_average_rating(products)
+
+
+def rebuild_rating_aggregates(product_ids=None, batch_size=1000):
+    """
+    Recompute review aggregates from scratch
+    Walks products in primary key order so memory stays bounded
+    Returns the number of products processed
+    """
+    products = Product.objects.order_by('pk')
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+
+    processed = 0
+    last_pk = 0
+    while True:
+        batch = list(products.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            break
+
+        # One grouped query per batch instead of one per product
+        counts = {pk: {i: 0 for i in RATING_FIELDS} for pk in batch}
+        rows = (Review.objects.filter(product_id__in=batch)
+                .values('product_id', 'rating')
+                .annotate(total=Count('id')))
+        for row in rows:
+            counts[row['product_id']][row['rating']] = row['total']
+
+        updates = []
+        for pk, histogram in counts.items():
+            product = Product(pk=pk)
+            product.rating_count = sum(histogram.values())
+            product.rating_sum = sum(rating * total for rating, total in histogram.items())
+            product.average_rating = (
+                product.rating_sum / product.rating_count if product.rating_count else 0
+            )
+            for rating, field in RATING_FIELDS.items():
+                setattr(product, field, histogram[rating])
+            updates.append(product)
+
+        with transaction.atomic():
+            Product.objects.bulk_update(updates, AGGREGATE_FIELDS)
+
+        processed += len(batch)
+        last_pk = batch[-1]
+
+    return processed
+
+
+def available_product_count():
+    """Count(...) expression for a category's available products"""
+    return Count('products', filter=Q(products__is_available=True))
+
+
+def apply_category_count_change(category_id, delta):
+    """Adjust a category's stored product_count by delta"""
+    Category.objects.filter(pk=category_id).update(product_count=F('product_count') + delta)
+
+
+def recount_category_products(category_ids=None):
+    """
+    Recompute stored product counts with one grouped query
+    Use after bulk writes that bypass model signals
+    """
+    categories = Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(pk__in=category_ids)
+    counts = dict(categories.annotate(total=available_product_count()).values_list('pk', 'total'))
+    updates = [Category(pk=pk, product_count=total) for pk, total in counts.items()]
+    with transaction.atomic():
+        Category.objects.bulk_update(updates, ['product_count'], batch_size=1000)
+    return len(updates)
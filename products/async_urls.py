@@ -0,0 +1,17 @@
+from django.urls import path
+from .async_views import (
+    AsyncCategoryListView,
+    AsyncCategoryDetailView,
+    AsyncProductListView,
+    AsyncProductDetailView,
+    AsyncReviewListView
+)
+
+# Read-only twins of the catalog endpoints in products.urls, for ASGI deployments
+urlpatterns = [
+    path('categories/', AsyncCategoryListView.as_view(), name='async-category-list'),
+    path('categories/<int:pk>/', AsyncCategoryDetailView.as_view(), name='async-category-detail'),
+    path('', AsyncProductListView.as_view(), name='async-product-list'),
+    path('<slug:slug>/', AsyncProductDetailView.as_view(), name='async-product-detail'),
+    path('<int:product_id>/reviews/', AsyncReviewListView.as_view(), name='async-review-list'),
+]
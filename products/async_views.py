@@ -0,0 +1,67 @@
+"""
+Async catalog read endpoints for ASGI deployments (/api/async/products/)
+
+Same querysets, filters, serializers, caching and pagination as the
+views in products.views - only the I/O is awaited (see core.async_views)
+"""
+from asgiref.sync import sync_to_async
+from rest_framework.response import Response
+
+from core.async_views import AsyncListMixin, AsyncRetrieveMixin, alist, in_loop_or_thread
+from core.cache import AsyncCachedResponseMixin
+from .serializers import latest_reviews
+from .view_counter import record_view
+from .views import (
+    CategoryListCreateView,
+    CategoryDetailView,
+    ProductListView,
+    ProductDetailView,
+    ReviewListCreateView
+)
+
+
+class AsyncCategoryListView(AsyncCachedResponseMixin, AsyncListMixin, CategoryListCreateView):
+    """
+    List active categories (cached)
+    """
+
+
+class AsyncCategoryDetailView(AsyncRetrieveMixin, CategoryDetailView):
+    """
+    Retrieve a category
+    """
+
+
+class AsyncProductListView(AsyncCachedResponseMixin, AsyncListMixin, ProductListView):
+    """
+    List products with filtering, search and pagination (cached)
+    """
+
+
+class AsyncProductDetailView(AsyncCachedResponseMixin, AsyncRetrieveMixin, ProductDetailView):
+    """
+    Get detailed product information (cached)
+    Counts a view on each access like ProductDetailView
+    """
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        self.product_id = instance.pk
+        serializer = self.get_serializer(instance)
+        if 'reviews' in serializer.fields:
+            instance.latest_reviews = await alist(latest_reviews(instance))
+
+        # The view counter may flush to the database
+        pending = await sync_to_async(record_view)(instance.pk)
+        if 'views' not in instance.get_deferred_fields():
+            instance.views += pending or 1
+        return Response(await in_loop_or_thread(lambda: serializer.data))
+
+    async def acache_hit(self, request, payload):
+        await sync_to_async(record_view)(payload['product_id'])
+
+
+class AsyncReviewListView(AsyncListMixin, ReviewListCreateView):
+    """
+    List reviews for a product
+    """
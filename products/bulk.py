@@ -0,0 +1,145 @@
+"""
+Bulk price and stock updates for vendor catalogs
+
+Items are matched by id or slug with one ownership query per chunk. Only
+the fields each item sends are written, with one prepared UPDATE per set
+of fields run through executemany(), all inside one transaction.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.bulk import update_rows
+from core.cache import bump_generation
+from .aggregates import recount_category_products
+from .importer import FALSE_VALUES, TRUE_VALUES, clean_text, parse_decimal
+from .models import Product
+
+PRICE_STOCK_FIELDS = ['price', 'discount_price', 'stock', 'is_available']
+LOOKUP_CHUNK = 500
+
+
+def _clean_item(item):
+    """Return (changes, errors) for one request item"""
+    if not isinstance(item, dict):
+        return None, {'non_field_errors': ['Expected an object.']}
+
+    errors = {}
+    changes = {}
+    if 'price' in item:
+        changes['price'] = parse_decimal(item['price'], errors, 'price', required=True)
+    if 'discount_price' in item:
+        changes['discount_price'] = parse_decimal(item['discount_price'], errors, 'discount_price')
+    if 'stock' in item:
+        try:
+            changes['stock'] = int(item['stock'])
+            if changes['stock'] < 0:
+                errors['stock'] = ['Ensure this value is greater than or equal to 0.']
+        except (TypeError, ValueError):
+            errors['stock'] = ['A valid integer is required.']
+    if 'is_available' in item:
+        value = item['is_available']
+        if isinstance(value, bool):
+            changes['is_available'] = value
+        elif clean_text(value).lower() in TRUE_VALUES | FALSE_VALUES:
+            changes['is_available'] = clean_text(value).lower() in TRUE_VALUES
+        else:
+            errors['is_available'] = ['Must be a valid boolean.']
+
+    if not changes and not errors:
+        errors['non_field_errors'] = [f'Nothing to update - send any of {", ".join(PRICE_STOCK_FIELDS)}.']
+    if 'id' not in item and not item.get('slug'):
+        errors['non_field_errors'] = ['Each item needs an id or a slug.']
+    return changes, errors
+
+
+def _load_products(items):
+    """Fetch every referenced product with one query per chunk, keyed by id and by slug"""
+    ids, slugs = set(), set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        if 'id' in item:
+            try:
+                ids.add(int(item['id']))
+            except (TypeError, ValueError):
+                pass
+        elif item.get('slug'):
+            slugs.add(str(item['slug']))
+
+    columns = ['id', 'slug', 'vendor_id', 'category_id'] + PRICE_STOCK_FIELDS
+    by_id, by_slug = {}, {}
+    ids, slugs = list(ids), list(slugs)
+    for start in range(0, max(len(ids), len(slugs)), LOOKUP_CHUNK):
+        lookup = (Q(pk__in=ids[start:start + LOOKUP_CHUNK]) |
+                  Q(slug__in=slugs[start:start + LOOKUP_CHUNK]))
+        for row in Product.objects.filter(lookup).values(*columns):
+            by_id[row['id']] = row
+            by_slug[row['slug']] = row
+    return by_id, by_slug
+
+
+def bulk_update_prices_and_stock(user, items):
+    """
+    Apply price / stock / availability changes for a vendor (admins may touch any product)
+    Returns (summary, per-item results in request order)
+    """
+    by_id, by_slug = _load_products(items)
+    results = []
+    pending = {}
+    for index, item in enumerate(items):
+        changes, errors = _clean_item(item)
+        result = {'index': index}
+        product = None
+        if not errors:
+            if 'id' in item:
+                try:
+                    product = by_id.get(int(item['id']))
+                except (TypeError, ValueError):
+                    errors = {'id': ['A valid integer is required.']}
+            else:
+                product = by_slug.get(str(item['slug']))
+            if product is None and not errors:
+                errors = {'non_field_errors': ['Product not found.']}
+            elif product is not None and product['vendor_id'] != user.pk and not user.is_admin:
+                errors = {'non_field_errors': ['You do not have permission to update this product.']}
+                product = None
+
+        if errors:
+            result.update(status='error', errors=errors)
+        else:
+            result.update(id=product['id'], slug=product['slug'])
+            sent = dict(pending.get(product['id'], {}), **changes)
+            # Only the fields sent are written, so columns nobody asked to
+            # change (stock taken by a checkout meanwhile) are left alone
+            changed = {field: value for field, value in sent.items() if value != product[field]}
+            if changed:
+                pending[product['id']] = changed
+                result['status'] = 'updated'
+            else:
+                pending.pop(product['id'], None)
+                result['status'] = 'unchanged'
+        results.append(result)
+
+    # One prepared UPDATE per combination of fields sent
+    now = timezone.now()
+    groups = {}
+    for pk, changed in pending.items():
+        fields = tuple(field for field in PRICE_STOCK_FIELDS if field in changed)
+        groups.setdefault(fields, []).append(dict(changed, id=pk, updated_at=now))
+    with transaction.atomic():
+        for fields, rows in groups.items():
+            update_rows(Product, list(fields) + ['updated_at'], rows)
+
+    # Writes bypass model signals - refresh what depends on these columns
+    availability_changed = {
+        by_id[pk]['category_id'] for pk, changed in pending.items() if 'is_available' in changed
+    }
+    if availability_changed:
+        recount_category_products(availability_changed)
+    if pending:
+        bump_generation('product')
+
+    summary = {status: sum(1 for result in results if result['status'] == status)
+               for status in ('updated', 'unchanged', 'error')}
+    return summary, results
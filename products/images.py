@@ -0,0 +1,111 @@
+"""
+Responsive image variants for product photos
+
+Every uploaded product image (and gallery image) gets thumbnail and
+medium renditions in JPEG and WebP, saved next to the original:
+    products/shoe.jpg -> products/shoe__thumbnail.jpg, products/shoe__medium.webp ...
+
+Variants are rendered by a small thread pool after the upload has been
+committed, and the generated names are stored on the row so serializers
+never have to touch storage to build URLs.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from core.cache import bump_generation
+
+# name -> longest edge in pixels
+SIZES = {'thumbnail': 200, 'medium': 600}
+FORMATS = {'jpg': 'JPEG', 'webp': 'WEBP'}
+QUALITY = 82
+
+_executor = None
+
+
+def variant_name(name, size, extension):
+    root, _ = os.path.splitext(name)
+    return f'{root}__{size}.{extension}'
+
+
+def render_variants(name, storage=default_storage):
+    """
+    Render every variant of the stored image `name`
+    Returns {'thumbnail': '...jpg', 'thumbnail_webp': '...webp', ...}
+    """
+    with storage.open(name, 'rb') as handle:
+        original = ImageOps.exif_transpose(Image.open(handle))
+        original.load()
+
+    variants = {}
+    for size_name, edge in SIZES.items():
+        image = original.copy()
+        image.thumbnail((edge, edge), Image.LANCZOS)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        for extension, image_format in FORMATS.items():
+            buffer = BytesIO()
+            image.save(buffer, image_format, quality=QUALITY, optimize=True)
+            target = variant_name(name, size_name, extension)
+            # Overwrite instead of letting storage pick a new random suffix
+            if storage.exists(target):
+                storage.delete(target)
+            key = size_name if extension == 'jpg' else f'{size_name}_{extension}'
+            variants[key] = storage.save(target, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def variant_urls(variants, request=None):
+    """Turn stored variant names into (absolute) URLs"""
+    urls = {}
+    for key, name in (variants or {}).items():
+        url = default_storage.url(name)
+        urls[key] = request.build_absolute_uri(url) if request else url
+    return urls
+
+
+def process_image(model, pk, name):
+    """Render variants for one row and store their names, skipping stale jobs"""
+    try:
+        variants = render_variants(name)
+    except (OSError, ValueError):
+        # Missing or unreadable file - leave the row without variants
+        return {}
+    # Only record them if the row still points at the same upload
+    if model.objects.filter(pk=pk, image=name).update(image_variants=variants):
+        # update() skips the signals - cached responses still have no variants
+        transaction.on_commit(lambda: bump_generation('product'))
+    return variants
+
+
+def _run(model, pk, name):
+    try:
+        process_image(model, pk, name)
+    finally:
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_VARIANT_WORKERS, thread_name_prefix='image-variants'
+        )
+    return _executor
+
+
+def schedule_variants(instance):
+    """Render variants in the background once the current transaction commits"""
+    if not instance.image:
+        return
+    model, pk, name = type(instance), instance.pk, instance.image.name
+    if settings.IMAGE_VARIANT_WORKERS <= 0:
+        transaction.on_commit(lambda: process_image(model, pk, name))
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_run, model, pk, name))
@@ -0,0 +1,307 @@
+"""
+Streaming bulk product import for vendor catalogs (CSV or JSON lines)
+
+Rows are parsed one at a time and handled in batches: every batch is
+validated, has its categories and slugs resolved with one query each,
+and is written with prepared executemany() INSERT / UPDATE statements
+inside a transaction. Rows identical to the stored product are skipped.
+Memory use depends on the batch size, not on the size of the file.
+
+Columns: name, slug, description, category (name or id), price,
+discount_price, stock, is_available, image (path in media storage).
+A row whose slug already belongs to the vendor updates that product;
+optional columns the row leaves out (or leaves empty, except
+discount_price) keep their stored values. New products need an image.
+"""
+import codecs
+import csv
+import json
+import re
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from core.bulk import update_rows
+from core.cache import bump_generation
+from .aggregates import recount_category_products
+from .models import Category, Product
+from .search import get_search_backend
+
+FORMATS = ('csv', 'jsonl')
+SLUG_RE = re.compile(r'^[-a-zA-Z0-9_]+$')
+IMPORTED_FIELDS = ['name', 'slug', 'description', 'category_id', 'price', 'discount_price',
+                   'stock', 'is_available', 'image']
+COMPARED_FIELDS = [field for field in IMPORTED_FIELDS if field != 'slug']
+# Used for new products when the row leaves them out
+OPTIONAL_DEFAULTS = {'discount_price': None, 'stock': 0, 'is_available': True}
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f'}
+MAX_REPORTED_ERRORS = 1000
+
+# What the search backend needs to index a product
+IndexedProduct = namedtuple('IndexedProduct', ['pk', 'name', 'description'])
+
+
+def detect_format(filename):
+    """Guess the import format from a file name"""
+    name = (filename or '').lower()
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    return 'csv'
+
+
+def iter_rows(stream, file_format):
+    """
+    Yield (row_number, dict) from a binary or text stream without loading it whole
+    Lines that can't be parsed are yielded as (row_number, None)
+    """
+    if isinstance(stream.read(0), bytes):
+        stream = codecs.getreader('utf-8-sig')(stream)
+
+    if file_format == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, row
+        return
+
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def clean_text(value):
+    return '' if value is None else str(value).strip()
+
+
+def parse_decimal(value, errors, field, required=False):
+    value = clean_text(value)
+    if not value:
+        if required:
+            errors[field] = ['This field is required.']
+        return None
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        errors[field] = ['A valid number is required.']
+        return None
+    if not number.is_finite() or number < 0:
+        errors[field] = ['Enter a positive number.']
+    elif number.as_tuple().exponent < -2:
+        errors[field] = ['Ensure that there are no more than 2 decimal places.']
+    elif number >= 10 ** 8:
+        errors[field] = ['Ensure that there are no more than 10 digits in total.']
+    return number
+
+
+class ProductImporter:
+    """
+    Import products for one vendor
+    Call run() with an iterable of (row_number, dict) and read the report
+    """
+
+    def __init__(self, vendor, batch_size=1000, update_existing=True):
+        self.vendor = vendor
+        self.batch_size = batch_size
+        self.update_existing = update_existing
+        self.categories = {}
+        self.touched_categories = set()
+        self.report = {'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'errors': []}
+
+    def run(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch)
+                batch = []
+        if batch:
+            self._import_batch(batch)
+
+        # Bulk writes skip model signals - refresh derived data once at the end
+        if self.touched_categories:
+            recount_category_products(self.touched_categories)
+        if self.report['created'] or self.report['updated']:
+            bump_generation('product')
+        return self.report
+
+    def _error(self, number, errors):
+        self.report['failed'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+            self.report['errors'].append({'row': number, 'errors': errors})
+        else:
+            self.report['errors_truncated'] = True
+
+    def _resolve_categories(self, rows):
+        """Look up every category referenced in the batch with one query"""
+        wanted = {clean_text(row.get('category')) for _, row in rows if row} - set(self.categories)
+        wanted.discard('')
+        if not wanted:
+            return
+        ids = [int(value) for value in wanted if value.isdigit()]
+        for category in Category.objects.filter(name__in=wanted) | Category.objects.filter(pk__in=ids):
+            self.categories[category.name] = category
+            self.categories[str(category.pk)] = category
+
+    def _validate(self, row):
+        """
+        Return (values keyed by column attname, None) or (None, errors)
+        Optional columns missing from the row are missing from the values
+        """
+        errors = {}
+        name = clean_text(row.get('name'))
+        if not name:
+            errors['name'] = ['This field is required.']
+        elif len(name) > 200:
+            errors['name'] = ['Ensure this field has no more than 200 characters.']
+
+        slug = clean_text(row.get('slug')) or slugify(name)
+        if not slug or not SLUG_RE.match(slug) or len(slug) > 200:
+            errors['slug'] = ['Enter a valid slug.']
+
+        description = clean_text(row.get('description'))
+        if not description:
+            errors['description'] = ['This field is required.']
+
+        category = self.categories.get(clean_text(row.get('category')))
+        if category is None:
+            errors['category'] = ['Unknown category.']
+
+        price = parse_decimal(row.get('price'), errors, 'price', required=True)
+        optional = {}
+        if 'discount_price' in row:
+            # An empty discount_price column removes the discount
+            optional['discount_price'] = parse_decimal(row['discount_price'], errors, 'discount_price')
+
+        stock = clean_text(row.get('stock'))
+        if stock:
+            try:
+                optional['stock'] = int(stock)
+                if optional['stock'] < 0:
+                    errors['stock'] = ['Ensure this value is greater than or equal to 0.']
+            except ValueError:
+                errors['stock'] = ['A valid integer is required.']
+
+        is_available = clean_text(row.get('is_available')).lower()
+        if is_available:
+            if is_available not in TRUE_VALUES | FALSE_VALUES:
+                errors['is_available'] = ['Must be a valid boolean.']
+            optional['is_available'] = is_available in TRUE_VALUES
+
+        image = clean_text(row.get('image'))
+        if image:
+            optional['image'] = image
+
+        if errors:
+            return None, errors
+        return {
+            'name': name, 'slug': slug, 'description': description,
+            'category_id': category.pk, 'price': price, **optional,
+        }, None
+
+    def _import_batch(self, rows):
+        self._resolve_categories(rows)
+
+        products = {}
+        for number, row in rows:
+            if row is None:
+                self._error(number, {'non_field_errors': ['Could not parse row.']})
+                continue
+            values, errors = self._validate(row)
+            if errors:
+                self._error(number, errors)
+            elif values['slug'] in products:
+                self._error(number, {'slug': ['Duplicate slug in this batch.']})
+            else:
+                products[values['slug']] = (number, values)
+
+        existing = {
+            row[0]: row[1:]
+            for row in Product.objects.filter(slug__in=list(products))
+            .values_list('slug', 'pk', 'vendor_id', *COMPARED_FIELDS)
+        }
+
+        to_create, to_update = [], []
+        for slug, (number, values) in products.items():
+            if slug not in existing:
+                if 'image' not in values:
+                    self._error(number, {'image': ['This field is required.']})
+                    continue
+                to_create.append(dict(OPTIONAL_DEFAULTS, **values))
+                continue
+            pk, vendor_id, *current = existing[slug]
+            if vendor_id != self.vendor.pk or not self.update_existing:
+                self._error(number, {'slug': ['Product with this slug already exists.']})
+                continue
+            current = dict(zip(COMPARED_FIELDS, current))
+            if all(values[field] == current[field] for field in COMPARED_FIELDS if field in values):
+                self.report['unchanged'] += 1
+                continue
+            values['id'] = pk
+            # The old category loses a product if the row moves it
+            self.touched_categories.add(current['category_id'])
+            to_update.append(values)
+
+        with transaction.atomic():
+            self._insert(to_create)
+            self._update(to_update)
+            if to_create:
+                ids = dict(Product.objects.filter(slug__in=[values['slug'] for values in to_create])
+                           .values_list('slug', 'pk'))
+                for values in to_create:
+                    values['id'] = ids[values['slug']]
+            changed = [
+                IndexedProduct(values['id'], values['name'], values['description'])
+                for values in to_create + to_update
+            ]
+            get_search_backend().index_many(changed)
+
+        self.touched_categories.update(values['category_id'] for values in to_create + to_update)
+        self.report['created'] += len(to_create)
+        self.report['updated'] += len(to_update)
+
+    def _insert(self, rows):
+        """
+        One prepared INSERT run with executemany()
+        Much cheaper than bulk_create, which compiles SQL for every few dozen rows
+        """
+        if not rows:
+            return
+        fields = [field for field in Product._meta.concrete_fields if not field.primary_key]
+        # Everything not coming from the file is the same on every row - prepare it once
+        template = Product(vendor=self.vendor, created_at=timezone.now(), updated_at=timezone.now())
+        constants = {
+            field.attname: field.get_db_prep_save(getattr(template, field.attname), connection)
+            for field in fields if field.attname not in IMPORTED_FIELDS
+        }
+        imported = {field.attname: field for field in fields if field.attname in IMPORTED_FIELDS}
+
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        sql = f'INSERT INTO {connection.ops.quote_name(Product._meta.db_table)} ({columns}) VALUES ({placeholders})'
+        params = [
+            [imported[field.attname].get_db_prep_save(values[field.attname], connection)
+             if field.attname in imported else constants[field.attname]
+             for field in fields]
+            for values in rows
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+
+    def _update(self, rows):
+        """One prepared UPDATE per set of columns the rows provide"""
+        now = timezone.now()
+        groups = {}
+        for values in rows:
+            values['updated_at'] = now
+            fields = tuple(field for field in COMPARED_FIELDS if field in values)
+            groups.setdefault(fields, []).append(values)
+        for fields, group in groups.items():
+            update_rows(Product, list(fields) + ['updated_at'], group)
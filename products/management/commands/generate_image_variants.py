@@ -0,0 +1,69 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.cache import bump_generation
+from products.images import render_variants
+
+
+def _setup_worker():
+    # Spawned workers (Windows, macOS) start without the app registry
+    import django
+    django.setup()
+
+
+def _render(job):
+    model_label, pk, name = job
+    try:
+        return model_label, pk, name, render_variants(name)
+    except (OSError, ValueError):
+        return model_label, pk, name, None
+
+
+class Command(BaseCommand):
+    """
+    Backfill thumbnail / medium / WebP variants for existing media
+    Usage: python manage.py generate_image_variants --workers 8 [--all]
+    """
+    help = 'Render image variants for products and gallery images in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true',
+                            help='Re-render images that already have variants')
+
+    def handle(self, *args, **options):
+        # Imported here: spawned workers import this module before django.setup()
+        from products.models import Product, ProductImage
+
+        models = {'product': Product, 'gallery': ProductImage}
+        done = failed = 0
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_setup_worker) as pool:
+            for label, model in models.items():
+                queryset = model.objects.exclude(image='').order_by('pk')
+                if not options['all']:
+                    queryset = queryset.filter(image_variants={})
+                last_pk = 0
+                while True:
+                    batch = list(queryset.filter(pk__gt=last_pk)
+                                 .values_list('pk', 'image')[:options['batch_size']])
+                    if not batch:
+                        break
+                    last_pk = batch[-1][0]
+                    jobs = [(label, pk, name) for pk, name in batch]
+                    for _, pk, name, variants in pool.map(_render, jobs):
+                        if variants is None:
+                            failed += 1
+                            continue
+                        model.objects.filter(pk=pk, image=name).update(image_variants=variants)
+                        done += 1
+
+        if done:
+            # update() skips the signals that invalidate cached product responses
+            bump_generation('product')
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered variants for {done} images ({failed} unreadable)'))
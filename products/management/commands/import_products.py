@@ -0,0 +1,46 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importer import FORMATS, ProductImporter, detect_format, iter_rows
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Bulk import products from a CSV or JSON lines file
+    Usage: python manage.py import_products catalog.csv --vendor vendor@example.com
+    """
+    help = 'Stream a CSV / JSONL catalog into the products table in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--vendor', required=True, help='Email of the owning vendor')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--no-update', action='store_true',
+                            help='Report existing slugs as errors instead of updating them')
+
+    def handle(self, *args, **options):
+        try:
+            vendor = User.objects.get(email=options['vendor'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['vendor']}")
+
+        file_format = options['format'] or detect_format(options['path'])
+        importer = ProductImporter(
+            vendor=vendor,
+            batch_size=options['batch_size'],
+            update_existing=not options['no_update'],
+        )
+        with open(options['path'], 'rb') as stream:
+            report = importer.run(iter_rows(stream, file_format))
+
+        for error in report['errors']:
+            self.stderr.write(json.dumps(error))
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']}, updated {report['updated']}, "
+            f"unchanged {report['unchanged']}, failed {report['failed']}"
+        ))
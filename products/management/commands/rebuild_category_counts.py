@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from products.aggregates import recount_category_products
+
+
+class Command(BaseCommand):
+    """
+    Recompute the stored available product count on every category
+    Usage: python manage.py rebuild_category_counts
+    """
+    help = 'Rebuild Category.product_count from the products table'
+
+    def handle(self, *args, **options):
+        updated = recount_category_products()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt product counts for {updated} categories'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from products.aggregates import rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    """
+    Recompute stored rating aggregates for products from their reviews
+    Usage: python manage.py rebuild_product_ratings [--product 1 --product 2]
+    """
+    help = 'Rebuild rating_sum, rating_count, average_rating and star histogram on products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', type=int, action='append', dest='products',
+                            help='Only rebuild the given product id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        processed = rebuild_rating_aggregates(
+            product_ids=options['products'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates for {processed} products'))
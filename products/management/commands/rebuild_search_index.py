@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from products.search import get_search_backend
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the product full-text search index
+    Usage: python manage.py rebuild_search_index
+    """
+    help = 'Re-index every product in the configured search backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        indexed = backend.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} products with {backend.__class__.__name__}'
+        ))
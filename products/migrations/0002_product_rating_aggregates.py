@@ -0,0 +1,75 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:23
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Review = apps.get_model('products', 'Review')
+
+    aggregates = {}
+    rows = Review.objects.values('product_id', 'rating').annotate(total=Count('id'))
+    for row in rows.iterator():
+        aggregates.setdefault(row['product_id'], {})[row['rating']] = row['total']
+
+    for product_id, histogram in aggregates.items():
+        count = sum(histogram.values())
+        total = sum(rating * n for rating, n in histogram.items())
+        Product.objects.filter(pk=product_id).update(
+            rating_sum=total,
+            rating_count=count,
+            average_rating=total / count,
+            **{f'rating_{i}': histogram.get(i, 0) for i in range(1, 6)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='average_rating',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_fts5_table(apps, schema_editor):
+    """SQLite only - other databases use the SearchTerm inverted index"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS products_search "
+                "USING fts5(name, description, tokenize='unicode61')"
+            )
+        except Exception:
+            # SQLite built without FTS5 - fall back to the inverted index
+            return
+        cursor.execute(
+            "INSERT INTO products_search (rowid, name, description) "
+            "SELECT id, name, description FROM products_product"
+        )
+
+
+def drop_fts5_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS products_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('frequency', models.FloatField()),
+                ('length', models.FloatField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='products.product')),
+            ],
+            options={
+                'unique_together': {('term', 'product')},
+            },
+        ),
+        migrations.RunPython(create_fts5_table, drop_fts5_table),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:30
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_product_counts(apps, schema_editor):
+    Category = apps.get_model('products', 'Category')
+    counts = Category.objects.annotate(
+        total=Count('products', filter=Q(products__is_available=True))
+    ).values_list('pk', 'total')
+    for pk, total in counts:
+        Category.objects.filter(pk=pk).update(product_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_product_counts, migrations.RunPython.noop),
+    ]
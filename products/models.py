@@ -14,6 +14,9 @@ class Category(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Number of available products - kept in sync by products.signals
+    product_count = models.IntegerField(default=0)
+    
     class Meta:
         verbose_name_plural = 'Categories'
         ordering = ['name']
@@ -41,6 +44,7 @@ class Product(models.Model):
     
     # Images
     image = models.ImageField(upload_to='products/')
+    image_variants = models.JSONField(default=dict, blank=True)  # Filled in by products.images
     
     # Vendor/Seller
     vendor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='products', 
@@ -51,8 +55,24 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Review aggregates - kept in sync by products.signals
+    rating_sum = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+    average_rating = models.FloatField(default=0, db_index=True)
+    rating_1 = models.IntegerField(default=0)
+    rating_2 = models.IntegerField(default=0)
+    rating_3 = models.IntegerField(default=0)
+    rating_4 = models.IntegerField(default=0)
+    rating_5 = models.IntegerField(default=0)
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination over (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'),
+            # Low-stock list on the vendor dashboard
+            models.Index(fields=['vendor', 'stock'], name='product_vendor_stock_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -68,6 +88,11 @@ class Product(models.Model):
     def in_stock(self):
         """Check if product is in stock"""
         return self.stock > 0
+    
+    @property
+    def rating_histogram(self):
+        """Number of reviews per star rating (1 to 5)"""
+        return {i: getattr(self, f'rating_{i}') for i in range(1, 6)}
 
 
 class ProductImage(models.Model):
@@ -76,6 +101,7 @@ class ProductImage(models.Model):
     """
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='products/gallery/')
+    image_variants = models.JSONField(default=dict, blank=True)  # Filled in by products.images
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
@@ -96,6 +122,25 @@ class Review(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ('product', 'user')  # One review per user per product
+        indexes = [
+            models.Index(fields=['product', 'created_at', 'id'], name='review_product_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.product.name} ({self.rating} stars)"
+
+
+class SearchTerm(models.Model):
+    """
+    Inverted index entry used by the portable product search backend
+    """
+    term = models.CharField(max_length=64)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_terms')
+    frequency = models.FloatField()  # Weighted term frequency in name + description
+    length = models.FloatField()  # Weighted length of the indexed document
+    
+    class Meta:
+        unique_together = ('term', 'product')
+    
+    def __str__(self):
+        return f"{self.term} -> {self.product_id}"
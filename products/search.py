@@ -0,0 +1,259 @@
+"""
+Full-text product search
+
+Two backends share one interface:
+- SQLiteFTS5Backend keeps an FTS5 virtual table (default on sqlite)
+- InvertedIndexBackend keeps a SearchTerm table and works on any database
+
+Both rank matches with BM25 and then blend in product popularity (views).
+Pick one explicitly with the PRODUCT_SEARCH_BACKEND setting.
+"""
+import heapq
+import math
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from .models import Product, SearchTerm
+
+TOKEN_RE = re.compile(r'\w+')
+NAME_WEIGHT = 10  # A match in the name counts as much as ten in the description
+FTS_TABLE = 'products_search'
+
+
+def tokenize(text):
+    """Lowercase word tokens, truncated to fit the index column"""
+    return [token[:64] for token in TOKEN_RE.findall((text or '').lower())]
+
+
+class BaseSearchBackend(ABC):
+    """
+    Interface for product search backends
+    Subclasses implement index_many(), remove(), clear() and rank()
+    """
+
+    def index(self, product):
+        self.index_many([product])
+
+    @abstractmethod
+    def index_many(self, products):
+        pass
+
+    @abstractmethod
+    def remove(self, product_id):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def rank(self, query, limit):
+        """Return up to `limit` (product_id, relevance) pairs, best first"""
+
+    def rebuild(self, batch_size=1000):
+        """Re-index every product, returns the number indexed"""
+        self.clear()
+        products = Product.objects.only('pk', 'name', 'description').order_by('pk')
+        indexed = 0
+        last_pk = 0
+        while True:
+            batch = list(products.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return indexed
+            with transaction.atomic():
+                self.index_many(batch)
+            indexed += len(batch)
+            last_pk = batch[-1].pk
+
+    def search(self, query, limit=None):
+        """
+        Product ids matching the query, best first
+        BM25 relevance is scaled up by log(1 + views) so popular products win ties
+        """
+        limit = limit or settings.PRODUCT_SEARCH_MAX_RESULTS
+        matches = self.rank(query, limit)
+        if not matches:
+            return []
+
+        views = dict(Product.objects.filter(pk__in=[pk for pk, _ in matches])
+                     .values_list('pk', 'views'))
+        weight = settings.PRODUCT_SEARCH_VIEWS_WEIGHT
+        scored = [
+            (relevance * (1 + weight * math.log1p(max(views.get(pk, 0), 0))), pk)
+            for pk, relevance in matches
+        ]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [pk for _, pk in scored]
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """
+    Search through an SQLite FTS5 table (created by products migration 0003)
+    """
+
+    def index_many(self, products):
+        rows = [(product.pk, product.name, product.description) for product in products]
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                               [(pk,) for pk, _, _ in rows])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)', rows
+            )
+
+    def remove(self, product_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_id])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def rank(self, query, limit):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Quote every token so user input can't inject FTS5 query syntax
+        match = ' '.join(f'"{term}"' for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, bm25({FTS_TABLE}, %s, 1.0) AS score FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s ORDER BY score LIMIT %s',
+                [float(NAME_WEIGHT), match, limit]
+            )
+            # FTS5 bm25() is negative - smaller means more relevant
+            return [(pk, -score) for pk, score in cursor.fetchall()]
+
+
+class InvertedIndexBackend(BaseSearchBackend):
+    """
+    Portable search over the SearchTerm inverted index table
+    """
+    k1 = 1.2
+    b = 0.75
+    stats_cache_key = 'product_search:corpus_stats'
+    stats_timeout = 600
+
+    def _entries(self, product):
+        frequencies = Counter()
+        for term in tokenize(product.name):
+            frequencies[term] += NAME_WEIGHT
+        for term in tokenize(product.description):
+            frequencies[term] += 1
+        length = sum(frequencies.values())
+        return [
+            SearchTerm(term=term, product_id=product.pk, frequency=frequency, length=length)
+            for term, frequency in frequencies.items()
+        ]
+
+    def index_many(self, products):
+        entries = []
+        for product in products:
+            entries.extend(self._entries(product))
+        SearchTerm.objects.filter(product_id__in=[product.pk for product in products]).delete()
+        SearchTerm.objects.bulk_create(entries, batch_size=1000)
+
+    def remove(self, product_id):
+        SearchTerm.objects.filter(product_id=product_id).delete()
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+        cache.delete(self.stats_cache_key)
+
+    def _corpus_stats(self):
+        """Document count and average document length, cached for a few minutes"""
+        stats = cache.get(self.stats_cache_key)
+        if stats is None:
+            documents = max(Product.objects.count(), 1)
+            total_length = SearchTerm.objects.aggregate(total=Sum('frequency'))['total']
+            stats = (documents, (total_length or documents) / documents)
+            cache.set(self.stats_cache_key, stats, self.stats_timeout)
+        return stats
+
+    def rank(self, query, limit):
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        documents, average_length = self._corpus_stats()
+        scores = None
+        # Rarest terms first so the candidate set shrinks as fast as possible
+        postings_by_term = {
+            term: list(SearchTerm.objects.filter(term=term)
+                       .values_list('product_id', 'frequency', 'length'))
+            for term in terms
+        }
+        for term in sorted(terms, key=lambda t: len(postings_by_term[t])):
+            postings = postings_by_term[term]
+            if not postings:
+                return []
+            idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+            term_scores = {}
+            for product_id, frequency, length in postings:
+                if scores is not None and product_id not in scores:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                term_scores[product_id] = idf * frequency * (self.k1 + 1) / (frequency + norm)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {pk: scores[pk] + score for pk, score in term_scores.items()}
+            if not scores:
+                return []
+
+        return heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+
+
+_backend = None
+
+
+def _fts5_table_exists():
+    return connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+
+
+def get_search_backend():
+    """Return the configured search backend instance"""
+    global _backend
+    if _backend is None:
+        if settings.PRODUCT_SEARCH_BACKEND:
+            _backend = import_string(settings.PRODUCT_SEARCH_BACKEND)()
+        elif _fts5_table_exists():
+            _backend = SQLiteFTS5Backend()
+        else:
+            _backend = InvertedIndexBackend()
+    return _backend
+
+
+class ProductFullTextFilter(BaseFilterBackend):
+    """
+    Ranked full-text search: ?q=wireless headphones
+    Results come back in relevance order unless ?ordering= is given
+    """
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+
+        ranked_ids = get_search_backend().search(query)
+        if not ranked_ids:
+            return queryset.none()
+        queryset = queryset.filter(pk__in=ranked_ids)
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+        # A literal CASE compiles far faster than hundreds of When() expressions;
+        # the ids are integers from our own index so inlining them is safe
+        column = f'{connection.ops.quote_name(Product._meta.db_table)}.{connection.ops.quote_name("id")}'
+        whens = ' '.join(f'WHEN {int(pk)} THEN {position}' for position, pk in enumerate(ranked_ids))
+        return queryset.order_by(RawSQL(f'CASE {column} {whens} END', []))
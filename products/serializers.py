@@ -1,6 +1,19 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
 from rest_framework import serializers
 from .models import Category, Product, ProductImage, Review
+from .images import variant_urls
 from accounts.serializers import UserSerializer
+from core.compiled import CompiledSerializer
+
+User = get_user_model()
+
+
+def latest_reviews(product):
+    """The PRODUCT_DETAIL_REVIEW_LIMIT most recent reviews of a product"""
+    return (product.reviews.select_related('user')
+            .order_by('-created_at', '-id')[:settings.PRODUCT_DETAIL_REVIEW_LIMIT])
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -13,19 +26,42 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = ['id', 'name', 'description', 'image', 'is_active', 
                   'created_at', 'product_count']
+        field_sources = {'product_count': ['product_count']}
     
     def get_product_count(self, obj):
-        """Get total products in this category"""
-        return obj.products.filter(is_available=True).count()
+        """Available products - annotated by the category views, else the stored counter"""
+        return getattr(obj, 'live_product_count', obj.product_count)
+
+
+class ImageVariantsMixin:
+    """
+    image_variants: URLs of the thumbnail / medium / WebP renditions
+    Empty until the background worker has produced them
+    """
+    
+    def get_image_variants(self, obj):
+        return variant_urls(obj.image_variants, self.context.get('request'))
 
 
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     """
     Serializer for additional product images
     """
+    image_variants = serializers.SerializerMethodField()
+    
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'created_at']
+        fields = ['id', 'image', 'image_variants', 'created_at']
+        field_sources = {'image_variants': ['image_variants']}
+
+
+class VendorSerializer(serializers.ModelSerializer):
+    """
+    Public vendor details, used by ?expand=vendor
+    """
+    class Meta:
+        model = User
+        fields = ['id', 'username']
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -40,6 +76,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'user', 'user_id', 'rating', 'comment', 
                   'created_at', 'updated_at']
         read_only_fields = ['user', 'created_at', 'updated_at']
+        expandable_fields = {'product': 'products.serializers.ProductListSerializer'}
     
     def create(self, validated_data):
         # Set user from request context
@@ -47,14 +84,21 @@ class ReviewSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     """
     Detailed product serializer with all related data
+    Embeds only the latest reviews plus a summary - the full list
+    is paginated under reviews_url
     """
     category_name = serializers.CharField(source='category.name', read_only=True)
     vendor_name = serializers.CharField(source='vendor.username', read_only=True)
+    # A float like the JSON encoder made of the Decimal property, converted before encoding
+    final_price = serializers.FloatField(read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
-    reviews = ReviewSerializer(many=True, read_only=True)
+    image_variants = serializers.SerializerMethodField()
+    reviews = serializers.SerializerMethodField()
+    reviews_url = serializers.SerializerMethodField()
+    review_summary = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
     review_count = serializers.SerializerMethodField()
     
@@ -62,46 +106,104 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Product
         fields = ['id', 'name', 'slug', 'description', 'category', 'category_name',
                   'price', 'discount_price', 'final_price', 'stock', 'is_available',
-                  'image', 'images', 'vendor', 'vendor_name', 'views', 
-                  'reviews', 'average_rating', 'review_count',
+                  'image', 'image_variants', 'images', 'vendor', 'vendor_name', 'views', 
+                  'reviews', 'reviews_url', 'review_summary', 'average_rating', 'review_count',
                   'created_at', 'updated_at']
         read_only_fields = ['views', 'created_at', 'updated_at']
+        field_sources = {
+            'final_price': ['price', 'discount_price'],
+            'image_variants': ['image_variants'],
+            'reviews': [],
+            'reviews_url': [],
+            'review_summary': ['rating_count', 'average_rating', 'rating_1', 'rating_2',
+                               'rating_3', 'rating_4', 'rating_5'],
+            'average_rating': ['average_rating'],
+            'review_count': ['rating_count'],
+        }
+        expandable_fields = {
+            'category': 'products.serializers.CategorySerializer',
+            'vendor': 'products.serializers.VendorSerializer',
+        }
+    
+    def get_reviews(self, obj):
+        """Latest PRODUCT_DETAIL_REVIEW_LIMIT reviews, one query whatever the review count"""
+        reviews = getattr(obj, 'latest_reviews', None)  # fetched ahead by the async detail view
+        if reviews is None:
+            reviews = latest_reviews(obj)
+        return ReviewSerializer(reviews, many=True, context=self.context).data
+    
+    def get_reviews_url(self, obj):
+        url = reverse('review-list', kwargs={'product_id': obj.pk})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+    
+    def get_review_summary(self, obj):
+        """Count, average and star histogram from the stored aggregates"""
+        return {
+            'count': obj.rating_count,
+            'average': round(obj.average_rating, 1),
+            'histogram': obj.rating_histogram,
+        }
     
     def get_average_rating(self, obj):
-        """Calculate average rating from reviews"""
-        reviews = obj.reviews.all()
-        if reviews:
-            total = sum([review.rating for review in reviews])
-            return round(total / len(reviews), 1)
-        return 0
+        """Average rating, read from the stored aggregate"""
+        return round(obj.average_rating, 1)
     
     def get_review_count(self, obj):
         """Get total number of reviews"""
-        return obj.reviews.count()
+        return obj.rating_count
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     """
     Lightweight serializer for product listing
     Used in list views for better performance
     """
     category_name = serializers.CharField(source='category.name', read_only=True)
     vendor_name = serializers.CharField(source='vendor.username', read_only=True)
+    final_price = serializers.FloatField(read_only=True)  # See ProductSerializer
     average_rating = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
         fields = ['id', 'name', 'slug', 'category_name', 'price', 
                   'discount_price', 'final_price', 'stock', 'is_available',
-                  'image', 'vendor_name', 'average_rating', 'created_at']
+                  'image', 'image_variants', 'vendor_name', 'average_rating', 'created_at']
+        field_sources = {
+            'final_price': ['price', 'discount_price'],
+            'image_variants': ['image_variants'],
+            'average_rating': ['average_rating'],
+        }
+        expandable_fields = {
+            'category': 'products.serializers.CategorySerializer',
+            'vendor': 'products.serializers.VendorSerializer',
+        }
     
     def get_average_rating(self, obj):
-        """Calculate average rating"""
-        reviews = obj.reviews.all()
-        if reviews:
-            total = sum([review.rating for review in reviews])
-            return round(total / len(reviews), 1)
-        return 0
+        """Average rating, read from the stored aggregate"""
+        return round(obj.average_rating, 1)
+
+
+class CompiledProductListSerializer(CompiledSerializer):
+    """
+    ProductListSerializer output straight from .values() rows
+    """
+    serializer_class = ProductListSerializer
+    computed = {
+        'final_price': (['price', 'discount_price'], 'get_final_price'),
+        'image_variants': (['image_variants'], 'get_image_variants'),
+        'average_rating': (['average_rating'], 'get_average_rating'),
+    }
+    
+    def get_final_price(self, row):
+        return float(row['discount_price'] or row['price'])
+    
+    def get_image_variants(self, row):
+        return variant_urls(row['image_variants'], self.request)
+    
+    def get_average_rating(self, row):
+        return round(row['average_rating'], 1)
 
 
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
@@ -0,0 +1,139 @@
+"""
+Signal handlers for the products app
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.cache import bump_generation
+from .aggregates import apply_category_count_change, apply_rating_change
+from .images import schedule_variants
+from .models import Category, Product, ProductImage, Review
+from .search import get_search_backend
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, raw, **kwargs):
+    """Store the rating currently in the database so updates can apply a delta"""
+    instance._previous_rating = None
+    if raw or instance._state.adding or not instance.pk:
+        return
+    instance._previous_rating = (
+        Review.objects.filter(pk=instance.pk).values_list('product_id', 'rating').first()
+    )
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, raw, **kwargs):
+    """Keep product rating aggregates in sync when a review is created or edited"""
+    if raw:
+        return
+
+    previous = getattr(instance, '_previous_rating', None)
+    current = (instance.product_id, instance.rating)
+    if not created and previous == current:
+        return
+
+    if previous:
+        apply_rating_change(previous[0], previous[1], -1)
+    apply_rating_change(instance.product_id, instance.rating, 1)
+    instance._previous_rating = current
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    """Remove a deleted review from its product's aggregates"""
+    apply_rating_change(instance.product_id, instance.rating, -1)
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_listing(sender, instance, raw, **kwargs):
+    """Store the category, availability and image currently in the database"""
+    instance._previous_listing = None
+    instance._image_changed = False
+    if raw or instance._state.adding or not instance.pk:
+        return
+    previous = (Product.objects.filter(pk=instance.pk)
+                .values_list('category_id', 'is_available', 'image').first())
+    if previous:
+        instance._previous_listing = previous[:2]
+        if previous[2] != instance.image.name:
+            # Variants of the old upload no longer apply
+            instance.image_variants = {}
+            instance._image_changed = True
+
+
+@receiver(post_save, sender=Product)
+def update_category_count_on_save(sender, instance, created, raw, **kwargs):
+    """Keep Category.product_count right on create, recategorize and availability toggles"""
+    if raw:
+        return
+
+    previous = getattr(instance, '_previous_listing', None)
+    current = (instance.category_id, instance.is_available)
+    if not created and previous == current:
+        return
+
+    if previous and previous[1]:
+        apply_category_count_change(previous[0], -1)
+    if instance.is_available:
+        apply_category_count_change(instance.category_id, 1)
+    instance._previous_listing = current
+
+
+@receiver(post_delete, sender=Product)
+def update_category_count_on_delete(sender, instance, **kwargs):
+    if instance.is_available:
+        apply_category_count_change(instance.category_id, -1)
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw, **kwargs):
+    """Keep the search index in step with product name and description"""
+    if raw:
+        return
+    get_search_backend().index(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_responses(sender, **kwargs):
+    bump_generation('product')
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_responses(sender, **kwargs):
+    bump_generation('category')
+
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_review_responses(sender, **kwargs):
+    bump_generation('review')
+
+
+@receiver(pre_save, sender=ProductImage)
+def reset_gallery_variants(sender, instance, raw, **kwargs):
+    instance._image_changed = False
+    if raw or instance._state.adding or not instance.pk:
+        return
+    previous = ProductImage.objects.filter(pk=instance.pk).values_list('image', flat=True).first()
+    if previous != instance.image.name:
+        instance.image_variants = {}
+        instance._image_changed = True
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductImage)
+def render_image_variants(sender, instance, created, raw, **kwargs):
+    """
+    Queue thumbnail / medium / WebP renditions for new uploads
+    Only on create or a new image - not on every save of an image that can't be read
+    """
+    if raw or instance.image_variants:
+        return
+    if not created and not getattr(instance, '_image_changed', False):
+        return
+    schedule_variants(instance)
@@ -0,0 +1,327 @@
+import io
+import json
+import threading
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from core import renderers
+from . import bulk, images, search, view_counter
+from .importer import ProductImporter, iter_rows
+from .models import Category, Product, Review
+
+User = get_user_model()
+
+
+def create_products(count, vendor, category, start=0):
+    return Product.objects.bulk_create([
+        Product(name=f'Product {i}', slug=f'product-{i}', description=f'Product {i}',
+                category=category, vendor=vendor, price=10 + i, stock=10,
+                image='products/product.jpg')
+        for i in range(start, start + count)
+    ])
+
+
+@override_settings(PRODUCT_VIEW_COUNT_MODE='buffered', PRODUCT_VIEW_FLUSH_INTERVAL=3600,
+                   PRODUCT_VIEW_FLUSH_THRESHOLD=100000, RESPONSE_CACHE_ENABLED=False)
+class BufferedViewCounterTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        view_counter._pending.clear()
+        vendor = User.objects.create_user(username='vendor', email='vendor@example.com',
+                                          password='password', role='vendor')
+        self.category = Category.objects.create(name='Books')
+        self.products = create_products(4, vendor, self.category)
+        self.vendor = vendor
+
+    def tearDown(self):
+        view_counter._pending.clear()
+
+    def test_concurrent_detail_reads_issue_no_update(self):
+        statements = []
+        errors = []
+
+        def capture(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        def read(product):
+            try:
+                client = APIClient()
+                with connection.execute_wrapper(capture):
+                    for _ in range(5):
+                        response = client.get(f'/api/products/{product.slug}/')
+                        if response.status_code != 200:
+                            errors.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=read, args=(product,))
+                   for product in self.products for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertTrue(statements)
+        self.assertFalse([sql for sql in statements if sql.lstrip().upper().startswith('UPDATE')])
+        self.assertEqual(view_counter.flush_views(), 40)
+        for product in self.products:
+            product.refresh_from_db()
+            self.assertEqual(product.views, 10)
+
+    def test_flush_writes_every_pending_product(self):
+        # More distinct products than the local memory cache keeps entries
+        create_products(400, self.vendor, self.category, start=len(self.products))
+        products = list(Product.objects.exclude(pk__in=[p.pk for p in self.products]).order_by('pk'))
+        for product in products:
+            view_counter.record_view(product.pk)
+        view_counter.record_view(products[0].pk)
+
+        self.assertEqual(view_counter.flush_views(batch_size=150), len(products) + 1)
+        self.assertEqual(view_counter.flush_views(), 0)
+        views = dict(Product.objects.filter(pk__in=[p.pk for p in products]).values_list('pk', 'views'))
+        self.assertEqual(views[products[0].pk], 2)
+        self.assertEqual(sorted(set(views.values())), [1, 2])
+
+        view_counter.record_view(products[1].pk)
+        self.assertEqual(view_counter.flush_views(), 1)
+
+
+@override_settings(PRODUCT_VIEW_COUNT_MODE='exact', RESPONSE_CACHE_ENABLED=False)
+class ExactViewCounterTests(TestCase):
+    def test_every_view_is_written(self):
+        vendor = User.objects.create_user(username='vendor', email='vendor@example.com',
+                                          password='password', role='vendor')
+        product, = create_products(1, vendor, Category.objects.create(name='Books'))
+        for _ in range(3):
+            view_counter.record_view(product.pk)
+        product.refresh_from_db()
+        self.assertEqual(product.views, 3)
+
+
+class BulkPriceStockTests(TestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user(username='vendor', email='vendor@example.com',
+                                               password='password', role='vendor')
+        self.product, = create_products(1, self.vendor, Category.objects.create(name='Books'))
+
+    def test_price_change_keeps_stock_taken_meanwhile(self):
+        load_products = bulk._load_products
+
+        def load_then_checkout(items):
+            loaded = load_products(items)
+            # A checkout commits between the read and the bulk write
+            Product.objects.filter(pk=self.product.pk).update(stock=F('stock') - 4)
+            return loaded
+
+        with mock.patch.object(bulk, '_load_products', load_then_checkout):
+            summary, results = bulk.bulk_update_prices_and_stock(
+                self.vendor, [{'id': self.product.pk, 'price': '25.00'}]
+            )
+
+        self.assertEqual(summary['updated'], 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.price, Decimal('25.00'))
+        self.assertEqual(self.product.stock, 6)
+
+
+class ProductImporterTests(TestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user(username='vendor', email='vendor@example.com',
+                                               password='password', role='vendor')
+        self.category = Category.objects.create(name='Books')
+
+    def run_import(self, lines):
+        return ProductImporter(self.vendor).run(iter_rows(io.StringIO('\n'.join(lines)), 'csv'))
+
+    def test_update_keeps_columns_the_file_leaves_out(self):
+        product, = create_products(1, self.vendor, self.category)
+        Product.objects.filter(pk=product.pk).update(stock=7, discount_price=Decimal('9.00'),
+                                                     is_available=False)
+
+        report = self.run_import([
+            'name,slug,description,category,price',
+            f'Renamed,{product.slug},New description,Books,12.50',
+        ])
+
+        self.assertEqual(report['updated'], 1)
+        product.refresh_from_db()
+        self.assertEqual(product.name, 'Renamed')
+        self.assertEqual(product.price, Decimal('12.50'))
+        self.assertEqual(product.image.name, 'products/product.jpg')
+        self.assertEqual(product.stock, 7)
+        self.assertEqual(product.discount_price, Decimal('9.00'))
+        self.assertFalse(product.is_available)
+
+    def test_create_requires_image(self):
+        report = self.run_import([
+            'name,slug,description,category,price,image',
+            'No image,no-image,Description,Books,10,',
+            'With image,with-image,Description,Books,10,products/a.jpg',
+        ])
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['errors'], [{'row': 1, 'errors': {'image': ['This field is required.']}}])
+        product = Product.objects.get(slug='with-image')
+        self.assertEqual((product.stock, product.discount_price, product.is_available), (0, None, True))
+
+
+class ImageVariantSignalTests(TestCase):
+    def test_variants_are_scheduled_on_create_and_image_change_only(self):
+        vendor = User.objects.create_user(username='vendor', email='vendor@example.com',
+                                          password='password', role='vendor')
+        with mock.patch('products.signals.schedule_variants') as schedule:
+            product = Product.objects.create(
+                name='Lamp', slug='lamp', description='Lamp', price=10, vendor=vendor,
+                category=Category.objects.create(name='Home'), image='products/unreadable.jpg',
+            )
+            self.assertEqual(schedule.call_count, 1)
+
+            # Variants stay empty when the image can't be read
+            product.stock = 3
+            product.save()
+            self.assertEqual(schedule.call_count, 1)
+
+            product.image = 'products/lamp.jpg'
+            product.save()
+            self.assertEqual(schedule.call_count, 2)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True, PRODUCT_VIEW_COUNT_MODE='exact')
+class CachedProductDetailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        vendor = User.objects.create_user(username='vendor', email='vendor@example.com',
+                                          password='password', role='vendor')
+        self.product, = create_products(1, vendor, Category.objects.create(name='Books'))
+
+    def test_cache_hit_without_id_field_counts_the_view(self):
+        for cache_status in ('MISS', 'HIT'):
+            response = self.client.get(f'/api/products/{self.product.slug}/?fields=name')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-Cache'], cache_status)
+            self.assertEqual(response.json(), {'name': self.product.name})
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views, 2)
+
+    async def test_async_cache_hit_without_id_field_counts_the_view(self):
+        for cache_status in ('MISS', 'HIT'):
+            response = await self.async_client.get(f'/api/async/products/{self.product.slug}/?fields=name')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-Cache'], cache_status)
+        await self.product.arefresh_from_db()
+        self.assertEqual(self.product.views, 2)
+
+    def test_rendered_variants_invalidate_cached_responses(self):
+        path = f'/api/products/{self.product.slug}/'
+        self.assertEqual(self.client.get(path)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(path)['X-Cache'], 'HIT')
+
+        variants = {'thumbnail': 'products/product__thumbnail.jpg'}
+        with mock.patch.object(images, 'render_variants', return_value=variants), \
+                self.captureOnCommitCallbacks(execute=True):
+            images.process_image(Product, self.product.pk, self.product.image.name)
+
+        self.assertEqual(self.client.get(path)['X-Cache'], 'MISS')
+
+
+class SearchBackendTests(TestCase):
+    def test_incomplete_backend_fails_when_constructed(self):
+        class RankOnly(search.BaseSearchBackend):
+            def rank(self, query, limit):
+                return []
+
+        with self.assertRaises(TypeError):
+            RankOnly()
+        for backend in (search.InvertedIndexBackend, search.SQLiteFTS5Backend):
+            backend()
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class RankedSearchPaginationTests(TestCase):
+    def setUp(self):
+        vendor = User.objects.create_user(username='vendor', email='vendor@example.com',
+                                          password='password', role='vendor')
+        category = Category.objects.create(name='Home')
+        for index, name in enumerate(['Desk lamp', 'Lamp lamp lamp', 'Floor lamp']):
+            Product.objects.create(name=name, slug=f'lamp-{index}', description=name, price=10 + index,
+                                   category=category, vendor=vendor, image='products/lamp.jpg')
+
+    def test_cursor_pages_refuse_relevance_order(self):
+        response = self.client.get('/api/products/?q=lamp&paginate=cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('paginate', response.json())
+
+        response = self.client.get('/api/products/?q=lamp&paginate=cursor&ordering=price')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['slug'] for row in response.json()['results']],
+                         ['lamp-0', 'lamp-1', 'lamp-2'])
+        self.assertEqual(self.client.get('/api/products/?q=lamp').status_code, 200)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False, PRODUCT_VIEW_COUNT_MODE='exact')
+class ProductDetailQueryTests(TestCase):
+    def setUp(self):
+        vendor = User.objects.create_user(username='vendor', email='vendor@example.com',
+                                          password='password', role='vendor')
+        self.product, = create_products(1, vendor, Category.objects.create(name='Books'))
+        self.reviewers = User.objects.bulk_create([
+            User(username=f'reviewer{i}', email=f'reviewer{i}@example.com') for i in range(50)
+        ])
+
+    def add_reviews(self, users):
+        Review.objects.bulk_create([
+            Review(product=self.product, user=user, rating=4, comment='Good') for user in users
+        ])
+
+    def test_query_count_does_not_grow_with_reviews(self):
+        path = f'/api/products/{self.product.slug}/'
+        self.add_reviews(self.reviewers[:1])
+        # product, images, latest reviews, view count update
+        with self.assertNumQueries(4):
+            self.assertEqual(len(self.client.get(path).json()['reviews']), 1)
+
+        self.add_reviews(self.reviewers[1:])
+        with self.assertNumQueries(4):
+            response = self.client.get(path)
+        self.assertEqual(len(response.json()['reviews']), settings.PRODUCT_DETAIL_REVIEW_LIMIT)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True, JSON_STREAM_CHUNK_SIZE=3)
+class StreamedProductListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        vendor = User.objects.create_user(username='vendor', email='vendor@example.com',
+                                          password='password', role='vendor')
+        create_products(7, vendor, Category.objects.create(name='Books'))
+
+    def test_stream_matches_the_paged_list_chunk_by_chunk(self):
+        page = self.client.get('/api/products/?ordering=price').json()['results']
+
+        # The compiled rows carry no type orjson can't encode natively (Decimal ...)
+        with mock.patch.object(renderers, '_fallback_default', side_effect=TypeError):
+            response = self.client.get('/api/products/?ordering=price&paginate=stream')
+            self.assertTrue(response.streaming)
+            self.assertNotIn('X-Cache', response)
+            chunks = list(response.streaming_content)
+        # [, three chunks of rows, ]
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(json.loads(b''.join(chunks)), page)
+
+    def test_sparse_fieldsets_stream_through_the_drf_serializer(self):
+        response = self.client.get('/api/products/?ordering=price&paginate=stream&fields=name,price')
+        self.assertEqual(json.loads(b''.join(response.streaming_content)),
+                         [{'name': f'Product {i}', 'price': f'{10 + i}.00'} for i in range(7)])
+
+    def test_indented_json_is_not_streamed(self):
+        response = self.client.get('/api/products/?paginate=stream', HTTP_ACCEPT='application/json; indent=2')
+        self.assertFalse(response.streaming)
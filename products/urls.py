@@ -5,9 +5,12 @@ from .views import (
     ProductListView,
     ProductDetailView,
     ProductCreateView,
+    ProductImportView,
+    ProductBulkUpdateView,
     ProductUpdateView,
     ProductDeleteView,
     MyProductsView,
+    VendorDashboardView,
     ReviewListCreateView,
     ReviewDetailView
 )
@@ -20,7 +23,10 @@ urlpatterns = [
     # Product endpoints
     path('', ProductListView.as_view(), name='product-list'),
     path('create/', ProductCreateView.as_view(), name='product-create'),
+    path('import/', ProductImportView.as_view(), name='product-import'),
+    path('bulk-update/', ProductBulkUpdateView.as_view(), name='product-bulk-update'),
     path('my-products/', MyProductsView.as_view(), name='my-products'),
+    path('my-products/dashboard/', VendorDashboardView.as_view(), name='vendor-dashboard'),
     path('<slug:slug>/', ProductDetailView.as_view(), name='product-detail'),
     path('<slug:slug>/update/', ProductUpdateView.as_view(), name='product-update'),
     path('<slug:slug>/delete/', ProductDeleteView.as_view(), name='product-delete'),
@@ -0,0 +1,97 @@
+"""
+Write-behind counter for product page views
+
+In 'buffered' mode each worker process adds views up in memory and
+writes them in batches, using one UPDATE ... SET views = views + CASE ...
+for every product viewed since the last flush. The buffer is a plain
+dict guarded by a lock, so unlike cache entries it can't be evicted and
+lose part of what is pending. Each process flushes its own buffer - there
+is no command to flush from outside, as another process can't see it:
+after PRODUCT_VIEW_FLUSH_THRESHOLD views, on the first view once
+PRODUCT_VIEW_FLUSH_INTERVAL seconds have passed, and when it exits.
+
+In 'exact' mode every view is written straight away with an F() update.
+"""
+import atexit
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Product
+
+_lock = threading.Lock()
+_pending = Counter()
+_hits_since_flush = 0
+_last_flush = time.monotonic()
+
+
+def record_view(product_id):
+    """
+    Count one view of a product
+    Returns the number of views of it this process has not written yet
+    """
+    if settings.PRODUCT_VIEW_COUNT_MODE == 'exact':
+        Product.objects.filter(pk=product_id).update(views=F('views') + 1)
+        return 0
+
+    global _hits_since_flush, _last_flush
+    with _lock:
+        _pending[product_id] += 1
+        pending = _pending[product_id]
+        _hits_since_flush += 1
+        due = (_hits_since_flush >= settings.PRODUCT_VIEW_FLUSH_THRESHOLD or
+               time.monotonic() - _last_flush >= settings.PRODUCT_VIEW_FLUSH_INTERVAL)
+        if due:
+            _hits_since_flush = 0
+            _last_flush = time.monotonic()
+    if due:
+        flush_views()
+    return pending
+
+
+def pending_views(product_id):
+    """Views of a product this process has recorded but not flushed yet"""
+    with _lock:
+        return _pending.get(product_id, 0)
+
+
+def flush_views(batch_size=500):
+    """Write this process's buffered views to the database; returns how many"""
+    global _pending
+    with _lock:
+        deltas, _pending = _pending, Counter()
+
+    flushed = 0
+    items = sorted(deltas.items())
+    try:
+        for start in range(0, len(items), batch_size):
+            batch = dict(items[start:start + batch_size])
+            with transaction.atomic():
+                Product.objects.filter(pk__in=batch).update(views=F('views') + Case(
+                    *[When(pk=pk, then=Value(n)) for pk, n in batch.items()],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                ))
+            flushed += sum(batch.values())
+            for pk in batch:
+                del deltas[pk]
+    finally:
+        if deltas:
+            # Put back what could not be written, for the next flush
+            with _lock:
+                _pending.update(deltas)
+    return flushed
+
+
+@atexit.register
+def _flush_on_exit():
+    # Don't lose a process-local buffer when the worker shuts down
+    if getattr(settings, 'PRODUCT_VIEW_COUNT_MODE', 'exact') == 'buffered':
+        try:
+            flush_views()
+        except Exception:
+            pass
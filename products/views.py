@@ -1,31 +1,61 @@
 from rest_framework import generics, filters, status
 from rest_framework.response import Response
+from rest_framework.parsers import MultiPartParser
+from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from django.conf import settings
 from django_filters.rest_framework import DjangoFilterBackend
+from .aggregates import available_product_count
+from .bulk import bulk_update_prices_and_stock
+from .importer import FORMATS, ProductImporter, detect_format, iter_rows
 from .models import Category, Product, Review
 from .serializers import (
     CategorySerializer, 
     ProductSerializer, 
     ProductListSerializer,
+    CompiledProductListSerializer,
     ProductCreateUpdateSerializer,
     ReviewSerializer
 )
+from .search import ProductFullTextFilter
+from .view_counter import record_view
 from accounts.permissions import IsVendorOrAdmin, IsAdminUser
+from core.cache import CachedResponseMixin
+from core.compiled import CompiledListMixin
+from core.fieldsets import SparseFieldsetMixin
+from core.pagination import PageOrCursorPagination
+from core.query_budget import QueryBudgetMixin
+from orders.vendor_stats import vendor_dashboard
 
 
-class CategoryListCreateView(generics.ListCreateAPIView):
+def with_product_counts(queryset):
+    """
+    Attach product_count in the same query as the categories
+    Reads the stored counter when CATEGORY_STORED_PRODUCT_COUNT is on
+    """
+    if settings.CATEGORY_STORED_PRODUCT_COUNT:
+        return queryset
+    # Meta.ordering is dropped from GROUP BY queries, so restate it
+    return queryset.annotate(live_product_count=available_product_count()).order_by('name')
+
+
+class CategoryListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
     """
     List all categories or create new one
-    GET: Anyone can view
+    GET: Anyone can view (cached)
     POST: Admin only
     """
-    queryset = Category.objects.filter(is_active=True)
+    read_throttle_scope = 'catalog'
+    cache_generations = ('category', 'product')
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created_at']
     
+    def get_queryset(self):
+        return with_product_counts(Category.objects.filter(is_active=True))
+    
     def perform_create(self, serializer):
         # Only admin can create categories
         if not self.request.user.is_admin:
@@ -41,10 +71,13 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     Retrieve, update or delete a category
     Admin only for update/delete
     """
-    queryset = Category.objects.all()
+    read_throttle_scope = 'catalog'
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     
+    def get_queryset(self):
+        return with_product_counts(Category.objects.all())
+    
     def perform_update(self, serializer):
         if not self.request.user.is_admin:
             return Response(
@@ -62,38 +95,64 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance.delete()
 
 
-class ProductListView(generics.ListAPIView):
+class ProductListView(SparseFieldsetMixin, CompiledListMixin, CachedResponseMixin,
+                      generics.ListAPIView):
     """
     List all products with filtering, search and pagination
-    Public endpoint - anyone can view
+    Public endpoint - anyone can view (cached)
+    ?q= runs a ranked full-text search (see products.search)
     """
-    queryset = Product.objects.filter(is_available=True)
+    read_throttle_scope = 'catalog'
+    cache_generations = ('product', 'category', 'review')
+    queryset = Product.objects.filter(is_available=True).select_related('category', 'vendor')
     serializer_class = ProductListSerializer
+    compiled_serializer_class = CompiledProductListSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = PageOrCursorPagination
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter,
+                       ProductFullTextFilter]
     filterset_fields = ['category', 'vendor', 'is_available']
-    search_fields = ['name', 'description']
-    ordering_fields = ['price', 'created_at', 'views']
+    search_fields = ['name', 'description']  # ?search= (substring match)
+    ordering_fields = ['price', 'created_at', 'views', 'average_rating', 'rating_count']
     ordering = ['-created_at']  # Default ordering
 
+    def is_cacheable(self, request):
+        # A streamed list is never held in memory, let alone cached
+        return not self.should_stream(request)
+
 
-class ProductDetailView(generics.RetrieveAPIView):
+class ProductDetailView(QueryBudgetMixin, SparseFieldsetMixin, CachedResponseMixin,
+                        generics.RetrieveAPIView):
     """
-    Get detailed product information
-    Increments view count on each access
+    Get detailed product information (cached)
+    Counts a view on each access (buffered, see products.view_counter)
     """
-    queryset = Product.objects.all()
+    read_throttle_scope = 'catalog'
+    cache_generations = ('product', 'category', 'review')
+    # auth user + product + images + latest reviews + exact view count update
+    query_budget = 5
+    queryset = Product.objects.select_related('category', 'vendor').prefetch_related('images')
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     lookup_field = 'slug'
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        # Increment view count
-        instance.views += 1
-        instance.save(update_fields=['views'])
+        self.product_id = instance.pk
+        # Count the view without locking the product row
+        pending = record_view(instance.pk)
+        if 'views' not in instance.get_deferred_fields():  # left out by ?fields=
+            instance.views += pending or 1
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
+    
+    def cache_payload(self, response):
+        # ?fields= may leave the id out of the data
+        return dict(super().cache_payload(response), product_id=self.product_id)
+
+    def cache_hit(self, request, payload):
+        # Cached responses still count as a product view
+        record_view(payload['product_id'])
 
 
 class ProductCreateView(generics.CreateAPIView):
@@ -109,6 +168,60 @@ class ProductCreateView(generics.CreateAPIView):
         serializer.save(vendor=self.request.user)
 
 
+class ProductImportView(APIView):
+    """
+    Bulk import products from a CSV or JSON lines upload
+    Vendors and admins only - rows are created or updated for the current user
+    POST multipart: file=<upload>, format=csv|jsonl (optional, guessed from the name)
+    """
+    permission_classes = [IsAuthenticated, IsVendorOrAdmin]
+    parser_classes = [MultiPartParser]
+    
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'Upload a CSV or JSON lines file as "file"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        file_format = request.data.get('format') or detect_format(upload.name)
+        if file_format not in FORMATS:
+            return Response(
+                {'error': f'format must be one of {", ".join(FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        report = ProductImporter(vendor=request.user).run(iter_rows(upload, file_format))
+        return Response(report, status=status.HTTP_200_OK)
+
+
+class ProductBulkUpdateView(APIView):
+    """
+    Bulk price / stock update for a vendor's catalog
+    PATCH a list (or {"items": [...]}) of
+    {"id" or "slug", "price", "discount_price", "stock", "is_available"}
+    Vendors can only touch their own products, admins any product
+    """
+    permission_classes = [IsAuthenticated, IsVendorOrAdmin]
+    
+    def patch(self, request):
+        items = request.data.get('items') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'Send a non-empty list of items'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > settings.PRODUCT_BULK_UPDATE_MAX_ITEMS:
+            return Response(
+                {'error': f'At most {settings.PRODUCT_BULK_UPDATE_MAX_ITEMS} items per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        summary, results = bulk_update_prices_and_stock(request.user, items)
+        return Response({**summary, 'results': results})
+
+
 class ProductUpdateView(generics.UpdateAPIView):
     """
     Update product
@@ -149,11 +262,12 @@ class ProductDeleteView(generics.DestroyAPIView):
         instance.delete()
 
 
-class MyProductsView(generics.ListAPIView):
+class MyProductsView(SparseFieldsetMixin, CompiledListMixin, generics.ListAPIView):
     """
     List products created by current vendor
     """
     serializer_class = ProductListSerializer
+    compiled_serializer_class = CompiledProductListSerializer
     permission_classes = [IsAuthenticated, IsVendorOrAdmin]
     
     def get_queryset(self):
@@ -161,27 +275,51 @@ class MyProductsView(generics.ListAPIView):
         return Product.objects.filter(vendor=self.request.user)
 
 
-class ReviewListCreateView(generics.ListCreateAPIView):
+class VendorDashboardView(APIView):
+    """
+    Sales and inventory summary for the current vendor
+    Admins can look at any vendor with ?vendor=<id>
+    """
+    permission_classes = [IsAuthenticated, IsVendorOrAdmin]
+    
+    def get(self, request):
+        vendor_id = request.user.pk
+        requested = request.query_params.get('vendor')
+        if requested and request.user.is_admin:
+            if not requested.isdigit():
+                return Response(
+                    {'error': 'vendor must be an id'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            vendor_id = int(requested)
+        
+        return Response(dict(vendor=vendor_id, **vendor_dashboard(vendor_id)))
+
+
+class ReviewListCreateView(SparseFieldsetMixin, generics.ListCreateAPIView):
     """
     List reviews for a product or create new review
     """
+    read_throttle_scope = 'catalog'
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = PageOrCursorPagination
     
     def get_queryset(self):
         product_id = self.kwargs.get('product_id')
-        return Review.objects.filter(product_id=product_id)
+        return Review.objects.filter(product_id=product_id).select_related('user')
     
     def perform_create(self, serializer):
         product_id = self.kwargs.get('product_id')
         serializer.save(user=self.request.user, product_id=product_id)
 
 
-class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ReviewDetailView(SparseFieldsetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a review
     Only review owner can update/delete
     """
+    read_throttle_scope = 'catalog'
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticated]